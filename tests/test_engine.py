@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import valuation_engine as ve
+
+
+def two_stage_loop(dividend, rate, high_growth, high_years, stable_growth):
+    """Per-payer reference: discount each explicit dividend, then the Gordon tail."""
+    values = []
+    for d0, r, g1, years, g2 in zip(*np.broadcast_arrays(dividend, rate, high_growth, high_years, stable_growth)):
+        pv, d = 0.0, d0
+        for t in range(1, years + 1):
+            d *= 1 + g1
+            pv += d / (1 + r) ** t
+        values.append(pv + d * (1 + g2) / (r - g2) / (1 + r) ** years)
+    return np.array(values)
+
+
+@pytest.mark.parametrize("stages", [np.array([0, 3, 5]), np.zeros(3, dtype=np.int64), np.arange(16)])
+def test_two_stage_ddm_matches_loop(stages):
+    reference = two_stage_loop(2.0, 0.1, 0.15, stages, 0.03)
+    np.testing.assert_allclose(ve.two_stage_ddm(2.0, 0.1, 0.15, stages, 0.03)[2], reference, rtol=1e-12)
+    schedule = ve.two_stage_dividend_schedule(2.0, 0.1, 0.15, stages, 0.03)
+    np.testing.assert_allclose(schedule["intrinsic_value"], reference, rtol=1e-12)
+
+
+def growth_companies(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return dict(startup_years=rng.integers(0, 11, n), expansion_years=rng.integers(1, 11, n),
+                maturity_years=rng.integers(1, 21, n), startup_cf=rng.normal(-50000.0, 15000.0, n),
+                expansion_initial_cf=rng.lognormal(np.log(20000.0), 0.4, n),
+                expansion_growth=rng.uniform(0.0, 0.50, n), maturity_growth=rng.uniform(0.0, 0.08, n),
+                rate=rng.uniform(0.05, 0.20, n))
+
+
+def test_growth_company_dcf_compiled_matches_numpy():
+    pytest.importorskip("numba")
+    inputs = growth_companies(ve.JIT_MIN_ROWS)
+    with ve.jit_policy(False):
+        reference = ve.growth_company_dcf(**inputs)
+    with ve.jit_policy(True):
+        compiled = ve.growth_company_dcf(**inputs)
+    for expected, actual in zip(reference, compiled):
+        np.testing.assert_array_equal(np.isfinite(actual), np.isfinite(expected))
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("name, value", [("startup_years", 2.7), ("expansion_years", -1),
+                                         ("maturity_years", np.nan)])
+def test_growth_company_dcf_rejects_bad_phase_lengths(name, value):
+    inputs = dict(growth_companies(3), **{name: value})
+    with pytest.raises(ValueError, match=name):
+        ve.growth_company_dcf(**inputs)
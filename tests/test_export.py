@@ -0,0 +1,38 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import valuation_engine as ve
+import valuation_export as vx
+
+
+def ragged_schedule():
+    cash_flows = np.arange(1.0, 13.0).reshape(3, 4) * 100.0
+    return ve.dcf_schedule(cash_flows, 0.1, 0.02, lengths=np.array([4, 2, 3]))
+
+
+def test_float64_summary_columns_are_not_copied():
+    schedule = ragged_schedule()
+    batch = vx.summary_batch(schedule)
+    for name in ("pv", "terminal_value", "terminal_value_pv", "intrinsic_value"):
+        assert batch.column(name).buffers()[1].address == schedule[name].ctypes.data
+
+
+def test_float32_results_are_widened():
+    with ve.dtype_policy(np.float32):
+        schedule = ragged_schedule()
+    batch = vx.summary_batch(schedule)
+    assert batch.schema == vx.SUMMARY_SCHEMA
+    np.testing.assert_allclose(batch.column("pv").to_numpy(), schedule["pv"], rtol=1e-7)
+
+
+def test_schedule_drops_padded_years_and_roundtrips():
+    schedule = ragged_schedule()
+    sink = pa.BufferOutputStream()
+    with vx.BatchWriter(sink, vx.SCHEDULE_SCHEMA, format="arrow") as writer:
+        writer.write(vx.schedule_batch(schedule, first_company=10))
+    table = ipc.open_file(sink.getvalue()).read_all()
+    np.testing.assert_array_equal(table.column("company_id").to_numpy(), [10] * 4 + [11] * 2 + [12] * 3)
+    np.testing.assert_array_equal(table.column("year").to_numpy(), [1, 2, 3, 4, 1, 2, 1, 2, 3])
+    keep = np.arange(1, 5)[None, :] <= schedule["lengths"][:, None]
+    np.testing.assert_array_equal(table.column("present_value").to_numpy(), schedule["present_value"][keep])
@@ -0,0 +1,30 @@
+import math
+
+import numpy as np
+import pytest
+
+import valuation_options as vo
+
+
+def test_normal_cdf_matches_erfc():
+    x = np.linspace(-37.0, 37.0, 20_001)
+    reference = np.array([0.5 * math.erfc(-v / math.sqrt(2.0)) for v in x])
+    result = vo.normal_cdf(x)
+    np.testing.assert_allclose(result, reference, rtol=1e-8, atol=1e-15)
+    np.testing.assert_array_equal(vo.normal_cdf([-np.inf, 0.0, np.inf]), [0.0, 0.5, 1.0])
+    assert np.isnan(vo.normal_cdf(np.nan))
+
+
+@pytest.mark.parametrize("kind, expected", [("call", [10.0, 0.0]), ("put", [0.0, 5.0])])
+@pytest.mark.parametrize("american", [True, False])
+def test_binomial_at_expiry_is_the_exercise_value(kind, expected, american):
+    values = vo.binomial([100.0, 85.0], 90.0, 0.0, 0.05, 0.2, kind=kind, american=american)
+    np.testing.assert_array_equal(values, expected)
+
+
+@pytest.mark.parametrize("kind", vo.KINDS)
+def test_european_lattice_converges_to_black_scholes(kind):
+    value, strike, years = np.array([80.0, 100.0, 120.0]), 100.0, np.array([0.5, 2.0, 5.0])
+    closed = vo.black_scholes(value, strike, years, 0.04, 0.3, 0.02, kind=kind)
+    lattice = vo.binomial(value, strike, years, 0.04, 0.3, 0.02, kind=kind, american=False, steps=2_000)
+    np.testing.assert_allclose(lattice, closed, rtol=2e-3)
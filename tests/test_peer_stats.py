@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from valuation_peer_stats import PeerStats
+
+N_COMPANIES, N_SECTORS = 3_000, 6
+RELATIVE_ACCURACY = 0.01
+
+
+@pytest.fixture
+def universe():
+    """PeerStats after a few rounds of single and batched ticks, with its exact peers."""
+    rng = np.random.default_rng(0)
+    sectors = rng.integers(0, N_SECTORS, N_COMPANIES)
+    pe = rng.lognormal(np.log(15.0), 0.4, N_COMPANIES)
+    pe[rng.random(N_COMPANIES) < 0.05] = np.nan
+    stats = PeerStats(sectors, pe, relative_accuracy=RELATIVE_ACCURACY)
+    for _ in range(20):
+        companies = rng.integers(0, N_COMPANIES, 500)
+        stats.update_many(companies, stats.values[companies] * rng.lognormal(0.0, 0.05, 500))
+    for company in rng.integers(0, N_COMPANIES, 200):
+        stats.update(company, stats.values[company] * 1.01)
+    # A few companies lose their multiple and a few get one back.
+    stats.update_many(rng.integers(0, N_COMPANIES, 50), np.nan)
+    stats.update_many(np.flatnonzero(np.isnan(stats.values))[:20], 12.0)
+    peers = [stats.values[(stats.sector_of == s) & ~np.isnan(stats.values)] for s in range(N_SECTORS)]
+    return stats, peers
+
+
+def test_mean_and_std_match_numpy(universe):
+    stats, peers = universe
+    for s, values in enumerate(peers):
+        assert stats.count[s] == values.size
+        assert stats.mean[s] == pytest.approx(np.mean(values), rel=1e-12)
+        assert stats.std(s) == pytest.approx(np.std(values), rel=1e-9)
+
+
+@pytest.mark.parametrize("q", [0.1, 0.25, 0.5, 0.75, 0.9])
+def test_quantiles_within_relative_accuracy(universe, q):
+    # PeerStats.quantile targets the peer at rank floor(q * (n - 1)), which is
+    # NumPy's method="lower", not the default linear interpolation between peers.
+    stats, peers = universe
+    for s, values in enumerate(peers):
+        exact = np.quantile(values, q, method="lower")
+        assert stats.quantile(s, q) == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+
+
+def test_percentile_ranks_close_to_exact(universe):
+    stats, peers = universe
+    for company in range(0, N_COMPANIES, 7):
+        value = stats.values[company]
+        if np.isnan(value):
+            assert np.isnan(stats.company_percentile(company))
+            continue
+        values = peers[stats.sector_of[company]]
+        exact = ((values < value).sum() + 0.5 * (values == value).sum()) / values.size
+        assert stats.company_percentile(company) == pytest.approx(exact, abs=0.05)
+
+
+def test_batch_matches_single_ticks():
+    rng = np.random.default_rng(1)
+    sectors = rng.integers(0, 3, 200)
+    pe = rng.lognormal(np.log(15.0), 0.4, 200)
+    batched, single = PeerStats(sectors, pe), PeerStats(sectors, pe)
+    companies = rng.integers(0, 200, 100)
+    values = rng.lognormal(np.log(15.0), 0.4, 100)
+    values[::10] = np.nan
+    batched.update_many(companies, values)
+    for company, value in zip(companies, values):
+        single.update(company, value)
+    np.testing.assert_array_equal(batched.values, single.values)
+    np.testing.assert_allclose(batched.mean, single.mean, rtol=1e-12)
+    np.testing.assert_allclose(batched.m2, single.m2, rtol=1e-9)
+    np.testing.assert_array_equal(batched.bins, single.bins)
+
+
+def test_empty_sector_has_no_statistics():
+    stats = PeerStats(["a", "a", "b"], [10.0, 20.0, 30.0])
+    stats.update_many([0, 1], np.nan)
+    s = stats.sector_index("a")
+    assert stats.count[s] == 0
+    assert np.isnan(stats.std(s))
+    assert np.isnan(stats.quantile(s, 0.5))
+    assert np.isnan(stats.percentile_rank(15.0, s))
+    with pytest.raises(KeyError):
+        stats.sector_index("c")
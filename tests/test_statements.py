@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import valuation_engine as ve
+import valuation_statements as vs
+
+N, YEARS = 50, 10
+
+
+@pytest.fixture
+def inputs():
+    rng = np.random.default_rng(0)
+    statements = vs.simple_projection(
+        rng.uniform(50.0, 500.0, N), rng.uniform(0.0, 0.15, N), YEARS, rng.uniform(0.2, 0.7, N),
+        tax_rate=rng.uniform(0.15, 0.35, N), net_debt=rng.uniform(0.0, 1000.0, N),
+        cost_of_debt=rng.uniform(0.03, 0.08, N), payout_ratio=rng.uniform(0.2, 0.9, N))
+    wacc = rng.uniform(0.07, 0.11, N)
+    return dict(statements, wacc=wacc, cost_of_equity=wacc + rng.uniform(0.0, 0.03, N), stable_growth=0.03)
+
+
+def test_three_way_matches_separate_schedules(inputs):
+    result = vs.three_way_valuation(**inputs)
+    after_tax = 1.0 - inputs["tax_rate"]
+    fcff = (inputs["ebit"] * after_tax + inputs["depreciation"] - inputs["capex"]
+            - inputs["change_in_working_capital"])
+    fcfe = fcff - inputs["interest_expense"] * after_tax + inputs["net_borrowing"]
+    dividends = inputs["payout_ratio"][:, None] * (inputs["ebit"] - inputs["interest_expense"]) * after_tax
+    for name, flow, rate, adjust in (("equity_fcff", fcff, inputs["wacc"], inputs["net_debt"]),
+                                     ("equity_fcfe", fcfe, inputs["cost_of_equity"], 0.0),
+                                     ("equity_ddm", dividends, inputs["cost_of_equity"], 0.0)):
+        reference = ve.dcf_schedule(flow, rate, inputs["stable_growth"])["intrinsic_value"] - adjust
+        np.testing.assert_allclose(result[name], reference, rtol=1e-12)
+
+
+@pytest.mark.parametrize("interest, borrowing", [(0.0, 0.0), (np.linspace(1.0, 5.0, N), np.linspace(0.0, 2.0, N))])
+def test_scalar_and_per_company_inputs_match_full_shape(inputs, interest, borrowing):
+    narrow = vs.three_way_valuation(**dict(inputs, interest_expense=interest, net_borrowing=borrowing,
+                                           tax_rate=inputs["tax_rate"][:, 0]))
+    full = vs.three_way_valuation(**dict(
+        inputs, interest_expense=np.broadcast_to(np.reshape(interest, (-1, 1)), (N, YEARS)),
+        net_borrowing=np.broadcast_to(np.reshape(borrowing, (-1, 1)), (N, YEARS))))
+    for name in ("equity_fcff", "equity_fcfe", "equity_ddm"):
+        np.testing.assert_allclose(narrow[name], full[name], rtol=1e-12)
+
+
+def test_per_year_vector_is_rejected(inputs):
+    with pytest.raises(ValueError, match="interest_expense"):
+        vs.three_way_valuation(**dict(inputs, interest_expense=np.full(YEARS, 5.0)))
@@ -0,0 +1,35 @@
+import numpy as np
+
+import valuation_wacc as vw
+
+
+def one_factor_panel(n_dates=300, n_tickers=20, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, n_dates)
+    beta = rng.normal(1.0, 0.35, n_tickers)
+    returns = market[:, None] * beta + rng.normal(0.0, 0.01, (n_dates, n_tickers))
+    returns[rng.random(returns.shape) < 0.02] = np.nan
+    return returns, market
+
+
+def test_rolling_beta_matches_polyfit_on_full_windows():
+    returns, market = one_factor_panel()
+    windows = (20, 60)
+    betas = vw.rolling_beta(returns, market, windows)
+    for w, window in enumerate(windows):
+        assert np.isnan(betas[w, :window - 1]).all()
+        for t in (window - 1, 150, returns.shape[0] - 1):
+            for j in range(returns.shape[1]):
+                y = returns[t - window + 1:t + 1, j]
+                ok = np.isfinite(y)
+                if ok.sum() < np.ceil(vw.MIN_COVERAGE * window):
+                    assert np.isnan(betas[w, t, j])
+                    continue
+                reference = np.polyfit(market[t - window + 1:t + 1][ok], y[ok], 1)[0]
+                assert abs(betas[w, t, j] - reference) < 1e-9
+
+
+def test_latest_beta_uses_the_whole_panel_when_shorter_than_the_window():
+    returns, market = one_factor_panel(n_dates=40)
+    np.testing.assert_allclose(vw.latest_beta(returns, market, window=60),
+                               vw.rolling_beta(returns, market, 40)[0, -1])
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import valuation_engine as ve
+
+# =============================================================================
+# Bank screener
+# =============================================================================
+# Lesson 6 values one bank with the fair P/BV (ROE - g) / (r - g). The screener
+# does the same for every bank in a CSV or Parquet file and ranks them by the
+# discount of the market P/BV to that fair value:
+#
+#     discount = 1 - market P/BV / fair P/BV      (0.25 = trades 25% below fair)
+#
+# The "Analyst Checklist" questions become boolean masks over the columns, and
+# only the k cheapest banks are selected with np.argpartition (O(n)) before the
+# k winners are sorted. Files are read in chunks; each chunk contributes its own
+# top k, so memory stays bounded however large the file is.
+#
+# Expected columns (rates and ratios as decimals): bank, roe, cost_of_capital,
+# growth, market_pbv, plus the checklist columns below. A checklist filter
+# whose column is missing is skipped and reported.
+
+REQUIRED_COLUMNS = ("bank", "roe", "cost_of_capital", "growth", "market_pbv")
+
+# filter -> (column, comparison, default threshold)
+CHECKLIST = {
+    "min_roe": ("roe", ">=", 0.10),                         # high ROE
+    "max_roe_volatility": ("roe_volatility", "<=", 0.03),   # consistent ROE
+    "min_capital_ratio": ("capital_ratio", ">=", 0.10),     # capitalization (e.g. CET1)
+    "max_npl_ratio": ("npl_ratio", "<=", 0.05),             # credit quality
+}
+
+CHUNK_ROWS = 1_000_000
+
+
+def top_k(scores, k):
+    """Indices of the k largest scores, largest first, without a full sort.
+
+    NaN scores are never selected.
+    """
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def checklist_mask(columns, filters=None):
+    """Banks passing every checklist filter, plus the filters that were skipped.
+
+    filters: dict filter name -> threshold (None disables it); defaults to
+             the thresholds in CHECKLIST. Missing values fail a filter.
+    """
+    filters = {name: spec[2] for name, spec in CHECKLIST.items()} if filters is None else filters
+    mask = np.ones(len(columns[REQUIRED_COLUMNS[1]]), dtype=bool)
+    skipped = []
+    for name, threshold in filters.items():
+        if threshold is None:
+            continue
+        column, comparison, _ = CHECKLIST[name]
+        if column not in columns:
+            skipped.append(name)
+            continue
+        values = np.asarray(columns[column], dtype=np.float64)
+        mask &= values >= threshold if comparison == ">=" else values <= threshold
+    return mask, skipped
+
+
+def _fair_and_discount(columns):
+    fair = ve.fair_pbv(np.asarray(columns["roe"], dtype=np.float64),
+                       np.asarray(columns["cost_of_capital"], dtype=np.float64),
+                       np.asarray(columns["growth"], dtype=np.float64))
+    market = np.asarray(columns["market_pbv"], dtype=np.float64)
+    # A non-positive fair P/BV has no meaningful discount.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discount = np.where(fair > 0, 1.0 - market / fair, np.nan)
+    return fair, discount
+
+
+def screen_banks(banks, k=20, filters=None):
+    """Top-k cheapest banks of a DataFrame that pass the checklist.
+
+    Returns (top, stats): the k rows with "fair_pbv" and "discount" columns
+    added, cheapest first, and a dict with "screened", "passed" and
+    "skipped_filters".
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in banks]
+    if missing:
+        raise ValueError(f"Missing bank columns: {', '.join(missing)}")
+    fair, discount = _fair_and_discount(banks)
+    mask, skipped = checklist_mask(banks, filters)
+    passed = mask & np.isfinite(discount)
+    top = top_k(np.where(passed, discount, np.nan), k)
+    result = banks.iloc[top].copy()
+    result["fair_pbv"], result["discount"] = fair[top], discount[top]
+    return result.reset_index(drop=True), dict(screened=len(banks), passed=int(passed.sum()),
+                                               skipped_filters=skipped)
+
+
+def _read_chunks(source, chunk_rows):
+    # `source` is a path or a file-like object (e.g. a Streamlit upload).
+    name = str(getattr(source, "name", source))
+    if name.endswith(".parquet"):
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def screen_bank_file(source, k=20, filters=None, chunk_rows=CHUNK_ROWS):
+    """screen_banks over a CSV or Parquet file, one chunk at a time.
+
+    The top k of each chunk are kept and re-ranked at the end, so only
+    about k rows per chunk are ever held besides the current chunk.
+    """
+    candidates = []
+    stats = dict(screened=0, passed=0, skipped_filters=[])
+    for chunk in _read_chunks(source, chunk_rows):
+        top, chunk_stats = screen_banks(chunk, k, filters)
+        candidates.append(top)
+        stats["screened"] += chunk_stats["screened"]
+        stats["passed"] += chunk_stats["passed"]
+        stats["skipped_filters"] = chunk_stats["skipped_filters"]
+    if not candidates:
+        return pd.DataFrame(columns=list(REQUIRED_COLUMNS) + ["fair_pbv", "discount"]), stats
+    candidates = pd.concat(candidates, ignore_index=True)
+    best = top_k(candidates["discount"].to_numpy(), k)
+    return candidates.iloc[best].reset_index(drop=True), stats
+
+
+def sample_banks(n, seed=0):
+    """Synthetic bank universe with every screener column, for demos and benchmarks."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "bank": np.char.add("BANK", np.arange(n).astype(str)),
+        "roe": rng.normal(0.11, 0.03, n),
+        "cost_of_capital": rng.uniform(0.08, 0.12, n),
+        "growth": rng.uniform(0.0, 0.05, n),
+        "market_pbv": rng.lognormal(np.log(1.1), 0.3, n),
+        "roe_volatility": rng.gamma(2.0, 0.01, n),
+        "capital_ratio": rng.normal(0.13, 0.025, n),
+        "npl_ratio": rng.gamma(2.0, 0.015, n),
+    })
@@ -0,0 +1,869 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Engine benchmarks
+# =============================================================================
+# Usage: python valuation_bench.py [--companies N] [--repeat K]
+#        python valuation_bench.py --peer-stats
+#        python valuation_bench.py --ddm
+#        python valuation_bench.py --jit
+#        python valuation_bench.py --history
+#        python valuation_bench.py --backtest
+#        python valuation_bench.py --options
+#        python valuation_bench.py --wacc
+#        python valuation_bench.py --three-way
+#        python valuation_bench.py --financing
+#        python valuation_bench.py --stress
+#        python valuation_bench.py --suite [--max-rows N] [--json PATH]
+#                                  [--baseline PATH] [--save-baseline]
+#
+# Flags combine (e.g. --ddm --wacc runs both, in the order of BENCHMARKS).
+# The benchmarks measure and report; the correctness checks live in tests/
+# (python -m pytest), so they still run under python -O.
+#
+# Every case runs once per dtype policy. For each run we report the best wall
+# time, the peak memory NumPy allocated (tracemalloc sees NumPy buffers) and,
+# for float32, the error against the float64 result of the same inputs.
+
+
+def _lesson1_inputs(rng, n):
+    # Lesson 1: 20 explicit yearly cash flows, discount rate and perpetual growth.
+    return dict(cash_flows=rng.normal(100000.0, 30000.0, (n, 20)),
+                rate=rng.uniform(0.06, 0.20, n),
+                terminal_growth=rng.uniform(0.0, 0.05, n))
+
+
+def _lesson1(inputs):
+    pv, tv_pv = ve.schedule_dcf(**inputs)
+    return pv + tv_pv
+
+
+def _lesson3_inputs(rng, n):
+    # Lesson 3: random phase lengths within the widget bounds.
+    return dict(startup_years=rng.integers(0, 11, n),
+                expansion_years=rng.integers(1, 11, n),
+                maturity_years=rng.integers(1, 21, n),
+                startup_cf=rng.normal(-50000.0, 15000.0, n),
+                expansion_initial_cf=rng.lognormal(np.log(20000.0), 0.4, n),
+                expansion_growth=rng.uniform(0.0, 0.50, n),
+                maturity_growth=rng.uniform(0.0, 0.08, n),
+                rate=rng.uniform(0.10, 0.20, n))
+
+
+def _lesson3(inputs):
+    return ve.growth_company_dcf(**inputs)[2]
+
+
+def _monte_carlo_inputs(rng, n):
+    # Lesson 0 DCF over paths x companies: one (growth, rate) draw per cell.
+    return dict(cash_flow=rng.lognormal(np.log(100000.0), 0.5, n),
+                growth=rng.normal(0.05, 0.02, n),
+                rate=rng.normal(0.10, 0.015, n),
+                years=10)
+
+
+def _monte_carlo(inputs):
+    return ve.constant_growth_dcf(**inputs)
+
+
+CASES = {
+    "schedule_dcf (lesson 1)": (_lesson1_inputs, _lesson1),
+    "growth_company_dcf (lesson 3)": (_lesson3_inputs, _lesson3),
+    "monte_carlo_dcf (lesson 0)": (_monte_carlo_inputs, _monte_carlo),
+}
+
+
+def _measure(fn, inputs, dtype, repeat):
+    with ve.dtype_policy(dtype):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn(inputs)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        fn(inputs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def compare_dtypes(n, repeat=3, seed=0):
+    """Rows of float64-vs-float32 timings, peak memory and errors per case."""
+    rows = []
+    for name, (make_inputs, fn) in CASES.items():
+        inputs = make_inputs(np.random.default_rng(seed), n)
+        reference, ref_time, ref_peak = _measure(fn, inputs, "float64", repeat)
+        compact, time32, peak32 = _measure(fn, inputs, "float32", repeat)
+        valid = np.isfinite(reference) & np.isfinite(compact)
+        abs_err = np.abs(compact[valid] - reference[valid])
+        scale = np.median(np.abs(reference[valid]))
+        # Relative error is only meaningful away from values that cancel to ~0.
+        sizeable = np.abs(reference[valid]) >= 1e-3 * scale
+        rel_err = abs_err[sizeable] / np.abs(reference[valid][sizeable])
+        rows.append(dict(case=name, rows=n,
+                         float64_s=ref_time, float32_s=time32,
+                         float64_mb=ref_peak / 1e6, float32_mb=peak32 / 1e6,
+                         max_rel_err=float(rel_err.max()), max_abs_err=float(abs_err.max())))
+    return rows
+
+
+def _print_dtype_table(rows):
+    print(f"{'case':32} {'rows':>10} {'f64 s':>8} {'f32 s':>8} {'speedup':>8}"
+          f" {'f64 MB':>9} {'f32 MB':>9} {'max rel err':>12} {'max abs err':>12}")
+    for row in rows:
+        print(f"{row['case']:32} {row['rows']:>10,} {row['float64_s']:8.3f} {row['float32_s']:8.3f}"
+              f" {row['float64_s'] / row['float32_s']:7.2f}x"
+              f" {row['float64_mb']:9.1f} {row['float32_mb']:9.1f}"
+              f" {row['max_rel_err']:12.2e} {row['max_abs_err']:12.2e}")
+
+
+def peer_stats_accuracy(n=100_000, n_sectors=500, ticks=1_000_000, seed=0):
+    """Running PeerStats vs an exact rescan after a day of simulated price ticks.
+
+    Quantiles (deciles and quartiles) are compared with the exact peer at
+    rank floor(q * (n - 1)). Reports timings and errors only; the error
+    bounds are checked by tests/test_peer_stats.py.
+    """
+    from valuation_peer_stats import PeerStats
+
+    rng = np.random.default_rng(seed)
+    sectors = rng.integers(0, n_sectors, n)
+    pe = rng.lognormal(np.log(15.0), 0.4, n)
+    pe[rng.random(n) < 0.03] = np.nan
+    stats = PeerStats(sectors, pe)
+    batch = 10_000
+    start = time.perf_counter()
+    for _ in range(ticks // batch):
+        companies = rng.integers(0, n, batch)
+        moves = rng.lognormal(0.0, 0.01, batch)
+        stats.update_many(companies, stats.values[companies] * moves)
+    batch_us = (time.perf_counter() - start) / ticks * 1e6
+    start = time.perf_counter()
+    for company in rng.integers(0, n, 10_000):
+        stats.update(company, stats.values[company] * 1.001)
+    single_us = (time.perf_counter() - start) / 10_000 * 1e6
+
+    mean_err = std_err = median_err = quantile_err = rank_err = 0.0
+    quantiles = (0.1, 0.25, 0.75, 0.9)
+    for s in range(n_sectors):
+        exact = stats.exact(s)
+        mean_err = max(mean_err, abs(stats.mean[s] - exact["mean"]) / exact["mean"])
+        std_err = max(std_err, abs(stats.std(s) - exact["std"]) / exact["std"])
+        median_err = max(median_err, abs(stats.quantile(s, 0.5) - exact["median"]) / exact["median"])
+        peers = stats.values[(stats.sector_of == s) & ~np.isnan(stats.values)]
+        exact_q = np.quantile(peers, quantiles, method="lower")
+        approx_q = np.array([stats.quantile(s, q) for q in quantiles])
+        quantile_err = max(quantile_err, float(np.max(np.abs(approx_q - exact_q) / exact_q)))
+    for company in rng.integers(0, n, 2_000):
+        value = stats.values[company]
+        if np.isnan(value):
+            continue
+        peers = stats.values[(stats.sector_of == stats.sector_of[company]) & ~np.isnan(stats.values)]
+        exact_rank = ((peers < value).sum() + 0.5 * (peers == value).sum()) / peers.size
+        rank_err = max(rank_err, abs(stats.company_percentile(company) - exact_rank))
+    result = dict(companies=n, sectors=n_sectors, ticks=ticks,
+                  batch_tick_us=batch_us, single_tick_us=single_us,
+                  max_mean_rel_err=mean_err, max_std_rel_err=std_err,
+                  max_median_rel_err=median_err, max_quantile_rel_err=quantile_err,
+                  max_percentile_abs_err=rank_err)
+    return result
+
+
+def _two_stage_python(dividend, rate, high_growth, high_years, stable_growth):
+    # Per-row reference: discount each explicit dividend, then the Gordon tail.
+    values = []
+    for d0, r, g1, years, g2 in zip(dividend, rate, high_growth, high_years, stable_growth):
+        pv, d = 0.0, d0
+        for t in range(1, years + 1):
+            d *= 1 + g1
+            pv += d / (1 + r) ** t
+        values.append(pv + d * (1 + g2) / (r - g2) / (1 + r) ** years)
+    return np.array(values)
+
+
+def _h_model_python(dividend, rate, high_growth, half_life, stable_growth):
+    return np.array([d0 * (1 + gl) / (r - gl) + d0 * h * (gs - gl) / (r - gl)
+                     for d0, r, gs, h, gl in zip(dividend, rate, high_growth, half_life, stable_growth)])
+
+
+def ddm_benchmark(n=1_000_000, python_rows=20_000, seed=0):
+    """Batched two-stage and H-model DDMs vs per-row Python loops (µs per payer).
+
+    First stages of 0 to 15 years.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = dict(dividend=rng.lognormal(np.log(2.0), 0.5, n), rate=rng.uniform(0.07, 0.12, n),
+                  high_growth=rng.uniform(0.0, 0.15, n), stable_growth=rng.uniform(0.0, 0.04, n))
+    stage = rng.integers(0, 16, n)
+    cases = {
+        "two_stage_ddm (closed form)": (lambda: ve.two_stage_ddm(high_years=stage, **inputs)[2],
+                                        _two_stage_python, dict(high_years=stage)),
+        "two_stage via dcf_schedule": (lambda: ve.two_stage_dividend_schedule(high_years=stage, **inputs)["intrinsic_value"],
+                                       _two_stage_python, dict(high_years=stage)),
+        "h_model_ddm": (lambda: ve.h_model_ddm(half_life=stage / 2, **inputs)[2],
+                        _h_model_python, dict(half_life=stage / 2)),
+    }
+    rows = []
+    for name, (batched, python, extra) in cases.items():
+        start = time.perf_counter()
+        values = batched()
+        batch_us = (time.perf_counter() - start) / n * 1e6
+        subset = {key: value[:python_rows] for key, value in {**inputs, **extra}.items()}
+        start = time.perf_counter()
+        reference = python(**subset)
+        python_us = (time.perf_counter() - start) / python_rows * 1e6
+        rel_err = np.abs(values[:python_rows] - reference) / np.abs(reference)
+        rows.append(dict(case=name, rows=n, batch_us=batch_us, python_us=python_us,
+                         speedup=python_us / batch_us, max_rel_err=float(rel_err.max())))
+    return rows
+
+
+def jit_benchmark(sizes=(100_000, 1_000_000, 10_000_000), seed=0):
+    """Three-phase growth DCF through the NumPy and the compiled path.
+
+    The NumPy path values blocks of SUITE_CHUNK_ROWS rows (its padded (n, T)
+    arrays would not fit at 10^7 rows); the compiled path takes the whole
+    batch in one call. Returns one row per size plus the first-call cost of
+    the compiled path (compile or load from the on-disk cache).
+    """
+    start = time.perf_counter()
+    probe = _lesson3_inputs(np.random.default_rng(seed), ve.JIT_MIN_ROWS)
+    ve.growth_company_dcf(**probe)
+    first_call_s = time.perf_counter() - start
+    rows = []
+    for n in sizes:
+        inputs = _lesson3_inputs(np.random.default_rng(seed), n)
+        timings = {}
+        for name, enabled, chunk in (("numpy", False, SUITE_CHUNK_ROWS), ("jit", True, n)):
+            with ve.jit_policy(enabled):
+                tracemalloc.start()
+                start = time.perf_counter()
+                value = np.concatenate([
+                    ve.growth_company_dcf(**{key: x[i:i + chunk] for key, x in inputs.items()})[2]
+                    for i in range(0, n, chunk)])
+                timings[name] = (time.perf_counter() - start, tracemalloc.get_traced_memory()[1], value)
+                tracemalloc.stop()
+        (numpy_s, numpy_peak, reference), (jit_s, jit_peak, compiled) = timings["numpy"], timings["jit"]
+        valid = np.isfinite(reference)
+        abs_err = np.abs(compiled[valid] - reference[valid])
+        rows.append(dict(rows=n, numpy_s=numpy_s, jit_s=jit_s, speedup=numpy_s / jit_s,
+                         numpy_mb=numpy_peak / 1e6, jit_mb=jit_peak / 1e6,
+                         same_nan=bool(np.array_equal(valid, np.isfinite(compiled))),
+                         max_abs_err=float(abs_err.max()),
+                         max_err_vs_median=float(abs_err.max() / np.median(np.abs(reference[valid])))))
+    return first_call_s, rows
+
+
+def history_benchmark(n_tickers=5_000, years=25, seed=0):
+    """Rolling intrinsic value over monthly dates x tickers, checked against pandas.
+
+    The point-in-time panel is compared with pandas.merge_asof on the same
+    reports; the timings cover the full history (pivot, point-in-time FCF and
+    two-stage values) and the valuation step alone.
+    """
+    import pandas as pd
+
+    import valuation_history as vh
+
+    prices, fundamentals = vh.sample_history(n_tickers, years, seed)
+    start = time.perf_counter()
+    dates, tickers, _, value = vh.intrinsic_value_history(prices, fundamentals, 0.09, 0.03)
+    history_s = time.perf_counter() - start
+    start = time.perf_counter()
+    fcf = vh.point_in_time(fundamentals["ticker"].to_numpy(), fundamentals["report_date"].to_numpy(),
+                           fundamentals["fcf_per_share"].to_numpy(), tickers, dates)
+    point_in_time_s = time.perf_counter() - start
+    start = time.perf_counter()
+    vh.rolling_intrinsic_value(fcf, 0.09, 0.03)
+    value_s = time.perf_counter() - start
+
+    cells = pd.DataFrame({"date": np.repeat(dates, len(tickers)).astype("datetime64[ns]"),
+                          "ticker": np.tile(tickers, len(dates))})
+    reports = fundamentals.assign(report_date=fundamentals["report_date"].astype("datetime64[ns]"))
+    start = time.perf_counter()
+    merged = pd.merge_asof(cells.sort_values("date"), reports.sort_values("report_date"),
+                           left_on="date", right_on="report_date", by="ticker")
+    merge_asof_s = time.perf_counter() - start
+    reference = (merged.pivot(index="date", columns="ticker", values="fcf_per_share")
+                 .reindex(columns=tickers).to_numpy())
+    return dict(cells=value.size, history_s=history_s, point_in_time_s=point_in_time_s,
+                merge_asof_s=merge_asof_s, value_s=value_s,
+                matches_merge_asof=bool(np.array_equal(reference, fcf, equal_nan=True)),
+                valued_share=float(np.isfinite(value).mean()))
+
+
+def backtest_benchmark(n_tickers=5_000, years=30, seed=0):
+    """Value > Price backtest on 30 years of months x 5,000 tickers (seconds)."""
+    import valuation_backtest as vbt
+    import valuation_history as vh
+
+    prices, fundamentals = vh.sample_history(n_tickers, years, seed)
+    start = time.perf_counter()
+    _, _, price_panel, value_panel = vh.intrinsic_value_history(prices, fundamentals, 0.09, 0.03)
+    history_s = time.perf_counter() - start
+    timings = {}
+    for name, every in vbt.REBALANCE_PERIODS.items():
+        start = time.perf_counter()
+        rule = vbt.backtest(price_panel, value_panel, margin_of_safety=0.2, rebalance_every=every,
+                            cost_bps=10.0)
+        timings[name] = (time.perf_counter() - start, rule)
+    return history_s, price_panel.shape, timings
+
+
+def wacc_benchmark(n_tickers=10_000, n_dates=5_040, windows=(60, 252, 756), checks=200, seed=0):
+    """Rolling betas and WACC of a memory-mapped daily return panel.
+
+    A synthetic panel (20 years of trading days, float32 .npy) is written to
+    a temporary directory and opened as a memory map; the betas of every
+    window are written to a float32 memory map next to it. `checks` random
+    (ticker, date, window) cells are compared with np.polyfit on the same
+    observations.
+    """
+    import tempfile
+
+    import valuation_wacc as vw
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "returns.npy")
+        start = time.perf_counter()
+        market, true_beta = vw.sample_returns(path, n_tickers, n_dates, seed)
+        write_s = time.perf_counter() - start
+        panel = vw.open_returns(path)
+        out = np.lib.format.open_memmap(os.path.join(tmp, "betas.npy"), mode="w+", dtype=np.float32,
+                                        shape=(len(windows),) + panel.shape)
+        start = time.perf_counter()
+        vw.rolling_beta(panel, market, windows, out=out)
+        out.flush()
+        rolling_s = time.perf_counter() - start
+        start = time.perf_counter()
+        latest = vw.universe_wacc(panel, market, 0.04, 0.05, 0.06, 0.25, 70.0, 30.0, window=252)
+        latest_s = time.perf_counter() - start
+
+        rng = np.random.default_rng(seed)
+        max_err = 0.0
+        for _ in range(checks):
+            w, t, j = rng.integers(len(windows)), rng.integers(n_dates), rng.integers(n_tickers)
+            first = t - windows[w] + 1
+            if first < 0:
+                continue
+            y = panel[first:t + 1, j].astype(np.float64)
+            ok = np.isfinite(y)
+            if ok.sum() >= np.ceil(vw.MIN_COVERAGE * windows[w]):
+                reference = np.polyfit(market[first:t + 1][ok], y[ok], 1)[0]
+                max_err = max(max_err, abs(float(out[w, t, j]) - reference))
+        longest = out[-1, -1].astype(np.float64)   # last date, last window
+        return dict(cells=panel.size, windows=len(windows), panel_mb=os.path.getsize(path) / 1e6,
+                    write_s=write_s, rolling_s=rolling_s, latest_wacc_s=latest_s,
+                    max_err_vs_polyfit=max_err,
+                    corr_with_true_beta=float(np.corrcoef(true_beta, longest)[0, 1]),
+                    median_wacc=float(np.median(latest["wacc"])))
+
+
+def _statement_inputs(rng, n, years=10):
+    import valuation_statements as vs
+
+    statements = vs.simple_projection(
+        rng.uniform(50.0, 500.0, n), rng.uniform(0.0, 0.15, n), years, rng.uniform(0.2, 0.7, n),
+        tax_rate=rng.uniform(0.15, 0.35, n), net_debt=rng.uniform(0.0, 1000.0, n),
+        cost_of_debt=rng.uniform(0.03, 0.08, n), payout_ratio=rng.uniform(0.2, 0.9, n))
+    statements["tax_rate"] = statements["tax_rate"][:, 0]
+    wacc = rng.uniform(0.07, 0.11, n)
+    return dict(statements, wacc=wacc, cost_of_equity=wacc + rng.uniform(0.0, 0.03, n), stable_growth=0.03)
+
+
+def _fcff(inputs):
+    after_tax = (1.0 - inputs["tax_rate"])[:, None]
+    return (inputs["ebit"] * after_tax + inputs["depreciation"] - inputs["capex"]
+            - inputs["change_in_working_capital"])
+
+
+def three_way_benchmark(sizes=(100_000, 1_000_000), repeat=3, seed=0):
+    """FCFF + FCFE + DDM in one pass against one and three schedule DCFs.
+
+    "one_s" derives FCFF from the statements and values it with
+    ve.dcf_schedule (one method); "separate_s" derives the three cash flows
+    and runs ve.dcf_schedule three times; "three_way_s" is
+    valuation_statements.three_way_valuation. The three-way equity values
+    are compared with the separate schedules.
+    """
+    import valuation_statements as vs
+
+    rows = []
+    for n in sizes:
+        inputs = _statement_inputs(np.random.default_rng(seed), n)
+        after_tax = (1.0 - inputs["tax_rate"])[:, None]
+
+        def one():
+            return ve.dcf_schedule(_fcff(inputs), inputs["wacc"], inputs["stable_growth"])
+
+        def separate():
+            fcff = _fcff(inputs)
+            fcfe = fcff - inputs["interest_expense"] * after_tax + inputs["net_borrowing"]
+            dividends = (inputs["payout_ratio"][:, None] * (inputs["ebit"] - inputs["interest_expense"])
+                         * after_tax)
+            return [ve.dcf_schedule(flow, rate, inputs["stable_growth"])["intrinsic_value"]
+                    for flow, rate in ((fcff, inputs["wacc"]), (fcfe, inputs["cost_of_equity"]),
+                                       (dividends, inputs["cost_of_equity"]))]
+
+        def three_way():
+            return vs.three_way_valuation(**inputs)
+
+        timings = {}
+        for name, fn in (("one", one), ("separate", separate), ("three_way", three_way)):
+            best = np.inf
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = fn()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = (best, result)
+        firm, fcfe, ddm = timings["separate"][1]
+        result = timings["three_way"][1]
+        reference = np.stack([firm - inputs["net_debt"], fcfe, ddm])
+        values = np.stack([result["equity_fcff"], result["equity_fcfe"], result["equity_ddm"]])
+        rows.append(dict(rows=n, one_s=timings["one"][0], separate_s=timings["separate"][0],
+                         three_way_s=timings["three_way"][0],
+                         max_rel_err=float(np.nanmax(np.abs(values - reference) / np.abs(reference))),
+                         flagged=float(result["flag"].mean())))
+    return rows
+
+
+def _option_inputs(rng, n):
+    # Projects worth 50-150 against costs or salvage values of 50-150.
+    return dict(value=rng.uniform(50.0, 150.0, n), strike=rng.uniform(50.0, 150.0, n),
+                years=rng.uniform(0.5, 10.0, n), rate=0.04, volatility=rng.uniform(0.1, 0.6, n),
+                dividend_yield=rng.uniform(0.0, 0.1, n))
+
+
+def options_benchmark(n=2_000, steps=(100, 1_000, 2_000), closed_form_rows=1_000_000, memory_rows=1_000,
+                      seed=0):
+    """Black-Scholes and binomial-lattice throughput of valuation_options.
+
+    Each lattice row prices `n` American puts (abandonment options) through
+    the NumPy path and, when numba is installed, the compiled path, and
+    European puts to measure the lattice error against the closed form.
+    Peak memory is traced in a separate run on the first `memory_rows`
+    options (tracing slows the lattice down); the NumPy path works on chunks
+    of LATTICE_CHUNK_CELLS nodes, so its peak does not grow with the batch.
+    (The compiled kernel's buffers, one row of nodes per option in flight,
+    are invisible to tracemalloc.)
+    Returns (closed-form seconds for `closed_form_rows` options, rows).
+    """
+    import valuation_options as vo
+
+    inputs = _option_inputs(np.random.default_rng(seed), closed_form_rows)
+    start = time.perf_counter()
+    vo.black_scholes(**inputs, kind="put")
+    closed_form_s = time.perf_counter() - start
+    inputs = _option_inputs(np.random.default_rng(seed), n)
+    exact = vo.black_scholes(**inputs, kind="put")
+    compiled = ve._jit_kernels(ve.JIT_MIN_ROWS) is not None
+    rows = []
+    for k in steps:
+        row = dict(options=n, steps=k)
+        for name, enabled in (("numpy", False), ("jit", True)):
+            if enabled and not compiled:
+                row[name + "_s"] = None
+                continue
+            with ve.jit_policy(enabled):
+                # Compile (or load) the kernel first: a batch just above the
+                # compiled-path threshold.
+                vo.binomial(**inputs, kind="put", steps=ve.JIT_MIN_ROWS // n + 1)
+                start = time.perf_counter()
+                american = vo.binomial(**inputs, kind="put", steps=k)
+                row[name + "_s"] = time.perf_counter() - start
+                european = vo.binomial(**inputs, kind="put", american=False, steps=k)
+                if enabled:
+                    continue
+                tracemalloc.start()
+                vo.binomial(**{key: x[:memory_rows] if np.ndim(x) else x for key, x in inputs.items()},
+                            kind="put", steps=k)
+                row["numpy_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+        row["ns_per_node"] = min(t for t in (row["numpy_s"], row["jit_s"]) if t) / (n * k * k / 2) * 1e9
+        row["max_err_vs_closed_form"] = float(np.abs(european - exact).max())
+        row["early_exercise_premium"] = float(np.mean(american - european))
+        rows.append(row)
+    return closed_form_s, rows
+
+
+def _financing_python(flows, rate, growth, initial_cash, shares, min_cash, raise_amount, price):
+    # One path at a time, year by year: the reference for the batched simulation.
+    cash, value, raised_pv = initial_cash, 0.0, 0.0
+    for t, cf in enumerate(flows, start=1):
+        cash += cf
+        value += cf / (1.0 + rate) ** t
+        if cash < min_cash:
+            amount = max(raise_amount, min_cash - cash)
+            cash += amount
+            shares += amount / price[t - 1]
+            raised_pv += amount / (1.0 + rate) ** t
+    value += flows[-1] * (1.0 + growth) / (rate - growth) / (1.0 + rate) ** len(flows)
+    return (value + initial_cash + raised_pv) / shares
+
+
+def financing_benchmark(paths=(10_000, 100_000, 300_000), python_paths=2_000, seed=0):
+    """Capital-raise simulation of the lesson 3 company over scenarios x Monte Carlo paths.
+
+    Three scenarios (startup phase of 2, 3 and 5 years) with `paths` draws
+    each, 30-year horizons. The value per share of the first `python_paths`
+    draws of each scenario is checked against a per-path Python loop, whose
+    time per path gives the speedup.
+    """
+    import valuation_financing as vf
+
+    settings = dict(rate=0.15, terminal_growth=0.03, initial_cash=100_000.0, shares=1_000_000,
+                    min_cash=25_000.0, raise_amount=150_000.0)
+    rows = []
+    for n in paths:
+        cash_flows, lengths = vf.sample_cash_flows([2, 3, 5], 5, 23, -50_000.0, 20_000.0, 0.25, 0.03,
+                                                   n_paths=n, seed=seed)
+        price = 0.5 * 1.15 ** np.arange(1, cash_flows.shape[-1] + 1)
+        start = time.perf_counter()
+        result = vf.simulate_financing(cash_flows, **settings, price=price, lengths=lengths)
+        seconds = time.perf_counter() - start
+        checked = min(n, python_paths)
+        start = time.perf_counter()
+        reference = np.array([[_financing_python(cash_flows[s, p, :lengths[s, p]], settings["rate"],
+                                                 settings["terminal_growth"], settings["initial_cash"],
+                                                 settings["shares"], settings["min_cash"],
+                                                 settings["raise_amount"], price)
+                               for p in range(checked)] for s in range(3)])
+        python_s = (time.perf_counter() - start) / (3 * checked)
+        rows.append(dict(paths=3 * n, years=cash_flows.shape[-1], seconds=seconds,
+                         ns_per_path_year=seconds / cash_flows.size * 1e9,
+                         speedup=python_s * 3 * n / seconds,
+                         max_rel_err=float(np.max(np.abs(result["value_per_share"][:, :checked] - reference)
+                                                  / np.abs(reference))),
+                         raise_probability=float((result["rounds"] > 0).mean()),
+                         mean_dilution=float(result["dilution"].mean())))
+    return rows
+
+
+def stress_benchmark(sizes=(100_000, 1_000_000), years=10, checks=200, seed=0):
+    """Macro stress test of a cyclical universe under the SCENARIOS library.
+
+    For each universe size: the best of three runs with and without the
+    sector report, the peak memory NumPy allocated (a separate traced run
+    without sectors, results included) next to the size of the full scenarios x companies x years tensor, and
+    the largest error of `checks` companies against ve.dcf_schedule on
+    their stressed earnings.
+    """
+    import valuation_stress as vs
+
+    rows = []
+    for n in sizes:
+        universe = vs.sample_universe(n, years, seed)
+        timings = {}
+        for name, sectors in (("companies", None), ("sectors", universe["sectors"])):
+            best = np.inf
+            for _ in range(3):
+                start = time.perf_counter()
+                result = vs.stress_test(**dict(universe, sectors=sectors))
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        tracemalloc.start()
+        vs.stress_test(**dict(universe, sectors=None))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        picked = np.linspace(0, n - 1, checks).astype(np.int64)
+        _, drop = vs.scenario_profiles(vs.SCENARIOS, years)
+        paths = vs.stressed_earnings(universe["revenue"][picked], universe["earnings"][picked],
+                                     universe["cyclicality"][picked],
+                                     universe["contribution_margin"][picked], drop)
+        reference = np.stack([ve.dcf_schedule(p, universe["rate"][picked], universe["terminal_growth"][picked])
+                              ["intrinsic_value"] for p in paths])
+        value = result["value"][:, picked]
+        cells = len(vs.SCENARIOS) * n * years
+        rows.append(dict(companies=n, cells=cells, seconds=timings["companies"],
+                         with_sectors_s=timings["sectors"], ns_per_cell=timings["companies"] / cells * 1e9,
+                         peak_mb=peak / 1e6, tensor_mb=cells * 8 / 1e6,
+                         max_rel_err=float(np.max(np.abs(value - reference) / np.abs(reference))),
+                         median_loss=float(np.nanmedian(result["loss_at_stress"]))))
+    return rows
+
+
+# =============================================================================
+# Kernel suite: throughput from 1 to 10^7 rows
+# =============================================================================
+# One case per lesson kernel, timed at every power of ten up to --max-rows.
+# Calls are made on blocks of at most SUITE_CHUNK_ROWS rows (the way the app
+# and the batch jobs run large universes), so the 2-D schedule kernels fit in
+# memory at 10^7 rows. Small sizes are repeated until a timing round lasts
+# SUITE_MIN_ROUND_S, and the best of `repeat` rounds is kept.
+#
+# --json writes the results with the machine they ran on; --baseline compares
+# ns per row with a stored run and exits with status 1 when a case is slower
+# than the baseline by more than --tolerance. Below SUITE_GATE_ROWS a call is
+# mostly Python and NumPy call overhead, which moves by 30-60% between
+# processes on a shared machine, so those sizes are reported but never fail
+# the check. Compare only runs from the same machine; a different CPU or
+# NumPy is reported before the table.
+
+SUITE_SIZES = tuple(10 ** k for k in range(8))
+SUITE_CHUNK_ROWS = 1_000_000
+SUITE_MIN_ROUND_S = 0.2
+SUITE_GATE_ROWS = 10_000
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "valuation_bench_baseline.json")
+
+
+def _suite_cases():
+    # name -> (inputs for n rows, kernel); inputs follow each lesson's widgets.
+    def schedule_inputs(rng, n):
+        return dict(cash_flows=rng.normal(100000.0, 30000.0, (n, 10)),
+                    rate=rng.uniform(0.06, 0.20, n), terminal_growth=rng.uniform(0.0, 0.05, n))
+
+    def lesson0_inputs(rng, n):
+        return dict(cash_flow=rng.lognormal(np.log(100000.0), 0.5, n),
+                    growth=rng.uniform(0.0, 0.20, n), rate=rng.uniform(0.0, 0.20, n), years=10)
+
+    def gordon_inputs(rng, n):
+        return dict(dividend=rng.lognormal(np.log(2.0), 0.5, n),
+                    rate=rng.uniform(0.07, 0.12, n), growth=rng.uniform(0.0, 0.05, n))
+
+    def normalized_inputs(rng, n):
+        return dict(current_profit=rng.lognormal(np.log(1e6), 0.5, n),
+                    current_pe=rng.uniform(5.0, 30.0, n),
+                    normalized_profit=rng.lognormal(np.log(1e6), 0.5, n))
+
+    def pbv_inputs(rng, n):
+        return dict(roe=rng.normal(0.11, 0.03, n), rate=rng.uniform(0.08, 0.12, n),
+                    growth=rng.uniform(0.0, 0.05, n))
+
+    return {
+        "constant_growth_dcf (lesson 0)": (lesson0_inputs, lambda x: ve.constant_growth_dcf(**x)),
+        "schedule_dcf + TV (lesson 1)": (schedule_inputs, _lesson1),
+        "growth_company_dcf (lesson 3)": (_lesson3_inputs, _lesson3),
+        "gordon_ddm (lesson 4)": (gordon_inputs, lambda x: ve.gordon_ddm(**x)),
+        "normalized_pe (lesson 5)": (normalized_inputs, lambda x: ve.normalized_pe(**x)),
+        "fair_pbv (lesson 6)": (pbv_inputs, lambda x: ve.fair_pbv(**x)),
+    }
+
+
+def _time_rows(fn, inputs, n, repeat):
+    # Best seconds to value n rows, calling fn on the chunk `inputs` as often as needed.
+    calls = -(-n // SUITE_CHUNK_ROWS)
+
+    def one_round(loops):
+        start = time.perf_counter()
+        for _ in range(loops * calls):
+            fn(inputs)
+        return (time.perf_counter() - start) / loops
+
+    first = one_round(1)   # also the warm-up
+    loops = min(int(SUITE_MIN_ROUND_S / first) + 1, 1_000_000) if first < SUITE_MIN_ROUND_S else 1
+    return min(one_round(loops) for _ in range(repeat))
+
+
+def machine_info():
+    """Where a suite run happened; runs are only comparable on the same machine."""
+    jit = ve._jit_kernels(ve.JIT_MIN_ROWS)   # None when the compiled path is off
+    return dict(platform=platform.platform(), processor=platform.processor() or platform.machine(),
+                cpus=os.cpu_count(), python=platform.python_version(), numpy=np.__version__,
+                numba=None if jit is None else jit.numba.__version__)
+
+
+def kernel_suite(max_rows=SUITE_SIZES[-1], repeat=3, seed=0):
+    """Throughput of every lesson kernel at each power of ten up to max_rows."""
+    results = []
+    for name, (make_inputs, fn) in _suite_cases().items():
+        for n in SUITE_SIZES:
+            if n > max_rows:
+                break
+            inputs = make_inputs(np.random.default_rng(seed), min(n, SUITE_CHUNK_ROWS))
+            seconds = _time_rows(fn, inputs, n, repeat)
+            results.append(dict(case=name, rows=n, seconds=seconds,
+                                ns_per_row=seconds / n * 1e9, rows_per_s=n / seconds))
+    return dict(machine=machine_info(), created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                results=results)
+
+
+def compare_with_baseline(run, baseline, tolerance=0.5):
+    """Rows of current vs baseline ns/row.
+
+    "regressed" marks sizes of at least SUITE_GATE_ROWS rows that are slower
+    than the baseline by more than `tolerance`.
+    """
+    stored = {(row["case"], row["rows"]): row for row in baseline["results"]}
+    rows = []
+    for row in run["results"]:
+        before = stored.get((row["case"], row["rows"]))
+        ratio = None if before is None else row["ns_per_row"] / before["ns_per_row"]
+        rows.append(dict(row, baseline_ns_per_row=None if before is None else before["ns_per_row"],
+                         ratio=ratio, regressed=(ratio is not None and ratio > 1.0 + tolerance
+                                                     and row["rows"] >= SUITE_GATE_ROWS)))
+    return rows
+
+
+def _print_suite_table(rows):
+    print(f"{'case':32} {'rows':>11} {'ns/row':>10} {'rows/s':>10} {'baseline':>10} {'ratio':>7}")
+    for row in rows:
+        baseline = "" if row.get("ratio") is None else f"{row['baseline_ns_per_row']:10.2f} {row['ratio']:6.2f}x"
+        flag = "  slower" if row.get("regressed") else ""
+        print(f"{row['case']:32} {row['rows']:>11,} {row['ns_per_row']:10.2f}"
+              f" {row['rows_per_s']:10.3g} {baseline:>18}{flag}")
+
+
+def run_suite(args):
+    run = kernel_suite(args.max_rows, args.repeat)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(run, f, indent=1)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(run, f, indent=1)
+        _print_suite_table(run["results"])
+        return
+    if not os.path.exists(args.baseline):
+        _print_suite_table(run["results"])
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["machine"] != run["machine"]:
+        print(f"Baseline from a different machine: {baseline['machine']}\n")
+    rows = compare_with_baseline(run, baseline, args.tolerance)
+    _print_suite_table(rows)
+    slower = [f"{row['case']} @ {row['rows']:,}" for row in rows if row["regressed"]]
+    if slower:
+        print(f"\nSlower than the baseline by more than {args.tolerance:.0%}: " + "; ".join(slower))
+        return 1
+
+
+def _report_history(args):
+    for name, value in history_benchmark().items():
+        print(f"{name:20} {value:.3g}" if isinstance(value, float) else f"{name:20} {value}")
+
+
+def _report_backtest(args):
+    history_s, shape, timings = backtest_benchmark()
+    print(f"Panels: {shape[0]} months x {shape[1]:,} tickers, built in {history_s:.2f} s\n")
+    print(f"{'rebalance':10} {'seconds':>8} {'CAGR':>7} {'vol':>7} {'max DD':>7} {'turnover':>9} {'positions':>10}")
+    for name, (seconds, rule) in timings.items():
+        print(f"{name:10} {seconds:8.3f} {rule['cagr']:7.2%} {rule['volatility']:7.2%}"
+              f" {rule['max_drawdown']:7.2%} {rule['avg_turnover']:9.2%} {rule['avg_positions']:10,.0f}")
+
+
+def _report_three_way(args):
+    print(f"{'rows':>10} {'one DCF s':>10} {'3 DCFs s':>9} {'3-way s':>8} {'3-way/one':>10}"
+          f" {'max rel err':>12} {'flagged':>8}")
+    for row in three_way_benchmark():
+        print(f"{row['rows']:>10,} {row['one_s']:10.3f} {row['separate_s']:9.3f} {row['three_way_s']:8.3f}"
+              f" {row['three_way_s'] / row['one_s']:9.2f}x {row['max_rel_err']:12.2e} {row['flagged']:8.1%}")
+
+
+def _report_wacc(args):
+    for name, value in wacc_benchmark().items():
+        print(f"{name:20} {value:.3g}" if isinstance(value, float) else f"{name:20} {value:,}")
+
+
+def _report_options(args):
+    closed_form_s, rows = options_benchmark()
+    print(f"Black-Scholes: 1,000,000 options in {closed_form_s:.2f} s\n")
+    print(f"{'options':>8} {'steps':>6} {'numpy s':>8} {'numpy MB':>9} {'jit s':>7}"
+          f" {'ns/node':>8} {'err vs BS':>10} {'early ex.':>10}")
+    fmt = lambda x, spec: "-" if x is None else format(x, spec)
+    for row in rows:
+        print(f"{row['options']:>8,} {row['steps']:>6,} {row['numpy_s']:8.2f} {row['numpy_mb']:9.1f}"
+              f" {fmt(row['jit_s'], '7.2f'):>7} {row['ns_per_node']:8.2f}"
+              f" {row['max_err_vs_closed_form']:10.2e} {row['early_exercise_premium']:10.4f}")
+
+
+def _report_financing(args):
+    print(f"{'paths':>9} {'years':>6} {'seconds':>8} {'ns/path-year':>13} {'vs python':>10}"
+          f" {'max rel err':>12} {'raise':>6} {'dilution':>9}")
+    for row in financing_benchmark():
+        print(f"{row['paths']:>9,} {row['years']:>6} {row['seconds']:8.3f} {row['ns_per_path_year']:13.1f}"
+              f" {row['speedup']:9.0f}x {row['max_rel_err']:12.2e} {row['raise_probability']:6.1%}"
+              f" {row['mean_dilution']:9.1%}")
+
+
+def _report_stress(args):
+    print(f"{'companies':>10} {'cells':>12} {'seconds':>8} {'+sectors s':>11} {'ns/cell':>8}"
+          f" {'peak MB':>8} {'tensor MB':>10} {'max rel err':>12} {'median loss':>12}")
+    for row in stress_benchmark():
+        print(f"{row['companies']:>10,} {row['cells']:>12,} {row['seconds']:8.3f} {row['with_sectors_s']:11.3f}"
+              f" {row['ns_per_cell']:8.2f} {row['peak_mb']:8.0f} {row['tensor_mb']:10.0f}"
+              f" {row['max_rel_err']:12.2e} {row['median_loss']:12.1%}")
+
+
+def _report_jit(args):
+    if ve._jit_kernels(ve.JIT_MIN_ROWS) is None:
+        print("numba is not installed (or VALUATION_JIT=0): only the NumPy path is available.")
+        return
+    first_call_s, rows = jit_benchmark()
+    print(f"First compiled call (compile or cache load): {first_call_s:.2f} s\n")
+    print(f"{'rows':>11} {'numpy s':>8} {'jit s':>7} {'speedup':>8} {'numpy MB':>9} {'jit MB':>7}"
+          f" {'same NaN':>9} {'max abs err':>12} {'err/median':>11}")
+    for row in rows:
+        print(f"{row['rows']:>11,} {row['numpy_s']:8.2f} {row['jit_s']:7.2f} {row['speedup']:7.1f}x"
+              f" {row['numpy_mb']:9.0f} {row['jit_mb']:7.0f} {row['same_nan']!s:>9}"
+              f" {row['max_abs_err']:12.2e} {row['max_err_vs_median']:11.2e}")
+
+
+def _report_ddm(args):
+    print(f"{'case':30} {'rows':>10} {'batch µs':>9} {'python µs':>10} {'speedup':>8} {'max rel err':>12}")
+    for row in ddm_benchmark(args.companies):
+        print(f"{row['case']:30} {row['rows']:>10,} {row['batch_us']:9.3f} {row['python_us']:10.2f}"
+              f" {row['speedup']:7.0f}x {row['max_rel_err']:12.2e}")
+
+
+def _report_peer_stats(args):
+    for name, value in peer_stats_accuracy().items():
+        print(f"{name:24} {value:.3g}")
+
+
+# flag -> (help, report). Every selected flag runs, in this order; with none
+# selected the float64/float32 comparison runs. A report may return an exit
+# status (the suite returns 1 on a regression against its baseline).
+BENCHMARKS = {
+    "suite": ("kernel throughput from 1 to --max-rows rows", run_suite),
+    "peer-stats": ("online peer statistics: tick cost and error vs exact rescans", _report_peer_stats),
+    "ddm": ("batched multi-stage DDMs vs per-row Python", _report_ddm),
+    "jit": ("growth DCF through the NumPy and the compiled (numba) path", _report_jit),
+    "history": ("rolling intrinsic value over 25 years x 5,000 tickers", _report_history),
+    "backtest": ("Value > Price backtest over 30 years x 5,000 tickers", _report_backtest),
+    "three-way": ("FCFF, FCFE and DDM in one pass vs separate schedule DCFs", _report_three_way),
+    "wacc": ("rolling betas and WACC of a memory-mapped return panel", _report_wacc),
+    "options": ("Black-Scholes and binomial lattice throughput", _report_options),
+    "financing": ("capital raises and dilution over scenarios x Monte Carlo paths", _report_financing),
+    "stress": ("macro stress scenarios x cyclical companies x years", _report_stress),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized valuation engine.")
+    parser.add_argument("--companies", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    for flag, (help_text, _) in BENCHMARKS.items():
+        parser.add_argument(f"--{flag}", action="store_true", help=help_text)
+    parser.add_argument("--max-rows", type=int, default=SUITE_SIZES[-1])
+    parser.add_argument("--json", help="write the suite results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="suite run to compare with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this suite run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown against the baseline (0.5 = 50%%)")
+    args = parser.parse_args()
+    selected = [flag for flag in BENCHMARKS if getattr(args, flag.replace("-", "_"))]
+    if not selected:
+        _print_dtype_table(compare_dtypes(args.companies, args.repeat))
+        return
+    status = 0
+    for flag in selected:
+        if len(selected) > 1:
+            print(f"\n== --{flag} ==")
+        status = max(status, BENCHMARKS[flag][1](args) or 0)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import collections
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Persistent valuation result cache
+# =============================================================================
+# Results are stored in a SQLite file in WAL mode, so every Streamlit worker
+# and background job on the host shares them. An entry is keyed by a stable
+# hash of (model name, model version, dtype policy, inputs); array inputs are
+# hashed by dtype, shape and raw bytes, so equal inputs always hit the same
+# entry no matter which process computed it.
+#
+# Bump a model's version in MODELS whenever its formula changes: old entries
+# then stop matching and are purged by `invalidate_stale`. The engine models'
+# stored version also hashes the source of ENGINE_SOURCES, so any edit to the
+# engine (a helper, or the compiled kernels) retires their entries even if
+# nobody bumps the number; job kinds also hash the module that defines them.
+# The file is kept under `max_bytes` by evicting the least recently used
+# entries. The size on disk is summed only every EVICT_CHECK_PUTS puts, or
+# once a process has written EVICT_CHECK_SHARE of the budget since the last
+# check, so a put does not scan the whole table.
+
+STATE_DIR = os.environ.get("VALUATION_STATE_DIR", ".valuation")
+CACHE_DB_PATH = os.path.join(STATE_DIR, "cache.sqlite3")
+CACHE_MAX_BYTES = int(os.environ.get("VALUATION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+EVICT_CHECK_PUTS = 64
+EVICT_CHECK_SHARE = 0.05
+
+# Files whose source is part of every engine model's version.
+ENGINE_SOURCES = ("valuation_engine.py", "valuation_jit.py")
+
+
+def _source_digest(paths):
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as source:
+                digest.update(source.read())
+    return digest.digest()
+
+
+def _engine_sources():
+    folder = os.path.dirname(os.path.abspath(ve.__file__))
+    return _source_digest(os.path.join(folder, name) for name in ENGINE_SOURCES)
+
+
+def engine_version(version, sources=(), _engine=_engine_sources()):
+    """Stored version of an engine model: `version` combined with the engine source.
+
+    `sources` are further files hashed into the version, e.g. the module
+    defining a job kind.
+    """
+    extra = _source_digest(sources) if sources else b""
+    digest = hashlib.blake2b(f"{version}\0".encode() + _engine + extra, digest_size=7)
+    return int.from_bytes(digest.digest(), "big")   # fits SQLite's signed 64-bit INTEGER
+
+
+# name -> (function, version)
+MODELS = {
+    "constant_growth_dcf": (ve.constant_growth_dcf, engine_version(1)),
+    "dcf_schedule": (ve.dcf_schedule, engine_version(2)),
+    "growth_company_dcf": (ve.growth_company_dcf, engine_version(2)),
+    "gordon_ddm": (ve.gordon_ddm, engine_version(1)),
+    "two_stage_ddm": (ve.two_stage_ddm, engine_version(2)),
+    "h_model_ddm": (ve.h_model_ddm, engine_version(1)),
+    "fair_pbv": (ve.fair_pbv, engine_version(1)),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access);
+"""
+
+_MISS = object()
+
+
+def register_model(name, version, fn=None):
+    """Make `name` cacheable; `fn` is needed only for `call`."""
+    MODELS[name] = (fn, version)
+
+
+def _feed(digest, value):
+    if isinstance(value, dict):
+        for name in sorted(value):
+            digest.update(name.encode())
+            _feed(digest, value[name])
+    elif isinstance(value, (list, tuple)) and not all(np.isscalar(x) for x in value):
+        for item in value:
+            _feed(digest, item)
+    elif isinstance(value, str):
+        digest.update(b"s" + value.encode())
+    elif value is None:
+        digest.update(b"n")
+    else:
+        array = np.ascontiguousarray(value)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+
+
+def cache_key(model, version, inputs):
+    """Stable hex key for one model call."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{model}\0{version}\0{ve.get_dtype().name}\0".encode())
+    _feed(digest, inputs)
+    return digest.hexdigest()
+
+
+def _encode(value):
+    # Results are arrays, tuples of arrays or dicts of arrays; npz stores all
+    # three without pickle.
+    if isinstance(value, dict):
+        arrays = {f"d_{name}": array for name, array in value.items()}
+    elif isinstance(value, tuple):
+        arrays = {f"t_{i}": array for i, array in enumerate(value)}
+    else:
+        arrays = {"v": value}
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _decode(blob):
+    with np.load(io.BytesIO(blob)) as data:
+        names = data.files
+        if names == ["v"]:
+            return data["v"]
+        if names[0].startswith("t_"):
+            return tuple(data[f"t_{i}"] for i in range(len(names)))
+        return {name[2:]: data[name] for name in names}
+
+
+class ValuationCache:
+    """Disk-backed result cache shared by all processes using the same file."""
+
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path or CACHE_DB_PATH
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._latencies = collections.deque(maxlen=10_000)
+        self._local = threading.local()
+        self._unchecked_puts = 0
+        self._unchecked_bytes = 0
+
+    def _conn(self):
+        # sqlite3 connections must stay in the thread that created them.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, model, inputs, default=None):
+        start = time.perf_counter()
+        key = cache_key(model, MODELS[model][1], inputs)
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE results SET last_access=? WHERE key=?", (time.time(), key))
+            value = _decode(row[0])
+            self.hits += 1
+        else:
+            value = _MISS
+            self.misses += 1
+        self._latencies.append(time.perf_counter() - start)
+        return default if value is _MISS else value
+
+    def put(self, model, inputs, value):
+        version = MODELS[model][1]
+        blob = _encode(value)
+        if len(blob) > self.max_bytes:
+            return
+        self._conn().execute(
+            "INSERT OR REPLACE INTO results (key, model, version, value, size, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (cache_key(model, version, inputs), model, version, blob, len(blob), time.time()))
+        self._unchecked_puts += 1
+        self._unchecked_bytes += len(blob)
+        if (self._unchecked_puts >= EVICT_CHECK_PUTS
+                or self._unchecked_bytes >= EVICT_CHECK_SHARE * self.max_bytes):
+            self._evict()
+
+    def call(self, model, **inputs):
+        """Return the cached result of MODELS[model] for these inputs, computing it on a miss."""
+        value = self.get(model, inputs, _MISS)
+        if value is _MISS:
+            value = MODELS[model][0](**inputs)
+            self.put(model, inputs, value)
+        return value
+
+    def _evict(self):
+        self._unchecked_puts = self._unchecked_bytes = 0
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until 90% of the budget is left.
+        excess = total - int(0.9 * self.max_bytes)
+        rows = conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall()
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM results WHERE key=?", victims)
+
+    def invalidate(self, model=None):
+        """Drop every entry, or only those of `model`."""
+        if model is None:
+            self._conn().execute("DELETE FROM results")
+        else:
+            self._conn().execute("DELETE FROM results WHERE model=?", (model,))
+
+    def invalidate_stale(self):
+        """Drop entries written by other versions of the models registered here.
+
+        Models this process does not know (e.g. job kinds registered by
+        valuation_jobs in another process) are left alone.
+        """
+        conn = self._conn()
+        stale = 0
+        for model, version in conn.execute("SELECT DISTINCT model, version FROM results").fetchall():
+            if model in MODELS and MODELS[model][1] != version:
+                stale += conn.execute("DELETE FROM results WHERE model=? AND version=?",
+                                      (model, version)).rowcount
+        return stale
+
+    def stats(self):
+        """Hit rate and lookup latency of this process, plus the size on disk."""
+        lookups = self.hits + self.misses
+        latencies = np.array(self._latencies) * 1000 if self._latencies else np.zeros(1)
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return dict(lookups=lookups, hits=self.hits, misses=self.misses,
+                    hit_rate=self.hits / lookups if lookups else 0.0,
+                    mean_lookup_ms=float(latencies.mean()),
+                    p95_lookup_ms=float(np.percentile(latencies, 95)),
+                    entries=entries, size_mb=size / 1e6)
+
+
+_DEFAULT = None
+
+
+def default_cache():
+    """Process-wide cache on CACHE_DB_PATH; stale versions are purged on first use."""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = ValuationCache()
+        _DEFAULT.invalidate_stale()
+    return _DEFAULT
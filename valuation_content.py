@@ -0,0 +1,47 @@
+import functools
+import os
+import re
+
+# =============================================================================
+# Static lesson content
+# =============================================================================
+# The explanatory text of valuation_small.py (headings, tables, LaTeX) lives in
+# content/<page>.md instead of in dozens of st.title / st.header /
+# st.markdown("---") calls. A page file is split into named blocks:
+#
+#     <!-- block: price-vs-value -->
+#     ## Price vs. Value
+#     ...
+#
+# Each block is one run of static text between two interactive elements and is
+# sent as a single st.markdown element. Files are parsed once per process and
+# the finished markdown strings are kept in memory; editing a file (a new
+# modification time) reloads it on the next rerun.
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+
+_BLOCK = re.compile(r"^<!-- block: ([\w-]+) -->\n", re.MULTILINE)
+
+
+def load(page):
+    """Named markdown blocks of content/<page>.md, ready for st.markdown."""
+    return _parse(*_key(page))
+
+
+def _key(page):
+    path = os.path.join(CONTENT_DIR, page + ".md")
+    return path, os.stat(path).st_mtime_ns
+
+
+@functools.lru_cache(maxsize=None)
+def _parse(path, mtime_ns):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    parts = _BLOCK.split(text)
+    # parts = [preamble, name1, text1, name2, text2, ...]
+    blocks = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        if name in blocks:
+            raise ValueError(f"{path} defines block {name!r} twice.")
+        blocks[name] = body.strip()
+    return blocks
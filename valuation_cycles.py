@@ -0,0 +1,159 @@
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Cycle detection and phase tagging
+# =============================================================================
+# Lesson 5 asks where a cyclical company stands in its cycle. For a panel of
+# earnings (or revenue) histories, one row per company, detect_cycles
+#
+#   1. removes a linear trend from every row (closed-form least squares),
+#   2. finds the dominant cycle length from a zero-padded FFT periodogram,
+#   3. fits a sine wave of that length to the detrended history and reads the
+#      current phase from its angle at the last observation.
+#
+# The phase follows the four market seasons of lesson 5:
+#   expansion - above trend and rising     peak     - above trend and falling
+#   recession - below trend and falling    recovery - below trend and rising
+#
+# Every step is a vectorized operation over the whole panel; NaN marks a
+# missing year (e.g. a shorter history). A row with fewer valid years than
+# two of the shortest cycles, or without any variation around its trend,
+# gets no cycle: NaN results and phase NO_PHASE.
+
+PHASES = ("expansion", "peak", "recession", "recovery")
+NO_PHASE = len(PHASES)                             # phase of a row without a cycle
+PHASE_LABELS = PHASES + ("insufficient data",)     # indexable by any phase, NO_PHASE included
+CHUNK_ROWS = 50_000
+
+
+def detect_cycles(history, min_period=3, max_period=None, pad=8):
+    """Cycle length, current phase and normalized earnings per company.
+
+    history:    (n, T) or (T,) values per period, oldest first.
+    min_period: shortest cycle considered, in periods.
+    max_period: longest cycle considered (default: T / 2, two full cycles).
+    pad:        zero-padding factor of the FFT; finer cycle-length resolution.
+
+    Returns a dict of (n,) arrays: "period" (cycle length), "phase" (index
+    into PHASES, or NO_PHASE), "progress" (position in the cycle, 0 = peak, 0.5 = trough),
+    "strength" (share of the detrended variance the cycle explains),
+    "amplitude", "trend" (trend value at the last period) and "normalized"
+    (mean over the last full cycle, the lesson's normalized profit). Rows
+    with fewer than 2 * min_period valid values, or flat around their
+    trend, are NaN with phase NO_PHASE.
+    """
+    history = np.asarray(history, dtype=np.float64)
+    history = history[None, :] if history.ndim == 1 else history
+    n, length = history.shape
+    max_period = length / 2 if max_period is None else max_period
+    result = {name: np.empty(n) for name in
+              ("period", "progress", "strength", "amplitude", "trend", "normalized")}
+    result["phase"] = np.empty(n, dtype=np.int64)
+    for start in range(0, n, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, n)
+        for name, values in _detect(history[start:stop], min_period, max_period, pad).items():
+            result[name][start:stop] = values
+    return result
+
+
+def _detect(history, min_period, max_period, pad):
+    n, length = history.shape
+    t = np.arange(length, dtype=np.float64)
+    valid = np.isfinite(history)
+    y = np.where(valid, history, 0.0)
+    count = valid.sum(axis=1)
+    enough = count >= 2 * min_period
+
+    # 1. Linear trend per row from the masked normal equations.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_mean = (valid * t).sum(axis=1) / count
+        y_mean = y.sum(axis=1) / count
+        tc = np.where(valid, t - t_mean[:, None], 0.0)
+        slope = (tc * y).sum(axis=1) / (tc ** 2).sum(axis=1)
+    slope = np.nan_to_num(slope)
+    trend = y_mean[:, None] + slope[:, None] * (t - t_mean[:, None])
+    detrended = np.where(valid, y - trend, 0.0)
+
+    # 2. Dominant frequency within the allowed cycle lengths.
+    n_fft = pad * length
+    power = np.abs(np.fft.rfft(detrended, n=n_fft, axis=1)) ** 2
+    freq = np.fft.rfftfreq(n_fft)
+    allowed = (freq >= 1.0 / max_period) & (freq <= 1.0 / min_period)
+    if not allowed.any():
+        raise ValueError(f"No cycle length between {min_period} and {max_period} fits a history of {length} periods.")
+    best = np.argmax(np.where(allowed, power, -1.0), axis=1)
+    omega = 2 * np.pi * freq[best]
+
+    # 3. Least-squares sine wave a*cos + b*sin at that frequency.
+    angle = omega[:, None] * t
+    cos, sin = np.where(valid, np.cos(angle), 0.0), np.where(valid, np.sin(angle), 0.0)
+    scc, sss, scs = (cos * cos).sum(axis=1), (sin * sin).sum(axis=1), (cos * sin).sum(axis=1)
+    syc, sys_ = (detrended * cos).sum(axis=1), (detrended * sin).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        det = scc * sss - scs ** 2
+        a = (syc * sss - sys_ * scs) / det
+        b = (sys_ * scc - syc * scs) / det
+        fitted = a[:, None] * cos + b[:, None] * sin
+        ss_total = (detrended ** 2).sum(axis=1)
+        strength = 1.0 - ((detrended - fitted) ** 2).sum(axis=1) / ss_total
+
+    # The cycle is amplitude * cos(theta) with theta = 0 at the peak; its
+    # slope is -sin(theta), so the quadrants of theta are the four seasons.
+    theta = np.mod(omega * (length - 1) - np.arctan2(b, a), 2 * np.pi)
+    # No cycle without enough years, or in a history without ups and downs.
+    ok = enough & np.isfinite(theta) & np.isfinite(strength)
+    quadrant = np.floor(np.mod(np.where(ok, theta, 0.0) + np.pi / 2, 2 * np.pi) / (np.pi / 2))
+    phase = np.where(ok, quadrant.astype(np.int64) % 4, NO_PHASE)
+
+    # Normalized value: mean of the last full cycle (NaN-aware running sums).
+    window = np.clip(np.rint(1.0 / freq[best]).astype(np.int64), 1, length)
+    recent = valid[:, ::-1].cumsum(axis=1)
+    totals = y[:, ::-1].cumsum(axis=1)
+    rows = np.arange(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = totals[rows, window - 1] / recent[rows, window - 1]
+
+    result = dict(period=1.0 / freq[best], progress=theta / (2 * np.pi), strength=strength,
+                  amplitude=np.hypot(a, b), trend=trend[:, -1], normalized=normalized)
+    result = {name: np.where(ok, values, np.nan) for name, values in result.items()}
+    result["phase"] = phase
+    return result
+
+
+def cycle_normalized_pe(history, current_pe, **kwargs):
+    """Normalized P/E on the detected full-cycle average (lesson 5).
+
+    The current profit is the last value of each history. Returns the
+    normalized P/E and the detect_cycles result it is based on.
+    """
+    history = np.asarray(history, dtype=np.float64)
+    history = history[None, :] if history.ndim == 1 else history
+    cycles = detect_cycles(history, **kwargs)
+    return ve.normalized_pe(history[:, -1], current_pe, cycles["normalized"]), cycles
+
+
+def phase_peer_median(values, sectors, phase):
+    """Median of `values` among companies in the same sector AND cycle phase.
+
+    Lesson 5: compare cyclicals only with peers at the same point in the
+    cycle. NaN values are ignored; companies whose group has no valid value,
+    or without a phase (NO_PHASE), get NaN.
+    """
+    phase = np.asarray(phase)
+    values = np.where(phase == NO_PHASE, np.nan, np.asarray(values, dtype=np.float64))
+    _, sector_codes = np.unique(np.asarray(sectors), return_inverse=True)
+    group = sector_codes.ravel() * len(PHASE_LABELS) + phase
+    n_groups = (sector_codes.max() + 1) * len(PHASE_LABELS) if values.size else 0
+    ok = np.isfinite(values)
+    order = np.lexsort((values[ok], group[ok]))
+    sorted_values, sorted_groups = values[ok][order], group[ok][order]
+    counts = np.bincount(sorted_groups, minlength=n_groups)
+    first = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lower = first + (counts - 1) // 2
+    upper = first + counts // 2
+    medians = np.full(n_groups, np.nan)
+    has = counts > 0
+    medians[has] = 0.5 * (sorted_values[lower[has]] + sorted_values[upper[has]])
+    return medians[group]
@@ -0,0 +1,137 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# =============================================================================
+# Arrow / Parquet export of valuation results
+# =============================================================================
+# Record batches are built straight from the arrays returned by
+# valuation_engine.dcf_schedule, without Python lists. A column whose NumPy
+# array is contiguous and already has the schema's type (float64 results
+# under the default dtype policy, int64 lengths) is wrapped by Arrow without
+# a copy. The other columns cost one vectorized copy each: float32 results
+# are widened to the float64 schema, the company and year ids are generated,
+# and ragged schedules (companies with different horizons) are compacted to
+# drop the padding.
+#
+# Two tables are produced:
+#   - summary:  one row per company (pv, terminal value, intrinsic value)
+#   - schedule: one row per company and year (cash flow, discount factor, PV)
+# Files ending in .parquet are written as Parquet, anything else (.arrow,
+# .feather, .ipc) as the Arrow IPC file format.
+
+SUMMARY_SCHEMA = pa.schema([
+    ("company_id", pa.int64()),
+    ("years", pa.int64()),
+    ("pv", pa.float64()),
+    ("terminal_value", pa.float64()),
+    ("terminal_value_pv", pa.float64()),
+    ("intrinsic_value", pa.float64()),
+])
+
+SCHEDULE_SCHEMA = pa.schema([
+    ("company_id", pa.int64()),
+    ("year", pa.int32()),
+    ("cash_flow", pa.float64()),
+    ("discount_factor", pa.float64()),
+    ("present_value", pa.float64()),
+])
+
+
+def _column(values, arrow_type):
+    # No-op for a contiguous array of the right type, which pa.array then
+    # wraps without a copy; NaN stays a float, not a null (from_pandas=False).
+    values = np.ascontiguousarray(values, dtype=arrow_type.to_pandas_dtype())
+    return pa.array(values, type=arrow_type, from_pandas=False)
+
+
+def summary_batch(schedule, first_company=0):
+    """One-row-per-company record batch; ids start at `first_company`."""
+    n = schedule["pv"].shape[0]
+    columns = [np.arange(first_company, first_company + n), schedule["lengths"],
+               schedule["pv"], schedule["terminal_value"], schedule["terminal_value_pv"],
+               schedule["intrinsic_value"]]
+    return pa.RecordBatch.from_arrays(
+        [_column(values, field.type) for values, field in zip(columns, SUMMARY_SCHEMA)],
+        schema=SUMMARY_SCHEMA)
+
+
+def schedule_batch(schedule, first_company=0):
+    """One-row-per-company-and-year record batch without the padded years."""
+    n, horizon = schedule["cash_flow"].shape
+    lengths = schedule["lengths"]
+    company = np.repeat(np.arange(first_company, first_company + n), horizon)
+    year = np.tile(np.arange(1, horizon + 1, dtype=np.int32), n)
+    columns = [company, year, schedule["cash_flow"].ravel(),
+               schedule["discount_factor"].ravel(), schedule["present_value"].ravel()]
+    if (lengths < horizon).any():
+        keep = (np.arange(1, horizon + 1)[None, :] <= lengths[:, None]).ravel()
+        columns = [values[keep] for values in columns]
+    return pa.RecordBatch.from_arrays(
+        [_column(values, field.type) for values, field in zip(columns, SCHEDULE_SCHEMA)],
+        schema=SCHEDULE_SCHEMA)
+
+
+class BatchWriter:
+    """Stream record batches into a Parquet or Arrow IPC file.
+
+    Use as a context manager and call `write(batch)` once per chunk, so a
+    large universe never has to be held in memory as a single table.
+    """
+
+    def __init__(self, sink, schema, format=None):
+        if format is None:
+            format = "parquet" if str(sink).endswith(".parquet") else "arrow"
+        if format not in ("parquet", "arrow"):
+            raise ValueError(f"Unknown export format: {format!r}")
+        self.schema = schema
+        self.path = sink if isinstance(sink, str) else None
+        if format == "parquet":
+            self._writer = pq.ParquetWriter(sink, schema)
+        else:
+            self._writer = ipc.new_file(sink, schema)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_schedules(schedules, summary_path=None, schedule_path=None):
+    """Write an iterable of dcf_schedule chunks to summary and/or schedule files.
+
+    Company ids continue across chunks. Returns the number of companies written.
+    """
+    writers = []
+    if summary_path:
+        writers.append((BatchWriter(summary_path, SUMMARY_SCHEMA), summary_batch))
+    if schedule_path:
+        writers.append((BatchWriter(schedule_path, SCHEDULE_SCHEMA), schedule_batch))
+    written = 0
+    try:
+        for schedule in schedules:
+            for writer, make_batch in writers:
+                writer.write(make_batch(schedule, written))
+            written += schedule["pv"].shape[0]
+    finally:
+        for writer, _ in writers:
+            writer.close()
+    return written
+
+
+def to_bytes(batch, format="parquet"):
+    """Serialize one record batch in memory, e.g. for st.download_button."""
+    sink = io.BytesIO()
+    with BatchWriter(sink, batch.schema, format) as writer:
+        writer.write(batch)
+    return sink.getvalue()
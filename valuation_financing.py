@@ -0,0 +1,169 @@
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Financing and dilution of a cash-burning company
+# =============================================================================
+# Lesson 3 warns that a growth company may need to raise capital, and that
+# raises dilute the shareholders. The plain DCF only discounts the negative
+# startup cash flows; here the cash they consume is tracked explicitly:
+#
+#   - The balance starts at `initial_cash`, earns `cash_rate` and moves
+#     with each year's free cash flow.
+#   - When a year ends below `min_cash`, the company raises `raise_amount`
+#     (or the shortfall, if larger) at that year's issue price, so new
+#     shares = amount / price.
+#   - The equity is worth the DCF of the operating cash flows plus the cash
+#     on hand plus the present value of every raise (cash kept in the firm is
+#     valued as if it earned the discount rate), shared by all the shares
+#     outstanding at the end. Raising at the shares' fair value leaves the
+#     value per share unchanged; raising below it transfers value from the
+#     existing shareholders to the new ones.
+#
+# The simulation steps through the years, but each step works on every path
+# at once, so scenarios x Monte Carlo paths (any leading axes of the cash
+# flows) cost one loop over a few dozen years. 100,000 paths of 30 years take
+# a fraction of a second; valuation_bench.py --financing measures it.
+
+DEFAULT_PATHS = 1_000
+CHUNK_PATHS = 16_384   # paths per block of the simulation (~4.5 MB per yearly array at 35 years)
+
+
+def simulate_financing(cash_flows, rate, terminal_growth, initial_cash, shares, min_cash,
+                       raise_amount, price, cash_rate=0.0, lengths=None):
+    """Cash balance, capital raises and value per share of every cash-flow path.
+
+    cash_flows:   (..., years) free cash flows; the leading axes are paths
+                  (e.g. scenarios x Monte Carlo draws), zero-padded after
+                  each path's horizon given by `lengths`.
+    initial_cash, shares: cash and shares outstanding today.
+    min_cash:     balance below which a year-end triggers a raise.
+    raise_amount: size of a round; a larger shortfall is raised in full.
+    price:        issue price per share, broadcast with `cash_flows`
+                  (e.g. a (years,) schedule, or one per path and year).
+    Per-path inputs (rate, terminal_growth, initial_cash, shares, min_cash,
+    raise_amount, lengths) broadcast with the leading axes, so a scenario
+    axis may come from any input (e.g. a (scenarios, 1) rate against
+    (paths, years) cash flows).
+
+    Returns a dict with the (..., years) "cash" (after raises), "raised" and
+    "shares", and per path "rounds", "total_raised", "first_raise" (year,
+    NaN when none), "peak_burn" (largest cumulative cash consumed),
+    "intrinsic_value" (DCF of the cash flows), "equity_value",
+    "value_per_share", "value_per_share_undiluted" (DCF plus cash over
+    today's shares) and "dilution" (share of the company sold).
+    """
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    horizon = cash_flows.shape[-1]
+    inputs = dict(rate=rate, terminal_growth=terminal_growth, initial_cash=initial_cash,
+                  shares=shares, min_cash=min_cash, raise_amount=raise_amount,
+                  lengths=horizon if lengths is None else lengths)
+    lead = np.broadcast_shapes(cash_flows.shape[:-1], price.shape[:-1],
+                               *(np.shape(x) for x in inputs.values()))
+    n = int(np.prod(lead))
+    # Everything runs year-major: (years, paths) arrays, with the paths of
+    # the leading axes in Fortran order, so the results are views of the
+    # simulation's buffers and every step of the yearly loop works on
+    # contiguous rows.
+    year_major = lambda x: np.moveaxis(np.broadcast_to(x, lead + (horizon,)), -1, 0).reshape(
+        (horizon, n), order="F")
+    flows = np.ascontiguousarray(year_major(cash_flows))
+    price = year_major(price)
+    if not (price > 0).all():
+        raise ValueError("Issue prices must be positive.")
+    inputs = {name: np.broadcast_to(np.asarray(x, dtype=np.int64 if name == "lengths" else np.float64),
+                                    lead).ravel(order="F") for name, x in inputs.items()}
+    yearly = {name: np.empty((horizon, n)) for name in ("cash", "raised", "shares")}
+    totals = {name: np.empty(n, dtype=np.int64 if name == "rounds" else np.float64)
+              for name in ("rounds", "total_raised", "first_raise", "peak_burn", "intrinsic_value",
+                           "equity_value", "value_per_share", "value_per_share_undiluted",
+                           "dilution")}
+    # Blocks of paths small enough for the yearly loop to stay in cache.
+    for start in range(0, n, CHUNK_PATHS):
+        paths = slice(start, start + CHUNK_PATHS)
+        _simulate_block(flows[:, paths], price[:, paths], cash_rate,
+                        {name: x[:, paths] for name, x in yearly.items()},
+                        {name: x[paths] for name, x in totals.items()},
+                        **{name: x[paths] for name, x in inputs.items()})
+    result = {name: x.reshape(lead, order="F") for name, x in totals.items()}
+    result.update((name, x.T.reshape(lead + (horizon,), order="F")) for name, x in yearly.items())
+    return result
+
+
+def _simulate_block(flows, price, cash_rate, yearly, totals, lengths, rate, terminal_growth,
+                    initial_cash, shares, min_cash, raise_amount):
+    # One block of paths: (years, paths) inputs, results written to the
+    # `yearly` and `totals` views.
+    horizon, n = flows.shape
+    cash, raised, outstanding = yearly["cash"], yearly["raised"], yearly["shares"]
+    balance = initial_cash.copy()
+    count = shares.copy()
+    consumed, peak_burn = np.zeros(n), totals["peak_burn"]
+    peak_burn[:] = 0.0
+    short = np.empty(n, dtype=bool)
+    # The DCF of the cash flows and of the raises accumulates in the same
+    # loop (cash flows are zero after each path's horizon).
+    discount = 1.0 / (1.0 + rate)
+    factor = np.ones(n)
+    pv, raised_pv, scratch = np.zeros(n), np.zeros(n), np.empty(n)
+    for t in range(horizon):
+        factor *= discount
+        if cash_rate:
+            balance *= 1.0 + cash_rate
+        balance += flows[t]
+        consumed -= flows[t]
+        np.maximum(peak_burn, consumed, out=peak_burn)
+        pv += np.multiply(flows[t], factor, out=scratch)
+        amount = raised[t]
+        np.subtract(min_cash, balance, out=amount)
+        np.greater(amount, 0.0, out=short)
+        short &= t < lengths
+        np.maximum(amount, raise_amount, out=amount)
+        amount *= short
+        balance += amount
+        cash[t] = balance
+        raised_pv += np.multiply(amount, factor, out=scratch)
+        np.divide(amount, price[t], out=outstanding[t])
+        count += outstanding[t]
+        outstanding[t] = count
+
+    last = flows[np.maximum(lengths - 1, 0), np.arange(n)]
+    intrinsic = pv + ve.terminal_value(last, rate, terminal_growth) * ve.discount_factor_at(rate, lengths)
+    equity = intrinsic + initial_cash + raised_pv
+    rounds = np.count_nonzero(raised, axis=0)
+    for name, value in dict(
+            rounds=rounds, total_raised=raised.sum(axis=0),
+            first_raise=np.where(rounds > 0, np.argmax(raised > 0, axis=0) + 1.0, np.nan),
+            intrinsic_value=intrinsic, equity_value=equity, value_per_share=equity / count,
+            value_per_share_undiluted=(intrinsic + initial_cash) / shares,
+            dilution=1.0 - shares / count).items():
+        totals[name][:] = value
+
+
+def sample_cash_flows(startup_years, expansion_years, maturity_years, startup_cf,
+                      expansion_initial_cf, expansion_growth, maturity_growth,
+                      n_paths=DEFAULT_PATHS, volatility=0.25, max_delay=2, seed=0):
+    """Monte Carlo cash-flow paths of the three-phase growth company (lesson 3).
+
+    Inputs are scalars or (scenarios,) arrays, as for
+    valuation_engine.three_phase_cash_flows. Each path stays in the startup
+    phase 0 to `max_delay` extra years (uniformly), and every year's cash
+    flow is scaled by a lognormal shock of mean 1 and `volatility`.
+
+    Returns (cash_flows, lengths) shaped (scenarios, n_paths, years) and
+    (scenarios, n_paths).
+    """
+    if max_delay < 0:
+        raise ValueError("max_delay must be at least 0.")
+    inputs = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x)) for x in (
+        startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf,
+        expansion_growth, maturity_growth)))
+    n_scenarios = inputs[0].shape[0]
+    rng = np.random.default_rng(seed)
+    repeated = [np.repeat(x, n_paths) for x in inputs]
+    repeated[0] = repeated[0] + rng.integers(0, max_delay + 1, n_scenarios * n_paths)
+    cash_flows, lengths = ve.three_phase_cash_flows(*repeated)
+    cash_flows *= rng.lognormal(-0.5 * volatility ** 2, volatility, cash_flows.shape)
+    return (cash_flows.reshape(n_scenarios, n_paths, -1), lengths.reshape(n_scenarios, n_paths))
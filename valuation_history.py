@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+import valuation_engine as ve
+
+# =============================================================================
+# Rolling intrinsic value through history
+# =============================================================================
+# Lesson 0 compares price with value over time. To draw a real intrinsic-value
+# line, the DCF is re-run at every historical date with only the fundamentals
+# that had been published by that date (no look-ahead):
+#
+#   1. point_in_time turns a table of reports (ticker, publication date,
+#      value) into a (dates, tickers) panel holding the latest value known at
+#      each date: one np.searchsorted over (ticker, date) keys for the whole
+#      panel, no per-date loop.
+#   2. rolling_intrinsic_value estimates each cell's growth from the FCF
+#      known `lookback` months earlier and values every cell with the
+#      two-stage model (high growth for `high_years`, then a Gordon terminal
+#      value at the stable growth) in one call on the (dates, tickers) panel.
+#
+# 25 years of monthly dates x 5,000 tickers (1.5M cells) take well under a
+# second; valuation_bench.py --history measures it.
+
+MONTHS_PER_YEAR = 12
+
+
+def _days(dates):
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def point_in_time(tickers, report_dates, values, universe, dates, lag_days=0):
+    """(len(dates), len(universe)) panel of the latest report known at each date.
+
+    tickers, report_dates, values: one entry per report (any order).
+    universe: the panel's columns; reports of other tickers are ignored.
+    dates:    the panel's rows (datetime64 or date strings).
+    lag_days: days between a report date and the day it becomes known; use
+              it when `report_dates` are period ends rather than filing dates.
+
+    Cells before a ticker's first report are NaN. When two reports share a
+    date, the later one in the input wins.
+    """
+    universe = np.asarray(universe)
+    sorter = np.argsort(universe, kind="stable")
+    position = np.searchsorted(universe, np.asarray(tickers), sorter=sorter)
+    position = np.minimum(position, len(universe) - 1)
+    column = sorter[position]
+    known = universe[column] == np.asarray(tickers)
+
+    report_day = _days(report_dates)[known] + lag_days
+    day = _days(dates)
+    first = min(report_day.min(initial=day.min()), day.min())
+    span = max(report_day.max(initial=day.max()), day.max()) - first + 1
+    # One sortable key per report and per panel cell: column * span + day.
+    report_key = column[known] * span + (report_day - first)
+    order = np.argsort(report_key, kind="stable")
+    report_key = report_key[order]
+    report_value = np.asarray(values, dtype=np.float64)[known][order]
+
+    columns = np.arange(len(universe))
+    cell_key = columns[None, :] * span + (day - first)[:, None]
+    latest = np.searchsorted(report_key, cell_key, side="right") - 1
+    found = latest >= 0
+    latest = np.maximum(latest, 0)
+    found &= report_key[latest] // span == columns[None, :]
+    return np.where(found, report_value[latest], np.nan)
+
+
+def rolling_intrinsic_value(fcf, rate, stable_growth, high_years=5, lookback=36,
+                            growth_bounds=(-0.05, 0.15)):
+    """Two-stage DCF value per cell of a monthly point-in-time FCF panel.
+
+    fcf:           (dates, tickers) FCF per share known at each month-end, one
+                   row per consecutive month (the lookback is a row offset).
+    rate:          discount rate(s) as decimals, broadcastable to fcf.
+    stable_growth: growth after `high_years`, broadcastable to fcf.
+    lookback:      months between the two FCF readings of the growth estimate
+                   (at least 1).
+    growth_bounds: the annualized growth estimate is clipped to this range;
+                   cells without an estimate (no earlier reading, or a
+                   non-positive FCF) use the stable growth.
+
+    Returns a dict of (dates, tickers) arrays "value" (NaN where FCF is not
+    positive or rate <= stable growth) and "growth" (the estimate used).
+    """
+    if lookback < 1:
+        raise ValueError("The growth lookback must be at least 1 month.")
+    fcf = np.asarray(fcf, dtype=np.float64)
+    earlier = np.full_like(fcf, np.nan)
+    earlier[lookback:] = fcf[:-lookback]
+    stable = np.broadcast_to(np.asarray(stable_growth, dtype=np.float64), fcf.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (fcf / earlier) ** (MONTHS_PER_YEAR / lookback) - 1.0
+    estimated = (fcf > 0) & (earlier > 0)
+    growth = np.where(estimated, np.clip(growth, *growth_bounds), stable)
+    value = ve.two_stage_ddm(fcf, rate, growth, high_years, stable)[2].reshape(fcf.shape)
+    return dict(value=np.where(fcf > 0, value, np.nan), growth=growth)
+
+
+def intrinsic_value_history(prices, fundamentals, rate, stable_growth, high_years=5,
+                            lookback=36, lag_days=0):
+    """Monthly price and rolling intrinsic-value panels from long tables.
+
+    prices:       DataFrame with "date", "ticker", "price" (any frequency;
+                  the last price of each month is used).
+    fundamentals: DataFrame with "ticker", "report_date", "fcf_per_share".
+
+    Returns (dates, tickers, price panel, value panel); the panels have one
+    row per month-end from the first to the last month of `prices` (NaN
+    prices in months without any) and one column per ticker of `prices`.
+    """
+    missing = [c for c in ("date", "ticker", "price") if c not in prices] + [
+        c for c in ("ticker", "report_date", "fcf_per_share") if c not in fundamentals]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if len(prices) == 0:
+        raise ValueError("No prices.")
+    # Pivot to (month, ticker) without pandas' pivot: the last price of each
+    # month wins. The rows are every month of the range, so a month missing
+    # from the file is a NaN row and the lookback still spans `lookback`
+    # calendar months.
+    day = pd.to_datetime(prices["date"]).to_numpy(dtype="datetime64[D]")
+    month = day.astype("datetime64[M]")
+    months = np.arange(month.min(), month.max() + 1)
+    row = (month - months[0]).astype(np.int64)
+    column, tickers = pd.factorize(prices["ticker"], sort=True)
+    tickers = np.asarray(tickers)
+    cell = row * len(tickers) + column
+    order = np.lexsort((day, cell))
+    last = order[np.r_[cell[order][1:] != cell[order][:-1], True]]
+    price_panel = np.full((len(months), len(tickers)), np.nan)
+    price_panel.ravel()[cell[last]] = prices["price"].to_numpy(dtype=np.float64)[last]
+    dates = (months + 1).astype("datetime64[D]") - 1
+    fcf = point_in_time(fundamentals["ticker"].to_numpy(),
+                        pd.to_datetime(fundamentals["report_date"]).to_numpy(),
+                        fundamentals["fcf_per_share"].to_numpy(), tickers, dates, lag_days)
+    value = rolling_intrinsic_value(fcf, rate, stable_growth, high_years, lookback)["value"]
+    return dates, tickers, price_panel, value
+
+
+def sample_history(n_tickers=50, years=25, seed=0):
+    """Synthetic monthly prices and annual FCF reports, for demos and benchmarks.
+
+    FCF per share follows a random walk in its growth rate and is reported
+    60 days after each fiscal year end; prices wander around a simple value
+    of that FCF. Returns (prices, fundamentals) as long DataFrames.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.char.add("TICK", np.arange(n_tickers).astype(str))
+    growth = np.clip(rng.normal(0.06, 0.04, n_tickers)[None, :]
+                     + np.cumsum(rng.normal(0.0, 0.02, (years, n_tickers)), axis=0), -0.2, 0.3)
+    fcf = rng.lognormal(np.log(3.0), 0.5, n_tickers) * np.cumprod(1.0 + growth, axis=0)
+    year_ends = np.arange(years).astype("datetime64[Y]") + (2000 - 1970)
+    report_dates = year_ends.astype("datetime64[D]") + 365 + 60
+    fundamentals = pd.DataFrame({
+        "ticker": np.tile(tickers, years),
+        "report_date": np.repeat(report_dates, n_tickers),
+        "fcf_per_share": fcf.ravel(),
+    })
+
+    months = years * MONTHS_PER_YEAR
+    month_ends = ((np.arange(months) + (2000 - 1970) * 12 + 1).astype("datetime64[M]")
+                  .astype("datetime64[D]") - 1)
+    fair = np.repeat(fcf / 0.07, MONTHS_PER_YEAR, axis=0)
+    # Mispricing as an AR(1) in logs: prices drift away from and back to value.
+    shocks = rng.normal(0.0, 0.06, (months, n_tickers))
+    mispricing = np.empty_like(shocks)
+    mispricing[0] = shocks[0]
+    for m in range(1, months):
+        mispricing[m] = 0.95 * mispricing[m - 1] + shocks[m]
+    prices = pd.DataFrame({
+        "date": np.repeat(month_ends, n_tickers),
+        "ticker": np.tile(tickers, months),
+        "price": (fair * np.exp(mispricing)).ravel(),
+    })
+    return prices, fundamentals
@@ -0,0 +1,130 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# =============================================================================
+# Startup budget for the app scripts
+# =============================================================================
+# Usage: python valuation_importtime.py [script.py ...] [--repeat K] [--no-budget]
+#
+# Every script is executed once in a fresh interpreter under
+# `python -X importtime`, in Streamlit's bare mode (widgets return their
+# defaults, nothing is served). The importtime log is split at a marker
+# written right after `import streamlit`, so the script is charged only for
+# the modules its own default code path pulls in (numpy, pandas, pyarrow, the
+# valuation_* engines, and whatever Streamlit loads lazily for the elements it
+# renders). Streamlit's own import is reported separately, since every page
+# pays it once per server process.
+#
+# The best of `--repeat` runs is compared with STARTUP_BUDGET_MS; the exit
+# status is 1 when a script is over budget.
+
+MARKER = "valuation-importtime-marker"
+
+# Script imports + run time on the default code path, in milliseconds. Pages
+# whose default path renders only text and number widgets load neither numpy
+# nor pandas (~30 ms); the remaining heavy imports are there because the
+# default path draws a chart or table (pandas, altair; lesson 1's cash-flow
+# grid is an editable table) or computes with numpy.
+STARTUP_BUDGET_MS = {
+    "valuation_intro_00.py": 1500,
+    "valuation_intro_01.py": 900,
+    "valuation_intro_02.py": 400,
+    "valuation_intro_03.py": 150,
+    "valuation_intro_04.py": 900,
+    "valuation_intro_05.py": 150,
+    "valuation_intro_06.py": 150,
+    "valuation_small.py": 1500,
+    "valuation_lab.py": 1000,
+}
+
+_RUNNER = f"""
+import logging, runpy, sys, time
+logging.disable(logging.CRITICAL)
+start = time.perf_counter()
+import streamlit
+sys.stderr.write("{MARKER} %f\\n" % (time.perf_counter() - start))
+sys.stderr.flush()
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name="__main__")
+sys.stderr.write("{MARKER} %f\\n" % (time.perf_counter() - start))
+"""
+
+
+def parse_importtime(lines):
+    """(module, cumulative µs, nested?) triples from `-X importtime` stderr lines.
+
+    Nested imports are indented under the module that triggered them; only
+    top-level entries add up to the total import time.
+    """
+    modules = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative), name.startswith("  ")))
+    return modules
+
+
+def profile_script(path, python=sys.executable):
+    """Import and run profile of one script in a fresh interpreter."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1",
+               VALUATION_STATE_DIR=tempfile.mkdtemp(prefix="valuation-importtime-"))
+    proc = subprocess.run([python, "-X", "importtime", "-c", _RUNNER, path],
+                          capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(path)))
+    lines = proc.stderr.splitlines()
+    marks = [i for i, line in enumerate(lines) if line.startswith(MARKER)]
+    if proc.returncode != 0 or len(marks) != 2:
+        raise RuntimeError(f"{path} failed to start:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(lines[marks[0] + 1:marks[1]])
+    top_level = [(name, us) for name, us, nested in modules if not nested]
+    return dict(
+        script=os.path.basename(path),
+        streamlit_ms=float(lines[marks[0]].split()[1]) * 1000,
+        run_ms=float(lines[marks[1]].split()[1]) * 1000,
+        import_ms=sum(us for _, us in top_level) / 1000,
+        heaviest=sorted(top_level, key=lambda module: -module[1])[:3],
+        loaded={name for name, _, _ in modules},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold-start budget of the app scripts.")
+    parser.add_argument("scripts", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-budget", action="store_true", help="report only")
+    args = parser.parse_args()
+    here = os.path.dirname(os.path.abspath(__file__))
+    scripts = args.scripts or sorted(glob.glob(os.path.join(here, "valuation_intro_*.py"))) + [
+        os.path.join(here, "valuation_small.py"), os.path.join(here, "valuation_lab.py")]
+
+    print(f"{'script':24} {'streamlit ms':>12} {'imports ms':>10} {'run ms':>8} {'budget':>7}"
+          f" {'numpy':>6} {'pandas':>7}  heaviest imports")
+    over = []
+    started = time.perf_counter()
+    for script in scripts:
+        runs = [profile_script(script) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["run_ms"])
+        budget = STARTUP_BUDGET_MS.get(best["script"])
+        status = "" if budget is None else f"{budget:>7}"
+        if budget is not None and best["run_ms"] > budget:
+            over.append(best["script"])
+            status = f"{budget:>6}!"
+        heaviest = ", ".join(f"{name} {us / 1000:.0f}" for name, us in best["heaviest"])
+        print(f"{best['script']:24} {best['streamlit_ms']:12.0f} {best['import_ms']:10.0f}"
+              f" {best['run_ms']:8.0f} {status:>7} {'numpy' in best['loaded']!s:>6}"
+              f" {'pandas' in best['loaded']!s:>7}  {heaviest}")
+    print(f"\nProfiled {len(scripts)} scripts in {time.perf_counter() - started:.1f} s")
+    if over and not args.no_budget:
+        print("Over budget: " + ", ".join(over))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import streamlit as st
-import numpy as np
 import pandas as pd
 
 # Configure page settings (centered layout works well on mobile)
@@ -134,16 +133,69 @@ st.markdown("""
 
 Use the graph below to compare a sample stock’s market price and its estimated intrinsic value.
 """)
-# For demonstration purposes, we reuse the DCF result to generate sample data.
-sample_years = list(range(1, 11))
-intrinsic = [total_dcf * (1 + i*0.02) for i in range(10)]
-market = [total_dcf * (1 + i*0.015) for i in range(10)]
-chart_data = pd.DataFrame({
-    "Year": sample_years,
-    "Intrinsic Value": intrinsic,
-    "Market Price": market,
-})
-st.line_chart(chart_data.set_index("Year"))
+if st.checkbox("Use a historical intrinsic-value series"):
+    import valuation_history as vh
+
+    st.markdown("""
+    At every month-end the DCF is re-run with only the free cash flow **published by that date**.
+    The growth of the previous 3 years is assumed for the next 5 years, then the stable growth
+    below; everything is discounted at the calculator's discount rate.
+    """)
+    price_file = st.file_uploader("Prices (CSV: date, ticker, price)", type="csv")
+    report_file = st.file_uploader("FCF reports (CSV: ticker, report_date, fcf_per_share)", type="csv")
+    history_growth = st.slider("Stable Growth after 5 Years (%)", min_value=0.0, max_value=5.0, value=3.0)
+    if price_file is None or report_file is None:
+        st.caption("No files uploaded: 25 years of synthetic prices and yearly reports for 50 tickers.")
+        history_prices, history_reports = vh.sample_history()
+    else:
+        history_prices, history_reports = pd.read_csv(price_file), pd.read_csv(report_file)
+    try:
+        history_dates, history_tickers, price_panel, value_panel = vh.intrinsic_value_history(
+            history_prices, history_reports, discount_rate/100, history_growth/100)
+    except ValueError as error:
+        st.error(str(error))
+    else:
+        ticker = st.selectbox("Ticker", history_tickers)
+        column = list(history_tickers).index(ticker)
+        st.line_chart(pd.DataFrame({
+            "Intrinsic Value": value_panel[:, column],
+            "Market Price": price_panel[:, column],
+        }, index=pd.DatetimeIndex(history_dates)))
+        undervalued = value_panel[:, column] > price_panel[:, column]
+        st.write(f"**Months with Value > Price:** {undervalued.sum()} of {len(history_dates)}")
+        if st.checkbox("Backtest the rule: buy when Value > Price"):
+            import valuation_backtest as vbt
+
+            margin = st.slider("Margin of Safety (%)", min_value=0, max_value=50, value=20)
+            schedule = st.radio("Rebalance", list(vbt.REBALANCE_PERIODS), index=1, horizontal=True)
+            cost_bps = st.number_input("Trading Cost (basis points per trade)", min_value=0.0, value=10.0, step=5.0)
+            rule, universe = vbt.compare_with_universe(
+                price_panel, value_panel, margin_of_safety=margin/100,
+                rebalance_every=vbt.REBALANCE_PERIODS[schedule], cost_bps=cost_bps)
+            st.line_chart(pd.DataFrame({
+                "Value > Price": rule["equity"],
+                "All stocks (equal weight)": universe["equity"],
+            }, index=pd.DatetimeIndex(history_dates)))
+            st.markdown(f"""
+            | | Value > Price | All stocks |
+            |---|--:|--:|
+            | Annual return | {rule['cagr']:.1%} | {universe['cagr']:.1%} |
+            | Volatility | {rule['volatility']:.1%} | {universe['volatility']:.1%} |
+            | Max drawdown | {rule['max_drawdown']:.1%} | {universe['max_drawdown']:.1%} |
+            | Turnover per rebalance | {rule['avg_turnover']:.1%} | {universe['avg_turnover']:.1%} |
+            | Average holdings | {rule['avg_positions']:,.0f} | {universe['avg_positions']:,.0f} |
+            """)
+else:
+    # For demonstration purposes, we reuse the DCF result to generate sample data.
+    sample_years = list(range(1, 11))
+    intrinsic = [total_dcf * (1 + i*0.02) for i in range(10)]
+    market = [total_dcf * (1 + i*0.015) for i in range(10)]
+    chart_data = pd.DataFrame({
+        "Year": sample_years,
+        "Intrinsic Value": intrinsic,
+        "Market Price": market,
+    })
+    st.line_chart(chart_data.set_index("Year"))
 st.markdown("---")
 
 # =============================================================================
@@ -160,6 +212,35 @@ There are three primary methods to value a company:
 3. **Contingent Valuation (Real Options):**  
    For valuing future opportunities.
 """)
+if st.checkbox("Try it: value an option to expand or to abandon"):
+    import valuation_options as vo
+
+    option = st.radio("Real option", ["Expand", "Abandon"], horizontal=True)
+    expand = option == "Expand"
+    col1, col2 = st.columns(2)
+    with col1:
+        project_value = st.number_input("Project value today ($)", min_value=0.01, value=100.0, step=10.0)
+        strike = st.number_input("Cost to expand ($)" if expand else "Salvage value ($)", min_value=0.0,
+                                 value=120.0 if expand else 80.0, step=10.0)
+        option_years = st.slider("Years left to decide", min_value=0.5, max_value=20.0, value=5.0, step=0.5)
+    with col2:
+        volatility = st.slider("Volatility of the project value (%)", min_value=5, max_value=100, value=30)
+        riskless = st.slider("Riskless rate (%)", min_value=0.0, max_value=10.0, value=4.0, step=0.25)
+        leakage = st.slider("Value lost per year of waiting (%)", min_value=0.0, max_value=20.0, value=0.0, step=0.5)
+    inputs = (project_value, strike, option_years, riskless/100, volatility/100, leakage/100)
+    kind = "call" if expand else "put"
+    static = max(project_value - strike, 0.0) if expand else max(strike - project_value, 0.0)
+    at_end = float(vo.black_scholes(*inputs, kind=kind))
+    any_time = float(vo.binomial(*inputs, kind=kind, steps=vo.DEFAULT_STEPS))
+    st.markdown(f"""
+    | Decision | Value |
+    |---|--:|
+    | Act today (static NPV) | \\${static:,.2f} |
+    | Decide at the end (Black-Scholes) | \\${at_end:,.2f} |
+    | Decide any time (binomial, {vo.DEFAULT_STEPS} steps) | \\${any_time:,.2f} |
+    """)
+    st.caption("The gap between acting today and keeping the choice open is the value of flexibility "
+               "that a static DCF leaves out.")
 st.info("Use the DCF calculator in the 'The Science of Valuation' section to explore intrinsic valuation.")
 st.markdown("---")
 
@@ -1,5 +1,6 @@
-import streamlit as st
 import numpy as np
+import pandas as pd
+import streamlit as st
 
 # Configure the Streamlit app
 st.set_page_config(page_title="Intrinsic Value – The Hidden Treasure", layout="centered", initial_sidebar_state="expanded")
@@ -59,12 +60,42 @@ Focus on what remains after investments and operating expenses.
 *Technical term: Free Cash Flow to the Firm (FCFF)*
 """)
 with st.expander("Enter Your Future Cash Flows"):
-    years = st.number_input("Number of projection years", min_value=1, max_value=20, value=5)
-    cash_flows = []
-    for year in range(1, years + 1):
-        cf = st.number_input(f"Estimated Cash Flow for Year {year} ($)", value=100000.0, step=5000.0, key=f"cf_{year}")
-        cash_flows.append(cf)
-    st.write("Your projected cash flows:", cash_flows)
+    col1, col2 = st.columns(2)
+    with col1:
+        unit = st.radio("Cash flow period", ["Years", "Months"], horizontal=True)
+    periods_per_year = 12 if unit == "Months" else 1
+    # Switching the unit keeps the projection in calendar time: the horizon
+    # and the cash flows are converted (a year's cash flow spread over its
+    # months, or each twelve months summed into a year), not reseeded.
+    if "projection_periods" not in st.session_state:
+        st.session_state["projection_periods"] = 5
+    if st.session_state.get("cash_flow_unit", unit) != unit:
+        flows = st.session_state.get("cash_flows", np.array([100000.0]))
+        if unit == "Months":
+            flows = np.repeat(flows / 12, 12)[:480]
+        else:
+            flows = np.add.reduceat(flows, np.arange(0, flows.size, 12))
+        st.session_state["cash_flows"] = flows
+        st.session_state["projection_periods"] = flows.size
+    st.session_state["cash_flow_unit"] = unit
+    with col2:
+        periods = st.number_input(f"Number of projection {unit.lower()}", min_value=1, max_value=480,
+                                  key="projection_periods")
+    # One editable grid backed by one array in session state. A new horizon
+    # starts a new grid from the current values (cut, or extended with the
+    # last one); within a horizon the grid keeps its own edits.
+    grid_key = f"cash_flow_grid_{unit}_{periods}"
+    if st.session_state.get("cash_flow_grid") != grid_key:
+        previous = st.session_state.get("cash_flows", np.array([100000.0]))
+        st.session_state["cash_flow_base"] = np.concatenate(
+            (previous[:periods], np.full(max(periods - len(previous), 0), previous[-1])))
+        st.session_state["cash_flow_grid"] = grid_key
+    edited = st.data_editor(
+        pd.DataFrame({unit[:-1]: np.arange(1, periods + 1), "Cash Flow ($)": st.session_state["cash_flow_base"]}),
+        key=grid_key, hide_index=True, disabled=[unit[:-1]],
+        column_config={"Cash Flow ($)": st.column_config.NumberColumn(step=5000.0, format="dollar")})
+    cash_flows = edited["Cash Flow ($)"].to_numpy(dtype=np.float64)
+    st.session_state["cash_flows"] = cash_flows
 st.markdown("---")
 
 # Step 2: Choose the Projection Horizon
@@ -85,7 +116,40 @@ The discount rate reflects the risk of the company.
 
 For companies, we usually use the WACC (Weighted Average Cost of Capital).
 """)
-discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=20.0, value=10.0)
+if st.checkbox("Estimate the discount rate as a WACC"):
+    import valuation_wacc as vw
+
+    col1, col2 = st.columns(2)
+    with col1:
+        beta = st.number_input("Equity beta", value=1.0, step=0.05)
+        riskless = st.number_input("Riskless rate (%)", value=4.0, step=0.25)
+        equity_premium = st.number_input("Equity risk premium (%)", value=5.0, step=0.25)
+    with col2:
+        cost_of_debt = st.number_input("Pre-tax cost of debt (%)", value=6.0, step=0.25)
+        tax_rate = st.number_input("Tax rate (%)", min_value=0.0, max_value=100.0, value=25.0, step=1.0)
+        debt_share = st.slider("Debt share of capital (%)", min_value=0, max_value=95, value=30)
+    price_file = st.file_uploader("Or estimate the beta from prices (CSV: date, stock, market)", type="csv")
+    if price_file is not None:
+        try:
+            estimated, periods_used = vw.beta_from_prices(pd.read_csv(price_file))
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            if np.isfinite(estimated):
+                beta = estimated
+                st.write(f"Beta over the last {periods_used} returns: **{beta:.2f}**")
+            else:
+                st.warning("Too many missing prices to estimate a beta; using the beta above.")
+    wacc = float(vw.wacc(beta, riskless/100, equity_premium/100, cost_of_debt/100, tax_rate/100,
+                         100 - debt_share, debt_share))
+    st.write(f"**Cost of equity:** {float(vw.cost_of_equity(beta, riskless/100, equity_premium/100)):.2%}"
+             f" · **WACC:** {wacc:.2%}")
+    discount_rate = wacc * 100
+    wacc_inputs = dict(cost_of_equity=float(vw.cost_of_equity(beta, riskless, equity_premium)), cost_of_debt=cost_of_debt,
+                       tax_rate=tax_rate, debt_share=debt_share)
+else:
+    discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=20.0, value=10.0)
+    wacc_inputs = None
 st.markdown("---")
 
 # Step 4: Calculate the Present Value of Future Cash Flows
@@ -98,12 +162,12 @@ $$PV = \frac{FCF_{t}}{(1+r)^t}$$
 Where:  
 - $FCF_{t}$ = cash flow in year *t*  
 - $r$ = discount rate (in decimal form)  
-- $t$ = year number
+- $t$ = year number (with monthly cash flows, month *m* is year *m*/12)
 
 Let's compute the PV for each year's cash flow.
 """)
-present_values = [cf / ((1 + discount_rate/100)**t) for t, cf in enumerate(cash_flows, start=1)]
-total_pv = np.sum(present_values)
+present_values = [cf / ((1 + discount_rate/100)**(t / periods_per_year)) for t, cf in enumerate(cash_flows, start=1)]
+total_pv = sum(present_values)
 st.write("**Total Present Value of Cash Flows:** $", f"{total_pv:,.2f}")
 st.markdown("---")
 
@@ -120,8 +184,11 @@ Where:
 - $r$ = discount rate  
 """)
 g_rate = st.slider("Perpetual Growth Rate (%)", min_value=0.0, max_value=10.0, value=3.0)
-terminal_value = cash_flows[-1] * (1 + g_rate/100) / ((discount_rate/100) - (g_rate/100))
-terminal_value_pv = terminal_value / ((1 + discount_rate/100)**years)
+# Monthly cash flows are discounted and grown at the equivalent monthly rates.
+rate = (1 + discount_rate/100)**(1 / periods_per_year) - 1
+growth = (1 + g_rate/100)**(1 / periods_per_year) - 1
+terminal_value = cash_flows[-1] * (1 + growth) / (rate - growth)
+terminal_value_pv = terminal_value / ((1 + rate)**periods)
 st.write("**Present Value of Terminal Value:** $", f"{terminal_value_pv:,.2f}")
 st.markdown("---")
 
@@ -129,6 +196,21 @@ st.markdown("---")
 intrinsic_value = total_pv + terminal_value_pv
 st.markdown("### 📊 Calculated Intrinsic Value")
 st.write("**Intrinsic Value (based on DCF):** $", f"{intrinsic_value:,.2f}")
+
+# Export the schedule for spreadsheets and BI tools
+st.markdown("#### 💾 Export Your Valuation")
+if st.checkbox("Prepare export files"):
+    import valuation_engine as ve
+    import valuation_export as vx
+
+    export_format = st.radio("Export format", ["Parquet", "Arrow"], horizontal=True)
+    extension = export_format.lower()
+    schedule = ve.dcf_schedule([cash_flows], rate, growth)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Yearly Schedule", vx.to_bytes(vx.schedule_batch(schedule), extension), file_name=f"dcf_schedule.{extension}")
+    with col2:
+        st.download_button("⬇️ Valuation Summary", vx.to_bytes(vx.summary_batch(schedule), extension), file_name=f"dcf_summary.{extension}")
 st.markdown("---")
 
 # Variations of the DCF Model
@@ -142,6 +224,56 @@ Depending on what you want to value, there are three main approaches:
 3. **Dividend Discount Model (DDM):**  
    Uses dividends as a proxy for cash flows (works best for companies that pay stable dividends).
 """)
+if st.checkbox("Compare FCFF, FCFE and DDM on one projection"):
+    import valuation_statements as vs
+
+    col1, col2 = st.columns(2)
+    with col1:
+        ebit = st.number_input("EBIT next year ($)", min_value=0.0, value=150000.0, step=10000.0)
+        ebit_growth = st.slider("EBIT growth (%)", min_value=0.0, max_value=20.0, value=3.0, step=0.5)
+        reinvestment = st.slider("Reinvestment (% of after-tax EBIT)", min_value=0, max_value=100, value=40)
+        payout = st.slider("Dividend payout (% of net income)", min_value=0, max_value=100, value=65)
+    if wacc_inputs is None:
+        st.caption("The discount rate and perpetual growth rate above are reused as the WACC and the stable growth; the projection is yearly. "
+                   "On consistent inputs the three methods agree; a gap above 10% is flagged, because it usually means the WACC does not "
+                   "match the debt plan or the payout leaves cash in the company.")
+        with col2:
+            net_debt = st.number_input("Net debt today ($)", min_value=0.0, value=300000.0, step=50000.0)
+            debt_rate = st.number_input("Interest rate on debt (%)", min_value=0.0, value=5.0, step=0.25)
+            equity_rate = st.number_input("Cost of equity (%)", min_value=0.0, value=13.0, step=0.25)
+            ebit_tax = st.number_input("Tax rate on profits (%)", min_value=0.0, max_value=100.0, value=25.0, step=1.0)
+    else:
+        # The WACC block's own inputs: CAPM cost of equity, cost of debt, tax
+        # rate, and net debt at its debt share of the firm value (FCFF does
+        # not depend on the debt, so the firm value comes first).
+        equity_rate, debt_rate, ebit_tax = (wacc_inputs[name] for name in ("cost_of_equity", "cost_of_debt", "tax_rate"))
+        unlevered = vs.simple_projection(ebit, ebit_growth/100, 10, reinvestment/100, tax_rate=ebit_tax/100, payout_ratio=payout/100)
+        firm_value = vs.three_way_valuation(**unlevered, wacc=discount_rate/100, cost_of_equity=equity_rate/100,
+                                            stable_growth=g_rate/100)["firm_value"][0]
+        net_debt = max(wacc_inputs["debt_share"] / 100 * firm_value, 0.0) if np.isfinite(firm_value) else 0.0
+        st.caption(f"The WACC above is reused with its cost of equity ({equity_rate:.2f}%), cost of debt ({debt_rate:.2f}%) and tax rate "
+                   f"({ebit_tax:.0f}%), and net debt is its {wacc_inputs['debt_share']}% debt share of the firm value (\\${net_debt:,.0f}); "
+                   "the perpetual growth rate above is the stable growth and the projection is yearly. On consistent inputs the three "
+                   "methods agree; a gap above 10% is flagged, because it usually means the WACC does not match the debt plan or the "
+                   "payout leaves cash in the company.")
+    statements = vs.simple_projection(ebit, ebit_growth/100, 10, reinvestment/100, tax_rate=ebit_tax/100,
+                                      net_debt=net_debt, cost_of_debt=debt_rate/100, payout_ratio=payout/100)
+    three_way = vs.three_way_valuation(**statements, wacc=discount_rate/100, cost_of_equity=equity_rate/100,
+                                       stable_growth=g_rate/100)
+    st.markdown(f"""
+    | Method | Equity value |
+    |---|--:|
+    | FCFF at the WACC, minus net debt | \\${three_way['equity_fcff'][0]:,.0f} |
+    | FCFE at the cost of equity | \\${three_way['equity_fcfe'][0]:,.0f} |
+    | Dividends at the cost of equity (DDM) | \\${three_way['equity_ddm'][0]:,.0f} |
+    """)
+    if not np.isfinite(three_way["spread"][0]):
+        st.error("The WACC and the cost of equity must be greater than the perpetual growth rate.")
+    elif three_way["flag"][0]:
+        st.warning(f"The methods disagree by {three_way['spread'][0]:.0%} of the middle value. Check that the WACC "
+                   "matches the debt plan and that the payout does not leave cash piling up in the company.")
+    else:
+        st.success(f"The three methods agree within {three_way['spread'][0]:.1%}.")
 st.markdown("---")
 
 # The Sensitivity of the DCF Model
@@ -1,6 +1,5 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 
 # Configure the Streamlit app
 st.set_page_config(page_title="Relative Valuation – The Game of Comparisons", layout="centered", initial_sidebar_state="expanded")
@@ -148,6 +147,34 @@ elif target_pe == median_pe:
 else:
     st.error("The target company's P/E is above the peer median, which may indicate it is overvalued compared to its peers.")
 
+st.markdown("#### Growth-Adjusted Comparison (Regression)")
+st.markdown("""
+Faster-growing peers *deserve* higher P/E ratios. A regression of P/E on expected growth across the peers
+tells you which P/E the target's own growth would justify.
+""")
+if st.checkbox("Adjust P/E for growth"):
+    import valuation_multiples as vm
+
+    target_growth = st.number_input("Target company's expected earnings growth (%):", value=5.0, step=0.5)
+    peer_growth = []
+    for i in range(1, int(n_peers)+1):
+        value = st.number_input(f"Expected earnings growth for Peer {i} (%):", value=5.0 + 2.0 * i, step=0.5, key=f"peer_growth_{i}")
+        peer_growth.append(value)
+    peer_growth = np.array(peer_growth)
+
+    if n_peers < 3 or np.ptp(peer_growth) == 0:
+        st.warning("The regression needs at least three peers with different growth rates.")
+    else:
+        fit = vm.fit_sector_regressions(peer_pe, peer_growth, np.zeros(int(n_peers)))
+        intercept, slope = fit["coefficients"][0, 0]
+        justified_pe = intercept + slope * target_growth
+        st.write(f"**Fitted line:** P/E = {intercept:.2f} + {slope:.2f} × growth (R² = {fit['r2'][0, 0]:.2f})")
+        st.write(f"**P/E justified by the target's growth:** {justified_pe:.2f}")
+        if target_pe < justified_pe:
+            st.success("Even after adjusting for growth, the target trades below its justified P/E.")
+        else:
+            st.error("After adjusting for growth, the target trades at or above its justified P/E – the lower multiple may simply reflect lower growth.")
+
 st.markdown("---")
 st.markdown("### Final Interactive Observation")
 st.markdown("""
@@ -1,5 +1,6 @@
+import time
+
 import streamlit as st
-import numpy as np
 
 # Configure the Streamlit app
 st.set_page_config(page_title="Valuing Growth Companies", layout="centered", initial_sidebar_state="expanded")
@@ -194,11 +195,11 @@ for t in range(startup_years + expansion_years + 1, total_years + 1):
     cf = cf * (1 + maturity_growth_rate / 100)
 
 st.write("**Projected Cash Flows (by year):**")
-st.write(cash_flow_series)
+st.json(cash_flow_series)
 
 # Calculate the present value of the cash flows for each year
 pv_values = [cf / ((1 + discount_rate / 100) ** t) for t, cf in enumerate(cash_flow_series, start=1)]
-total_pv = np.sum(pv_values)
+total_pv = sum(pv_values)
 st.write("**Total Present Value of Cash Flows:** $", f"{total_pv:,.2f}")
 
 st.markdown("### Terminal Value Calculation")
@@ -221,6 +222,199 @@ intrinsic_value = total_pv + terminal_value_pv
 st.markdown("### 📊 Calculated Intrinsic Value for the Growth Company")
 st.write("**Intrinsic Value (DCF):** $", f"{intrinsic_value:,.2f}")
 
+# Export the schedule for spreadsheets and BI tools
+st.markdown("#### 💾 Export Your Valuation")
+if st.checkbox("Prepare export files"):
+    import valuation_engine as ve
+    import valuation_export as vx
+
+    export_format = st.radio("Export format", ["Parquet", "Arrow"], horizontal=True)
+    extension = export_format.lower()
+    schedule = ve.growth_company_schedule(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Yearly Schedule", vx.to_bytes(vx.schedule_batch(schedule), extension), file_name=f"growth_company_schedule.{extension}")
+    with col2:
+        st.download_button("⬇️ Valuation Summary", vx.to_bytes(vx.summary_batch(schedule), extension), file_name=f"growth_company_summary.{extension}")
+
+# Tornado: every input nudged down and up, valued in one batched call
+st.markdown("#### 🌪️ Sensitivity Analysis (Tornado)")
+st.markdown("Each input is moved down and up while all others stay fixed. The longest bars are the assumptions your valuation depends on most.")
+if st.checkbox("Run the sensitivity analysis"):
+    import altair as alt
+    import numpy as np
+    import pandas as pd
+    import valuation_sensitivity as vs
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        years_shift = st.number_input("Shift phase lengths by (years)", min_value=1, max_value=5, value=1, step=1)
+    with col2:
+        cf_shift = st.number_input("Shift cash flows by (%)", min_value=1.0, max_value=100.0, value=20.0, step=5.0)
+    with col3:
+        rate_shift = st.number_input("Shift rates by (percentage points)", min_value=0.5, max_value=10.0, value=2.0, step=0.5)
+    start = time.perf_counter()
+    base_value, tornado_rows = vs.growth_company_tornado(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100, years_shift, cf_shift / 100, rate_shift / 100)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    labels = {"startup_years": "Years in Startup Phase", "expansion_years": "Years in Expansion Phase", "maturity_years": "Years in Maturity Phase",
+              "startup_cf": "Startup Cash Flow", "expansion_initial_cf": "Initial Expansion Cash Flow", "expansion_growth": "Expansion Growth Rate",
+              "maturity_growth": "Maturity Growth Rate", "rate": "Discount Rate"}
+    tornado_df = pd.DataFrame([{"Input": labels[row["input"]], "Case": case, "Change in Value": row[case.lower()] - base_value}
+                               for row in tornado_rows for case in ("Low", "High")])
+    if np.isfinite(base_value):
+        st.altair_chart(alt.Chart(tornado_df.dropna()).mark_bar().encode(
+            x=alt.X("Change in Value:Q", title="Change in Intrinsic Value ($)"),
+            y=alt.Y("Input:N", sort=[labels[row["input"]] for row in tornado_rows], title=None),
+            color=alt.Color("Case:N", scale=alt.Scale(domain=["Low", "High"], range=["#d62728", "#2ca02c"]))))
+        if tornado_df["Change in Value"].isna().any():
+            st.warning("Some perturbations push the discount rate to or below the maturity growth rate; they have no terminal value and are left out.")
+        st.caption(f"{2 * len(tornado_rows) + 1} valuations computed in one batch in {elapsed_ms:.1f} ms.")
+    else:
+        st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+
+# Probability-weighted scenarios: full input sets, valued together in one batch
+st.markdown("#### 🎲 Probability-Weighted Scenarios")
+st.markdown("Describe each scenario with a complete set of inputs and a probability. All scenarios are valued together, and the expected value weights each outcome by its probability. Add or remove rows as you like.")
+if st.checkbox("Compare probability-weighted scenarios"):
+    import numpy as np
+    import pandas as pd
+    import valuation_sensitivity as vs
+
+    default_scenarios = pd.DataFrame({
+        "Scenario": ["Optimistic", "Realistic", "Conservative"],
+        "Probability (%)": [25.0, 50.0, 25.0],
+        "Startup Years": [max(startup_years - 1, 0), startup_years, min(startup_years + 2, 10)],
+        "Expansion Years": [expansion_years] * 3,
+        "Maturity Years": [maturity_years] * 3,
+        "Startup CF": [startup_cf * 0.8, startup_cf, startup_cf * 1.2],
+        "Expansion CF": [expansion_initial_cf * 1.2, expansion_initial_cf, expansion_initial_cf * 0.8],
+        "Expansion Growth (%)": [expansion_growth_rate + 5, expansion_growth_rate, max(expansion_growth_rate - 5, 0.0)],
+        "Maturity Growth (%)": [maturity_growth_rate] * 3,
+        "Discount Rate (%)": [12.0, 15.0, 18.0],
+    })
+    # The phase-length columns take whole years within the bounds of the inputs above.
+    year_columns = {column: st.column_config.NumberColumn(min_value=low, max_value=high, step=1)
+                    for column, (low, high) in zip(("Startup Years", "Expansion Years", "Maturity Years"),
+                                                   vs.PHASE_BOUNDS.values())}
+    scenario_table = st.data_editor(default_scenarios, num_rows="dynamic", hide_index=True, key="scenario_table",
+                                    column_config=year_columns).dropna()
+    if scenario_table.empty or scenario_table["Probability (%)"].sum() <= 0 or (scenario_table["Probability (%)"] < 0).any():
+        st.error("Enter at least one scenario with non-negative probabilities that sum to more than 0%.")
+    else:
+        if abs(scenario_table["Probability (%)"].sum() - 100) > 1e-9:
+            st.info(f"Probabilities sum to {scenario_table['Probability (%)'].sum():.1f}% and were rescaled to 100%.")
+        try:
+            weighted = vs.growth_company_scenarios(dict(
+                startup_years=scenario_table["Startup Years"].to_numpy(), expansion_years=scenario_table["Expansion Years"].to_numpy(),
+                maturity_years=scenario_table["Maturity Years"].to_numpy(), startup_cf=scenario_table["Startup CF"].to_numpy(dtype=float),
+                expansion_initial_cf=scenario_table["Expansion CF"].to_numpy(dtype=float), expansion_growth=scenario_table["Expansion Growth (%)"].to_numpy(dtype=float) / 100,
+                maturity_growth=scenario_table["Maturity Growth (%)"].to_numpy(dtype=float) / 100, rate=scenario_table["Discount Rate (%)"].to_numpy(dtype=float) / 100),
+                scenario_table["Probability (%)"].to_numpy(dtype=float))
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            breakdown = pd.DataFrame({
+                "Scenario": scenario_table["Scenario"].to_numpy(),
+                "Probability": weighted["probabilities"],
+                "Intrinsic Value ($)": weighted["values"][:, 0],
+                "Weighted Contribution ($)": weighted["probabilities"] * weighted["values"][:, 0],
+            })
+            st.dataframe(breakdown.style.format({"Probability": "{:.0%}", "Intrinsic Value ($)": "{:,.2f}", "Weighted Contribution ($)": "{:,.2f}"}), hide_index=True)
+            if np.isfinite(weighted["expected"][0]):
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Expected Value", f"${weighted['expected'][0]:,.0f}")
+                col2.metric("Standard Deviation", f"${weighted['std'][0]:,.0f}")
+                col3.metric("Range", f"${weighted['low'][0]:,.0f} – ${weighted['high'][0]:,.0f}")
+            else:
+                st.error("In at least one scenario the discount rate does not exceed the maturity growth rate, so it has no valid terminal value.")
+
+# Phase-length sweep: every combination of phase lengths, valued in one batch
+st.markdown("#### ⏳ What If Profitability Is Delayed?")
+st.markdown("Every combination of startup, expansion and maturity years allowed above is valued in one batch. The curve moves the end of the startup phase earlier (negative delay) or later, keeping your expansion and maturity phases; the heatmap shows every startup × expansion combination.")
+if st.checkbox("Sweep every combination of phase lengths"):
+    import altair as alt
+    import numpy as np
+    import pandas as pd
+    import valuation_sensitivity as vs
+
+    start = time.perf_counter()
+    sweep = vs.phase_length_sweep(startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if np.isfinite(sweep["value"]).any():
+        at_current = sweep["value"][:, list(sweep["expansion_years"]).index(expansion_years), list(sweep["maturity_years"]).index(maturity_years)]
+        delay_curve = pd.DataFrame({"Delay (years)": sweep["startup_years"] - startup_years, "Intrinsic Value ($)": at_current})
+        st.line_chart(delay_curve.set_index("Delay (years)"))
+        if startup_years + 2 <= sweep["startup_years"][-1]:
+            current_value, delayed_value = at_current[startup_years], at_current[startup_years + 2]
+            st.metric("Profitability Delayed by 2 Years", f"${delayed_value:,.0f}", f"{delayed_value - current_value:+,.0f} vs. today's plan")
+        heatmap = pd.DataFrame({
+            "Startup Years": np.repeat(sweep["startup_years"], len(sweep["expansion_years"])),
+            "Expansion Years": np.tile(sweep["expansion_years"], len(sweep["startup_years"])),
+            "Intrinsic Value ($)": sweep["value"][:, :, list(sweep["maturity_years"]).index(maturity_years)].ravel(),
+        })
+        st.altair_chart(alt.Chart(heatmap).mark_rect().encode(
+            x=alt.X("Expansion Years:O"), y=alt.Y("Startup Years:O", sort="descending"),
+            color=alt.Color("Intrinsic Value ($):Q", scale=alt.Scale(scheme="redyellowgreen", domainMid=0)),
+            tooltip=["Startup Years", "Expansion Years", alt.Tooltip("Intrinsic Value ($):Q", format=",.0f")]))
+        st.caption(f"{sweep['value'].size:,} phase-length combinations valued in one batch in {elapsed_ms:.1f} ms; the heatmap shows your {maturity_years}-year maturity phase.")
+    else:
+        st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+
+# Financing simulator: cash balance, capital raises and dilution on Monte Carlo paths
+st.markdown("#### 💸 Raising Capital and Dilution")
+st.markdown("The startup losses have to be paid with cash. Each simulated path tracks the company's cash balance; whenever it ends a year below the minimum, the company sells new shares. Raises priced at the value of the shares are fair to everyone, while raises at a discount hand part of your value to the new investors.")
+if st.checkbox("Simulate the capital raises"):
+    import numpy as np
+    import pandas as pd
+    import valuation_engine as ve
+    import valuation_financing as vf
+
+    col1, col2 = st.columns(2)
+    with col1:
+        cash_today = st.number_input("Cash Today ($)", min_value=0.0, value=100000.0, step=10000.0)
+        shares_today = st.number_input("Shares Outstanding Today", min_value=1.0, value=1000000.0, step=100000.0)
+        min_cash = st.number_input("Raise When Cash Falls Below ($)", min_value=0.0, value=25000.0, step=5000.0)
+        round_size = st.number_input("Size of a Funding Round ($)", min_value=1000.0, value=100000.0, step=10000.0)
+    with col2:
+        cf_volatility = st.slider("Cash Flow Uncertainty (%)", min_value=0, max_value=100, value=25)
+        max_delay = st.slider("Profitability Delayed by Up To (years)", min_value=0, max_value=5, value=2)
+        n_paths = st.number_input("Simulated Paths", min_value=100, max_value=100000, value=2000, step=1000)
+    base_value = ve.growth_company_dcf(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)[2][0]
+    value_per_share = (base_value + cash_today) / shares_today
+    if not np.isfinite(value_per_share):
+        st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+    elif value_per_share <= 0:
+        st.error("The plan has no positive value per share to price new shares at.")
+    else:
+        # Three pricing scenarios x all paths in one simulation: new shares are
+        # sold at a share of today's value per share, growing at the discount rate.
+        pricing = np.array([1.0, 0.75, 0.5])
+        start = time.perf_counter()
+        cash_flows, lengths = vf.sample_cash_flows(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, n_paths=int(n_paths), volatility=cf_volatility / 100, max_delay=max_delay)
+        price = pricing[:, None, None] * value_per_share * (1 + discount_rate / 100) ** np.arange(1, cash_flows.shape[-1] + 1)
+        financing = vf.simulate_financing(cash_flows, discount_rate / 100, maturity_growth_rate / 100, cash_today, shares_today, min_cash, round_size, price, lengths=lengths)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.metric("Value per Share Without Dilution", f"${value_per_share:,.4f}", help="Intrinsic value of the plan plus today's cash, over today's shares.")
+        summary = pd.DataFrame({
+            "New Shares Priced At": [f"{p:.0%} of value" for p in pricing],
+            "Paths Raising Capital": (financing["rounds"] > 0).mean(axis=1),
+            "Median Rounds": np.median(financing["rounds"], axis=1),
+            "Median Dilution": np.median(financing["dilution"], axis=1),
+            "Plain DCF per Share ($)": np.median(financing["value_per_share_undiluted"], axis=1),
+            "Median Value per Share ($)": np.median(financing["value_per_share"], axis=1),
+            "5th Percentile ($)": np.percentile(financing["value_per_share"], 5, axis=1),
+        })
+        st.dataframe(summary.style.format({"Paths Raising Capital": "{:.0%}", "Median Rounds": "{:.0f}", "Median Dilution": "{:.1%}", "Plain DCF per Share ($)": "{:,.4f}",
+                                           "Median Value per Share ($)": "{:,.4f}", "5th Percentile ($)": "{:,.4f}"}), hide_index=True)
+        st.caption("New shares are priced at a share of your plan's value per share, growing at the discount rate. On paths that turn out worse than the plan, new investors overpay and today's shareholders gain; on better paths they lose.")
+        cash_bands = pd.DataFrame(np.percentile(financing["cash"][0], [5, 50, 95], axis=0).T, columns=["5th Percentile", "Median", "95th Percentile"])
+        cash_bands.index = np.arange(1, len(cash_bands) + 1)
+        cash_bands.index.name = "Year"
+        st.markdown("**Cash Balance after Raises ($)**")
+        st.line_chart(cash_bands)
+        st.caption(f"{financing['rounds'].size:,} paths (3 pricing scenarios × {int(n_paths):,} draws) simulated in {elapsed_ms:.1f} ms. "
+                   f"Peak cumulative burn: median \\${np.median(financing['peak_burn'][0]):,.0f}, 95th percentile \\${np.percentile(financing['peak_burn'][0], 95):,.0f}.")
+
 st.markdown("---")
 st.markdown("### Interactive Analysis")
 st.markdown("""
@@ -172,6 +172,36 @@ if discount_rate > growth_rate:
 else:
     st.error("Discount rate must be greater than growth rate for a valid calculation.")
 
+st.markdown("---")
+st.markdown("### Fading Growth: Two-Stage and H-Model")
+st.markdown(r"""
+Many mature companies still grow faster than the economy for a while before settling down.
+- **Two-stage DDM:** dividends grow at $g_S$ for $N$ years, then at the stable rate $g$ forever:
+  $$ Value = \sum_{t=1}^{N} \frac{D_0 (1+g_S)^t}{(1+r)^t} + \frac{D_N (1+g)}{(r-g)(1+r)^N} $$
+- **H-model:** growth fades *linearly* from $g_S$ to $g$ over $N = 2H$ years:
+  $$ Value = \frac{D_0 (1+g)}{r-g} + \frac{D_0 \times H \times (g_S - g)}{r-g} $$
+
+The stable growth rate $g$ is the one entered above.
+""")
+if st.checkbox("Compare with fading-growth models"):
+    import valuation_engine as ve
+
+    col1, col2 = st.columns(2)
+    with col1:
+        high_growth_rate = st.number_input("High Growth Rate (g_S) in %", value=8.0, step=0.5, format="%.2f")
+    with col2:
+        high_growth_years = st.number_input("Years of High (or Fading) Growth (N)", min_value=0, max_value=50, value=5, step=1)
+    if discount_rate > growth_rate:
+        two_stage_value = float(ve.two_stage_ddm(dividend, discount_rate / 100, high_growth_rate / 100, high_growth_years, growth_rate / 100)[2][0])
+        h_model_value = float(ve.h_model_ddm(dividend, discount_rate / 100, high_growth_rate / 100, high_growth_years / 2, growth_rate / 100)[2][0])
+        st.table(pd.DataFrame({
+            "Model": ["Constant growth (Gordon)", "Two-stage", "H-model"],
+            "Share Value (€)": [f"{value:,.2f}", f"{two_stage_value:,.2f}", f"{h_model_value:,.2f}"],
+        }).set_index("Model"))
+        st.markdown("The H-model sits between the two: growth is above $g$ for the whole period, but not at full speed.")
+    else:
+        st.error("Discount rate must be greater than growth rate for a valid calculation.")
+
 st.markdown("---")
 st.markdown("### Final Takeaway")
 st.markdown("""
@@ -1,6 +1,4 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 
 # Configure the Streamlit app
 st.set_page_config(page_title="Evaluating Cyclical Companies", layout="centered", initial_sidebar_state="expanded")
@@ -159,6 +157,126 @@ else:
 
 st.markdown("---")
 
+st.markdown("### 🔍 Where Are We in the Cycle?")
+st.markdown("""
+Paste the company's yearly profits (oldest first). The trend is removed, the dominant cycle length is found with a frequency analysis,
+and the current season is read from where the latest year sits on that cycle. The normalized profit then averages exactly one full cycle.
+""")
+if st.checkbox("Detect the cycle from a profit history"):
+    import numpy as np
+    import pandas as pd
+    import valuation_cycles as vcy
+
+    history_text = st.text_area("Yearly Profits (in millions €, comma-separated)", value="8.8, 6.0, 3.2, 2.0, 3.2, 6.0, 8.8, 10.0, 8.8, 6.0, 3.2, 2.0, 3.2, 6.0, 8.8, 10.0")
+    try:
+        history = np.array([float(value) for value in history_text.replace(";", ",").split(",") if value.strip()])
+    except ValueError:
+        history = np.array([])
+    if history.size < 8:
+        st.error("Enter at least 8 numeric yearly profits to detect a cycle.")
+    else:
+        cycle_pe, cycles = vcy.cycle_normalized_pe(history, current_pe)
+        if cycles["phase"][0] == vcy.NO_PHASE:
+            st.error("No cycle found: the profits do not move around their trend.")
+        else:
+            season = vcy.PHASES[cycles["phase"][0]]
+            st.line_chart(pd.DataFrame({"Profit": history}, index=np.arange(1, history.size + 1)))
+            st.write(f"**Estimated Cycle Length:** {cycles['period'][0]:.1f} years")
+            st.write(f"**Current Season:** {season.capitalize()}")
+            st.write(f"**Average Profit over the Last Full Cycle:** € {cycles['normalized'][0]:.2f} million")
+            if np.isfinite(cycle_pe[0]):
+                st.write(f"**Cycle-Normalized P/E** (latest profit × current P/E ÷ full-cycle average): {cycle_pe[0]:.2f}")
+            else:
+                st.error("The full-cycle average profit must be greater than zero to calculate the normalized P/E.")
+            if cycles["strength"][0] < 0.3:
+                st.warning("The cycle explains little of the ups and downs in this history—treat the season as a rough guess.")
+            elif season == "peak":
+                st.warning("Profits are at or just past the top of the cycle: the 'E' in today's P/E is likely to fall.")
+            st.markdown("Compare this company only with peers in the same sector **and** the same season.")
+
+st.markdown("---")
+
+st.markdown("### 🌪️ Stress-Testing the Company")
+st.markdown("""
+A cyclical company must survive the winter, not just the average year. Each scenario below is a recession: how deep it goes,
+how long the trough lasts, and the shape of the recovery. Revenue falls by the company's cyclicality times the recession's depth,
+and profit falls faster—by the lost revenue times the contribution margin—because fixed costs stay. Each path is revalued with
+a DCF, and the value in the worst scenario tells you how large a margin of safety covers them all.
+""")
+if st.checkbox("Stress-test the company against recessions"):
+    import time
+    import numpy as np
+    import pandas as pd
+    import valuation_stress as vst
+
+    col1, col2 = st.columns(2)
+    with col1:
+        stress_revenue = st.number_input("Revenue Next Year (in millions €)", min_value=0.1, value=100.0, step=5.0)
+        revenue_growth = st.number_input("Revenue Growth (%)", min_value=-20.0, max_value=30.0, value=3.0, step=0.5)
+        stress_years = st.slider("Projection Years", min_value=3, max_value=20, value=10)
+        stress_rate = st.number_input("Discount Rate (%)", min_value=0.0, max_value=50.0, value=10.0, step=0.5)
+    with col2:
+        cyclicality = st.slider("Cyclicality (revenue drop vs. the economy)", min_value=0.0, max_value=3.0, value=1.5, step=0.1)
+        contribution_margin = st.slider("Contribution Margin (%)", min_value=0, max_value=100, value=30, help="Share of each lost euro of revenue that is lost from profit. Above the net margin, because fixed costs do not shrink in a recession.")
+        stress_growth = st.number_input("Terminal Growth Rate (%)", min_value=-5.0, max_value=10.0, value=2.0, step=0.5)
+    st.caption("Earnings start from the average profit over the last 10 years entered above, as a share of revenue.")
+
+    default_library = pd.DataFrame([
+        {"Scenario": name, "Depth (%)": s["depth"] * 100, "Years at Trough": s["duration"], "Recovery Years": s["recovery"], "Shape": s["shape"], "Starts in Year": s["start"]}
+        for name, s in vst.SCENARIOS.items()])
+    library = st.data_editor(default_library, num_rows="dynamic", hide_index=True, key="stress_library",
+                             column_config={"Shape": st.column_config.SelectboxColumn(options=list(vst.SHAPES), required=True)}).dropna()
+    st.caption("Depths are for a company of cyclicality 1. Shapes: V bounces straight back, U stays low longer, W dips a second time, L only wins back half of the loss.")
+    if library.empty:
+        st.error("Enter at least one scenario.")
+    elif stress_rate <= stress_growth:
+        st.error("Discount rate must be greater than the terminal growth rate for a valid calculation.")
+    else:
+        scenarios = {row["Scenario"]: dict(depth=row["Depth (%)"] / 100, duration=row["Years at Trough"], recovery=row["Recovery Years"], shape=row["Shape"], start=row["Starts in Year"])
+                     for _, row in library.iterrows()}
+        revenue = stress_revenue * (1 + revenue_growth / 100) ** np.arange(stress_years)
+        earnings = revenue * normalized_profit / stress_revenue
+        stress = vst.stress_test(revenue, earnings, cyclicality, contribution_margin / 100, stress_rate / 100, stress_growth / 100, scenarios=scenarios)
+        names = stress["scenarios"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Value without a Recession", f"€ {stress['base_value'][0]:,.1f}m")
+        col2.metric("Value at Stress", f"€ {stress['value_at_stress'][0]:,.1f}m", help=f"Value in the worst scenario: {names[stress['worst_scenario'][0]]}.")
+        col3.metric("Margin of Safety Needed", f"{stress['loss_at_stress'][0]:.0%}", help="Discount to the value without a recession that still covers every scenario of the library.")
+        st.dataframe(pd.DataFrame({"Scenario": names, "Value (€ millions)": stress["value"][:, 0], "Change": stress["value"][:, 0] / stress["base_value"][0] - 1})
+                     .style.format({"Value (€ millions)": "{:,.1f}", "Change": "{:.1%}"}), hide_index=True)
+        _, drop = vst.scenario_profiles(scenarios, stress_years)
+        paths = vst.stressed_earnings(revenue[None, :], earnings[None, :], np.array([cyclicality]), np.array([contribution_margin / 100]), drop)
+        stressed = pd.DataFrame(paths[:, 0, :].T, columns=names)
+        stressed.insert(0, "No Recession", earnings)
+        stressed.index = np.arange(1, stress_years + 1)
+        stressed.index.name = "Year"
+        st.markdown("**Earnings in Each Scenario (€ millions)**")
+        st.line_chart(stressed)
+
+        st.markdown("**Value at Stress by Sector** (a synthetic universe of cyclical companies)")
+
+        # The universe and its stress test depend only on the horizon and the
+        # scenario library, so reruns for other inputs reuse them.
+        @st.cache_data(max_entries=8)
+        def sector_stress_test(stress_years, scenarios):
+            start = time.perf_counter()
+            universe = vst.sample_universe(5_000, stress_years)
+            result = vst.stress_test(**universe, scenarios=scenarios)
+            return result, universe["rate"].size, (time.perf_counter() - start) * 1000
+
+        sector_stress, n_companies, elapsed_ms = sector_stress_test(stress_years, scenarios)
+        st.dataframe(pd.DataFrame({
+            "Sector": sector_stress["sectors"],
+            "Value without a Recession (€ millions)": sector_stress["sector_base_value"],
+            "Value at Stress (€ millions)": sector_stress["sector_value_at_stress"],
+            "Worst Scenario": np.array(names)[sector_stress["sector_value"].argmin(axis=0)],
+            "Loss at Stress": sector_stress["sector_loss_at_stress"],
+        }).style.format({"Value without a Recession (€ millions)": "{:,.0f}", "Value at Stress (€ millions)": "{:,.0f}", "Loss at Stress": "{:.1%}"}), hide_index=True)
+        st.caption(f"{len(names)} scenarios × {n_companies:,} companies × {stress_years} years valued in {elapsed_ms:.1f} ms, then reused until the horizon or the scenarios change. "
+                   "Deeply cyclical sectors with high operating leverage need the widest margin of safety.")
+
+st.markdown("---")
+
 st.markdown("""
 ### Final Thoughts
 Remember: when evaluating cyclical companies, it is essential not to get caught up with peak-cycle numbers.  
@@ -1,6 +1,4 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 
 # Configure the Streamlit app
 st.set_page_config(page_title="Evaluating Financial Companies: A Special Case", layout="centered", initial_sidebar_state="expanded")
@@ -165,6 +163,41 @@ st.markdown("""
 """)
 st.markdown("---")
 
+st.markdown("### 🏦 Screen a Whole Bank Universe")
+st.markdown("""
+Upload a CSV or Parquet file with one row per bank (columns `bank`, `roe`, `cost_of_capital`, `growth`, `market_pbv`, as decimals).
+Optional columns `roe_volatility`, `capital_ratio` and `npl_ratio` turn the checklist above into filters.
+The screener computes every bank's fair P/BV and lists the banks trading at the largest discount to it.
+""")
+if st.checkbox("Screen a bank universe"):
+    import valuation_banks as vb
+
+    bank_file = st.file_uploader("Bank universe", type=["csv", "parquet"])
+    col1, col2 = st.columns(2)
+    with col1:
+        min_roe = st.number_input("Minimum ROE (%)", value=10.0, step=0.5)
+        max_roe_volatility = st.number_input("Maximum ROE volatility (percentage points)", value=3.0, step=0.5)
+        top_banks = st.number_input("Banks to show", min_value=1, max_value=1000, value=10, step=5)
+    with col2:
+        min_capital_ratio = st.number_input("Minimum capital ratio, e.g. CET1 (%)", value=10.0, step=0.5)
+        max_npl_ratio = st.number_input("Maximum non-performing loans (%)", value=5.0, step=0.5)
+    checklist = dict(min_roe=min_roe / 100, max_roe_volatility=max_roe_volatility / 100,
+                     min_capital_ratio=min_capital_ratio / 100, max_npl_ratio=max_npl_ratio / 100)
+    if bank_file is None:
+        st.caption("No file? Download a sample universe of 10,000 banks and upload it.")
+        st.download_button("⬇️ Sample bank universe", vb.sample_banks(10_000).to_csv(index=False), file_name="bank_universe.csv")
+    else:
+        try:
+            cheapest_banks, screen_stats = vb.screen_bank_file(bank_file, top_banks, checklist)
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            st.write(f"**Screened:** {screen_stats['screened']:,} banks · **Passed the checklist:** {screen_stats['passed']:,}")
+            if screen_stats["skipped_filters"]:
+                st.info("Skipped filters (column not in file): " + ", ".join(screen_stats["skipped_filters"]))
+            st.dataframe(cheapest_banks, hide_index=True)
+st.markdown("---")
+
 st.markdown("""
 ### Classroom Analogy
 Evaluating a bank is like assessing a dam:  
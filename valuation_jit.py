@@ -0,0 +1,98 @@
+import numba
+import numpy as np
+
+# =============================================================================
+# Compiled kernels (optional, needs numba)
+# =============================================================================
+# The NumPy version of the three-phase growth DCF (valuation_engine) pads every
+# company to the longest horizon in the batch and builds several (n, T)
+# arrays. Here each company is walked over its own years only, so memory is
+# O(n) and no work is spent on padding. The formulas and the order of the
+# operations per year are the same as in three_phase_cash_flows and
+# dcf_schedule, so results agree with the NumPy path to rounding (the year
+# sums are added in a different order).
+#
+# The binomial lattice of valuation_options is compiled the same way: each
+# option walks back over one row of nodes in place, so a batch needs no
+# (options, nodes) arrays at all.
+#
+# valuation_engine imports this module lazily, only for large float64 batches
+# and only when numba is installed; compiled code is cached on disk, so the
+# compile cost (about a second) is paid once per machine, not per process.
+
+
+@numba.njit(parallel=True, cache=True)
+def _growth_company_dcf(startup_years, expansion_years, maturity_years, startup_cf,
+                        expansion_initial_cf, expansion_growth, maturity_growth, rate,
+                        pv, tv_pv):
+    for i in numba.prange(startup_years.shape[0]):
+        s, e = startup_years[i], expansion_years[i]
+        length = s + e + maturity_years[i]
+        growth_factor = 1.0 + expansion_growth[i]
+        discount = 1.0 + rate[i]
+        total = 0.0
+        last = 0.0
+        for t in range(1, length + 1):
+            if t <= s:
+                cash_flow = startup_cf[i]
+            else:
+                exp_steps = min(max(t - s - 1.0, 0.0), float(e))
+                mat_steps = max(t - s - e - 1.0, 0.0)
+                cash_flow = (expansion_initial_cf[i] * growth_factor ** exp_steps
+                             * (1.0 + maturity_growth[i]) ** mat_steps)
+            total += cash_flow * discount ** -float(t)
+            last = cash_flow
+        pv[i] = total
+        # Gordon terminal value on the last cash flow, NaN where r <= g.
+        if rate[i] > maturity_growth[i]:
+            tv = last * (1.0 + maturity_growth[i]) / (rate[i] - maturity_growth[i])
+            tv_pv[i] = tv * discount ** -float(length)
+        else:
+            tv_pv[i] = np.nan
+
+
+def growth_company_dcf(startup_years, expansion_years, maturity_years, startup_cf,
+                       expansion_initial_cf, expansion_growth, maturity_growth, rate):
+    """Compiled valuation_engine.growth_company_dcf for (n,) float64/int64 inputs.
+
+    Returns (pv of cash flows, pv of terminal value, intrinsic value).
+    """
+    n = startup_years.shape[0]
+    pv, tv_pv = np.empty(n), np.empty(n)
+    _growth_company_dcf(startup_years, expansion_years, maturity_years, startup_cf,
+                        expansion_initial_cf, expansion_growth, maturity_growth, rate,
+                        pv, tv_pv)
+    return pv, tv_pv, pv + tv_pv
+
+
+@numba.njit(parallel=True, cache=True)
+def _binomial(value, strike, years, rate, volatility, dividend_yield, sign, american, steps, out):
+    for o in numba.prange(value.shape[0]):
+        dt = years[o] / steps
+        move = volatility[o] * np.sqrt(dt)
+        up = (np.exp((rate[o] - dividend_yield[o]) * dt) - np.exp(-move)) / (np.exp(move) - np.exp(-move))
+        if not (up >= 0.0 and up <= 1.0):
+            out[o] = np.nan
+            continue
+        discount = np.exp(-rate[o] * dt)
+        p_up, p_down = discount * up, discount * (1.0 - up)
+        # Exercise value at u^k, k = -steps..steps, then one row of nodes.
+        payoff = np.empty(2 * steps + 1)
+        for k in range(2 * steps + 1):
+            payoff[k] = max(sign * (value[o] * np.exp(move * (k - steps)) - strike[o]), 0.0)
+        nodes = payoff[::2].copy()
+        for i in range(steps - 1, -1, -1):
+            for j in range(i + 1):
+                node = p_up * nodes[j + 1] + p_down * nodes[j]
+                if american:
+                    node = max(node, payoff[steps - i + 2 * j])
+                nodes[j] = node
+        out[o] = nodes[0]
+
+
+def binomial(value, strike, years, rate, volatility, dividend_yield, kind, american, steps):
+    """Compiled valuation_options.binomial for (n,) float64 inputs."""
+    out = np.empty(value.shape[0])
+    _binomial(value, strike, years, rate, volatility, dividend_yield,
+              1.0 if kind == "call" else -1.0, american, steps, out)
+    return out
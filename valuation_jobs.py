@@ -0,0 +1,352 @@
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import numpy as np
+
+import valuation_cache as vc
+import valuation_engine as ve
+
+# =============================================================================
+# Background jobs for universe-scale runs
+# =============================================================================
+# Long valuations are handed to a local process pool so the Streamlit script
+# returns immediately. Every job has a row in a small SQLite table on disk:
+# workers write progress, partial results and the final arrays there, and the
+# UI only polls that table. Because the table (not the browser session) owns
+# the job, a refreshed page can pick the job up again by its id.
+
+STATE_DIR = os.environ.get("VALUATION_STATE_DIR", ".valuation")
+JOB_DB_PATH = os.path.join(STATE_DIR, "jobs.sqlite3")
+MAX_WORKERS = int(os.environ.get("VALUATION_JOB_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+
+# Minimum seconds between two progress writes from one worker.
+PROGRESS_INTERVAL = 0.25
+
+ACTIVE_STATES = ("queued", "running")
+
+# Job parameters that count companies, paths or results: at least 1.
+SIZE_PARAMS = ("n_companies", "paths", "n_banks", "top_k")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    partial TEXT,
+    result BLOB,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+JOB_KINDS = {}
+_POOL = None
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when the user cancelled its job."""
+
+
+def register_job_kind(name, version=1):
+    """Decorator adding `fn(params, progress) -> dict of arrays` as a job kind.
+
+    Results are shared through valuation_cache under `name`; bump `version`
+    when the job's computation changes. Edits to the valuation engine or to
+    the module defining `fn` retire the cached results on their own
+    (valuation_cache.engine_version).
+    """
+    def decorator(fn):
+        JOB_KINDS[name] = fn
+        vc.register_model(name, vc.engine_version(version, (inspect.getsourcefile(fn),)))
+        return fn
+    return decorator
+
+
+def connect(path=None):
+    path = path or JOB_DB_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _pool():
+    global _POOL
+    if _POOL is None:
+        _recover_orphans()
+        # "spawn" keeps workers independent of the Streamlit server's threads.
+        _POOL = ProcessPoolExecutor(max_workers=MAX_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _recover_orphans(path=None):
+    # Jobs owned by a server that is gone will never finish; say so instead of
+    # leaving them "running" forever.
+    with closing(connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT id, owner_pid FROM jobs WHERE status IN (?, ?)", ACTIVE_STATES).fetchall()
+        for row in rows:
+            if row["owner_pid"] is None or not _pid_alive(row["owner_pid"]):
+                conn.execute(
+                    "UPDATE jobs SET status='failed', error=?, updated_at=? WHERE id=?",
+                    ("Interrupted: the server that ran this job stopped.", time.time(), row["id"]))
+
+
+def submit(kind, params, path=None):
+    """Queue a job and return its id."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    small = [name for name in SIZE_PARAMS if name in params and int(params[name]) < 1]
+    if small:
+        raise ValueError(f"{', '.join(small)} must be at least 1.")
+    job_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    with closing(connect(path)) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, params, status, owner_pid, created_at, updated_at)"
+            " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(params), os.getpid(), now, now))
+    _pool().submit(_run_job, job_id, path)
+    return job_id
+
+
+def get_job(job_id, path=None):
+    """Job row as a dict (without the result blob), or None."""
+    with closing(connect(path)) as conn:
+        row = conn.execute(
+            "SELECT id, kind, params, status, progress, message, partial, error,"
+            " cancel_requested, created_at, updated_at FROM jobs WHERE id=?",
+            (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["partial"] = json.loads(job["partial"]) if job["partial"] else None
+    return job
+
+
+def list_jobs(limit=20, path=None):
+    with closing(connect(path)) as conn:
+        rows = conn.execute(
+            "SELECT id, kind, status, progress, message, created_at FROM jobs"
+            " ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def cancel(job_id, path=None):
+    """Ask a job to stop; queued jobs are cancelled right away."""
+    with closing(connect(path)) as conn:
+        conn.execute("UPDATE jobs SET cancel_requested=1, updated_at=? WHERE id=?",
+                     (time.time(), job_id))
+        conn.execute("UPDATE jobs SET status='cancelled' WHERE id=? AND status='queued'",
+                     (job_id,))
+
+
+def load_result(job_id, path=None):
+    """Arrays stored by a finished job, or None if it has no result."""
+    with closing(connect(path)) as conn:
+        row = conn.execute("SELECT result FROM jobs WHERE id=?", (job_id,)).fetchone()
+    if row is None or row["result"] is None:
+        return None
+    with np.load(io.BytesIO(row["result"])) as data:
+        return {name: data[name] for name in data.files}
+
+
+class Progress:
+    """Handle passed to job functions for reporting progress.
+
+    `update` throttles writes to the job table and raises JobCancelled once
+    the user has asked the job to stop, so long loops exit between chunks.
+    """
+
+    def __init__(self, conn, job_id):
+        self.conn = conn
+        self.job_id = job_id
+        self._last_write = 0.0
+
+    def update(self, done, total, message="", partial=None, force=False):
+        now = time.time()
+        if not force and done < total and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        self.conn.execute(
+            "UPDATE jobs SET progress=?, message=?, partial=COALESCE(?, partial),"
+            " updated_at=? WHERE id=?",
+            (done / total if total else 1.0, message,
+             json.dumps(partial) if partial is not None else None, now, self.job_id))
+        cancelled = self.conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id=?", (self.job_id,)).fetchone()[0]
+        if cancelled:
+            raise JobCancelled()
+
+
+def _run_job(job_id, path=None):
+    conn = connect(path)
+    try:
+        row = conn.execute("SELECT kind, params, cancel_requested FROM jobs WHERE id=?",
+                           (job_id,)).fetchone()
+        if row is None or row["cancel_requested"]:
+            return
+        conn.execute("UPDATE jobs SET status='running', updated_at=? WHERE id=?",
+                     (time.time(), job_id))
+        progress = Progress(conn, job_id)
+        params = json.loads(row["params"])
+        # Identical runs reuse the stored result; exports must run to write their files.
+        cache = None if params.get("export") else vc.default_cache()
+        try:
+            with ve.dtype_policy(params.get("dtype", ve.DEFAULT_DTYPE)):
+                arrays = cache.get(row["kind"], params) if cache else None
+                if arrays is None:
+                    arrays = JOB_KINDS[row["kind"]](params, progress)
+                    if cache:
+                        cache.put(row["kind"], params, arrays)
+                else:
+                    progress.update(1, 1, "Reused a cached result", force=True)
+        except JobCancelled:
+            conn.execute("UPDATE jobs SET status='cancelled', updated_at=? WHERE id=?",
+                         (time.time(), job_id))
+            return
+        except Exception as exc:
+            conn.execute("UPDATE jobs SET status='failed', error=?, updated_at=? WHERE id=?",
+                         (f"{type(exc).__name__}: {exc}", time.time(), job_id))
+            return
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        conn.execute(
+            "UPDATE jobs SET status='done', progress=1, result=?, updated_at=? WHERE id=?",
+            (buffer.getvalue(), time.time(), job_id))
+    finally:
+        conn.close()
+
+
+# -----------------------------------------------------------------------------
+# Job kinds
+# -----------------------------------------------------------------------------
+# Until real universes are loaded, jobs sample synthetic companies around the
+# lesson defaults; `seed` makes every run reproducible.
+
+def _chunks(n, chunk_size):
+    for start in range(0, n, chunk_size):
+        yield start, min(start + chunk_size, n)
+
+
+def _sample_growth_companies(rng, n):
+    return dict(
+        startup_years=rng.integers(0, 11, n),
+        expansion_years=rng.integers(1, 11, n),
+        maturity_years=rng.integers(1, 21, n),
+        startup_cf=rng.normal(-50000.0, 15000.0, n),
+        expansion_initial_cf=rng.lognormal(np.log(20000.0), 0.4, n),
+        expansion_growth=rng.uniform(0.0, 0.50, n),
+        maturity_growth=rng.uniform(0.0, 0.08, n),
+        rate=rng.uniform(0.10, 0.20, n),
+    )
+
+
+@register_job_kind("growth_universe")
+def run_growth_universe(params, progress):
+    """Value a universe of three-phase growth companies.
+
+    With `export` set, summaries (and yearly schedules with `export_schedule`)
+    are streamed chunk by chunk to Parquet files under STATE_DIR/exports.
+    """
+    n = int(params.get("n_companies", 1_000_000))
+    chunk_size = int(params.get("chunk_size", 100_000))
+    rng = np.random.default_rng(params.get("seed", 0))
+    values = np.empty(n)
+    writers = []
+    if params.get("export"):
+        import valuation_export as vx
+
+        os.makedirs(os.path.join(STATE_DIR, "exports"), exist_ok=True)
+        prefix = os.path.join(STATE_DIR, "exports", progress.job_id)
+        writers.append((vx.BatchWriter(prefix + "_summary.parquet", vx.SUMMARY_SCHEMA), vx.summary_batch))
+        if params.get("export_schedule"):
+            writers.append((vx.BatchWriter(prefix + "_schedule.parquet", vx.SCHEDULE_SCHEMA), vx.schedule_batch))
+    try:
+        for start, stop in _chunks(n, chunk_size):
+            schedule = ve.growth_company_schedule(**_sample_growth_companies(rng, stop - start))
+            values[start:stop] = schedule["intrinsic_value"]
+            for writer, make_batch in writers:
+                writer.write(make_batch(schedule, start))
+            progress.update(stop, n, f"Valued {stop:,} of {n:,} companies",
+                            partial={"valued": stop, "median_value": float(np.nanmedian(values[:stop])),
+                                     "exports": [writer.path for writer, _ in writers]})
+    finally:
+        for writer, _ in writers:
+            writer.close()
+    return {"intrinsic_value": values}
+
+
+@register_job_kind("monte_carlo")
+def run_monte_carlo(params, progress):
+    """Monte Carlo of the lesson-0 DCF with uncertain growth and discount rates."""
+    paths = int(params.get("paths", 2_000_000))
+    chunk_size = int(params.get("chunk_size", 200_000))
+    rng = np.random.default_rng(params.get("seed", 0))
+    cash_flow = float(params.get("cash_flow", 100000.0))
+    years = int(params.get("years", 10))
+    growth = rng.normal(params.get("growth_mean", 0.05), params.get("growth_std", 0.02),
+                        paths).astype(ve.get_dtype())
+    rate = rng.normal(params.get("rate_mean", 0.10), params.get("rate_std", 0.015),
+                      paths).astype(ve.get_dtype())
+    values = np.empty(paths)
+    for start, stop in _chunks(paths, chunk_size):
+        values[start:stop] = ve.constant_growth_dcf(cash_flow, growth[start:stop],
+                                                    rate[start:stop], years)
+        p5, p50, p95 = np.percentile(values[:stop], [5, 50, 95])
+        progress.update(stop, paths, f"Simulated {stop:,} of {paths:,} paths",
+                        partial={"paths": stop, "p5": p5, "p50": p50, "p95": p95})
+    return {"value": values, "growth": growth, "rate": rate}
+
+
+@register_job_kind("pbv_screen")
+def run_pbv_screen(params, progress):
+    """Screen a bank universe for the largest fair-P/BV discounts."""
+    n = int(params.get("n_banks", 1_000_000))
+    top_k = int(params.get("top_k", 50))
+    chunk_size = int(params.get("chunk_size", 250_000))
+    rng = np.random.default_rng(params.get("seed", 0))
+    discount = np.empty(n)
+    for start, stop in _chunks(n, chunk_size):
+        size = stop - start
+        fair = ve.fair_pbv(rng.normal(0.11, 0.03, size), rng.uniform(0.08, 0.12, size),
+                           rng.uniform(0.0, 0.05, size))
+        market = rng.lognormal(np.log(1.1), 0.3, size)
+        # A non-positive fair P/BV has no meaningful discount.
+        discount[start:stop] = np.where(fair > 0, 1.0 - market / fair, np.nan)
+        progress.update(stop, n, f"Screened {stop:,} of {n:,} banks",
+                        partial={"screened": stop})
+    if min(top_k, n) < 1:
+        return {"bank_index": np.empty(0, dtype=np.int64), "discount": np.empty(0)}
+    ranked = np.where(np.isnan(discount), -np.inf, discount)
+    top = np.argpartition(-ranked, min(top_k, n) - 1)[:top_k]
+    top = top[np.argsort(-ranked[top])]
+    return {"bank_index": top, "discount": discount[top]}
@@ -0,0 +1,271 @@
+import time
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+import valuation_cache as vc
+import valuation_jobs as jobs
+from valuation_peer_stats import PeerStats
+
+# Configure the Streamlit app
+st.set_page_config(page_title="Valuation Lab – Universe-Scale Runs", layout="centered", initial_sidebar_state="expanded")
+
+# Custom CSS for improved readability on mobile devices
+st.markdown("""
+    <style>
+    .main {
+        max-width: 800px;
+        margin: auto;
+        padding: 20px;
+    }
+    .footer {
+        font-size: 0.8em;
+        text-align: center;
+        color: #777;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+st.title("🧪 Valuation Lab – Universe-Scale Runs")
+st.markdown("""
+The lessons value **one company at a time**. Here the same formulas run over whole universes
+of companies or millions of Monte Carlo paths.
+
+Runs happen in the **background**: start a job, keep reading, and come back to it later.
+Each job has an **ID** – you can refresh the page or share the link and still find it.
+""")
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Start a Job
+# ----------------------------------------------------------------------------
+st.header("Start a Background Job")
+job_labels = {
+    "Growth-company universe (three-phase DCF)": "growth_universe",
+    "Monte Carlo DCF (uncertain growth and discount rate)": "monte_carlo",
+    "Bank screen (fair P/BV discount)": "pbv_screen",
+}
+with st.form("new_job"):
+    label = st.selectbox("Job type", list(job_labels))
+    size = st.number_input("Companies / paths", min_value=1000, max_value=50_000_000, value=1_000_000, step=100_000)
+    seed = st.number_input("Random seed", min_value=0, value=0, step=1)
+    dtype = st.radio("Numeric precision", ["float64", "float32 (compact, half the memory)"], horizontal=True)
+    export = st.checkbox("Export growth-universe results to Parquet (summary + yearly schedule)")
+    submitted = st.form_submit_button("Start job")
+
+if submitted:
+    kind = job_labels[label]
+    size_param = {"growth_universe": "n_companies", "monte_carlo": "paths", "pbv_screen": "n_banks"}[kind]
+    params = {size_param: int(size), "seed": int(seed), "dtype": dtype.split()[0],
+              "export": export, "export_schedule": export}
+    job_id = jobs.submit(kind, params)
+    st.query_params["job"] = job_id
+    st.success(f"Job **{job_id}** started.")
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Follow a Job
+# ----------------------------------------------------------------------------
+st.header("Follow a Job")
+# The job table and progress bar rerun on their own every second while a
+# job is queued or running; the rest of the page is not rerun. When the
+# followed job finishes, one full rerun shows its results below.
+auto_refresh = st.checkbox("Auto-refresh while a job is running", value=True)
+polling = auto_refresh and any(j["status"] in jobs.ACTIVE_STATES for j in jobs.list_jobs())
+
+
+@st.fragment(run_every=1.0 if polling else None)
+def follow_job():
+    recent = jobs.list_jobs()
+    if recent:
+        table = pd.DataFrame(recent)
+        table["created_at"] = pd.to_datetime(table["created_at"], unit="s")
+        table["progress"] = (table["progress"] * 100).round(0)
+        st.dataframe(table, hide_index=True)
+
+    job_id = st.text_input("Job ID", value=st.query_params.get("job", recent[0]["id"] if recent else ""))
+    st.session_state["followed_job"] = job_id
+    job = jobs.get_job(job_id) if job_id else None
+    if job_id and job is None:
+        st.error("No job with this ID was found.")
+    elif job is not None:
+        st.query_params["job"] = job["id"]
+        st.write(f"**Type:** {job['kind']} · **Status:** {job['status']}")
+        st.progress(min(job["progress"], 1.0), text=job["message"] or job["status"])
+        if job["partial"]:
+            st.write("**Partial results:**", job["partial"])
+        if job["status"] in jobs.ACTIVE_STATES:
+            st.session_state["job_running"] = job["id"]
+            if st.button("Cancel job"):
+                jobs.cancel(job["id"])
+        elif st.session_state.pop("job_running", None) == job["id"] and polling:
+            st.rerun()
+
+
+follow_job()
+job_id = st.session_state.get("followed_job")
+job = jobs.get_job(job_id) if job_id else None
+if job is not None:
+    if job["status"] == "failed":
+        st.error(job["error"])
+    elif job["status"] == "done":
+        result = jobs.load_result(job["id"])
+        if job["kind"] == "pbv_screen":
+            st.markdown("#### Cheapest Banks by Discount to Fair P/BV")
+            st.dataframe(pd.DataFrame({"Bank": result["bank_index"], "Discount": result["discount"]}), hide_index=True)
+        else:
+            values = result["intrinsic_value"] if job["kind"] == "growth_universe" else result["value"]
+            finite = values[np.isfinite(values)]
+            st.write(f"**Valued:** {values.size:,} · **Invalid (r ≤ g):** {values.size - finite.size:,}")
+            if finite.size == 0:
+                st.warning("No valid values: every discount rate was at or below its growth rate.")
+            else:
+                p5, p50, p95 = np.percentile(finite, [5, 50, 95])
+                st.write(f"**5th / 50th / 95th percentile:** ${p5:,.0f} / ${p50:,.0f} / ${p95:,.0f}")
+                counts, edges = np.histogram(finite, bins=50, range=(np.percentile(finite, 1), np.percentile(finite, 99)))
+                st.bar_chart(pd.DataFrame({"Companies": counts}, index=np.round(edges[:-1], 0)))
+
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Sector Regressions
+# ----------------------------------------------------------------------------
+st.header("Growth-Adjusted Multiples Across Sectors")
+st.markdown("""
+Within every sector, P/E and EV/EBITDA are regressed on **growth**, **risk** (beta) and **payout**.
+Each company is then compared with the multiple its fundamentals would justify: a negative
+residual means it trades *below* its fundamentals-based multiple.
+""")
+col1, col2 = st.columns(2)
+with col1:
+    n_sectors = st.number_input("Sectors", min_value=1, max_value=5000, value=500, step=50)
+with col2:
+    n_companies = st.number_input("Companies", min_value=100, max_value=5_000_000, value=100_000, step=10_000)
+if st.button("Run sector regressions"):
+    import valuation_multiples as vm
+
+    rng = np.random.default_rng(0)
+    sector = rng.integers(0, n_sectors, n_companies)
+    features = np.column_stack([rng.normal(0.08, 0.04, n_companies),    # growth
+                                rng.normal(1.0, 0.3, n_companies),      # risk (beta)
+                                rng.uniform(0.0, 0.8, n_companies)])    # payout
+    slopes = rng.normal([12.0, 60.0, -4.0, 6.0], [3.0, 20.0, 2.0, 3.0], (n_sectors, 4))
+    pe = slopes[sector, 0] + np.einsum("np,np->n", slopes[sector, 1:], features) + rng.normal(0, 2.0, n_companies)
+    pe[rng.random(n_companies) < 0.05] = np.nan    # negative earnings: no P/E
+    ev_ebitda = 0.6 * np.nan_to_num(pe, nan=10.0) + rng.normal(0, 1.5, n_companies)
+    start = time.perf_counter()
+    fit = vm.fit_sector_regressions(np.column_stack([pe, ev_ebitda]), features, sector)
+    elapsed = time.perf_counter() - start
+    st.write(f"**Fitted** {2 * n_sectors:,} regressions over {n_companies:,} companies in {elapsed:.2f} s")
+    st.write(f"**Median R²:** P/E {np.nanmedian(fit['r2'][0]):.2f} · EV/EBITDA {np.nanmedian(fit['r2'][1]):.2f}")
+    cheapest = np.argsort(np.nan_to_num(fit["residual"][:, 0], nan=np.inf))[:10]
+    st.markdown("#### Largest Discounts to the Growth-Adjusted P/E")
+    st.dataframe(pd.DataFrame({
+        "Company": cheapest,
+        "Sector": sector[cheapest],
+        "P/E": pe[cheapest],
+        "Justified P/E": fit["predicted"][cheapest, 0],
+        "Residual": fit["residual"][cheapest, 0],
+    }), hide_index=True)
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Cycle Phases
+# ----------------------------------------------------------------------------
+st.header("Cycle Phases Across a Panel")
+st.markdown("""
+For every company the earnings history is detrended, the dominant cycle length is found with an FFT
+and the current season (expansion, peak, recession, recovery) is read from the fitted cycle.
+Normalized P/Es then average one full *detected* cycle, and peers are only those in the same sector **and** season.
+""")
+col1, col2 = st.columns(2)
+with col1:
+    n_cyclicals = st.number_input("Cyclical companies", min_value=100, max_value=200_000, value=5_000, step=1_000)
+with col2:
+    n_history = st.number_input("Years of history", min_value=12, max_value=200, value=40, step=4)
+if st.button("Detect cycles"):
+    import valuation_cycles as vcy
+
+    rng = np.random.default_rng(0)
+    sector = rng.integers(0, 50, n_cyclicals)
+    # Companies in a sector share its cycle, with their own trend, amplitude and noise.
+    sector_period, sector_offset = rng.uniform(5, 12, 50), rng.uniform(0, 2 * np.pi, 50)
+    years = np.arange(n_history)
+    earnings = (rng.uniform(5, 20, (n_cyclicals, 1)) * (1 + rng.normal(0.02, 0.01, (n_cyclicals, 1)) * years)
+                + rng.uniform(2, 6, (n_cyclicals, 1)) * np.cos(2 * np.pi * years / sector_period[sector, None] + sector_offset[sector, None])
+                + rng.normal(0, 1.0, (n_cyclicals, n_history)))
+    current_pe = rng.lognormal(np.log(10.0), 0.3, n_cyclicals)
+    start = time.perf_counter()
+    cycle_pe, cycles = vcy.cycle_normalized_pe(earnings, current_pe)
+    peer_median = vcy.phase_peer_median(cycle_pe, sector, cycles["phase"])
+    elapsed = time.perf_counter() - start
+    st.write(f"**Tagged** {n_cyclicals:,} companies × {n_history} years in {elapsed:.2f} s")
+    st.write("**Companies per season:** " + " · ".join(
+        f"{name.capitalize()} {count:,}" for name, count in zip(vcy.PHASES, np.bincount(cycles["phase"], minlength=4))))
+    st.markdown("#### Lowest Headline P/Es – and Where They Stand in the Cycle")
+    cheapest = np.argsort(current_pe)[:10]
+    st.dataframe(pd.DataFrame({
+        "Company": cheapest,
+        "Sector": sector[cheapest],
+        "Season": [vcy.PHASE_LABELS[p].capitalize() for p in cycles["phase"][cheapest]],
+        "Cycle (years)": cycles["period"][cheapest],
+        "P/E": current_pe[cheapest],
+        "Normalized P/E": cycle_pe[cheapest],
+        "Same-Season Peer Median": peer_median[cheapest],
+    }), hide_index=True)
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Live Peer Statistics
+# ----------------------------------------------------------------------------
+st.header("Live Peer Statistics")
+st.markdown("""
+Prices tick all day, and every tick changes a P/E. Instead of recomputing each sector's median and
+standard deviation from scratch, running statistics absorb each tick in constant time – z-scores and
+percentile ranks are then answered without rescanning the peers.
+""")
+if "peer_stats" not in st.session_state:
+    rng = np.random.default_rng(1)
+    universe_pe = rng.lognormal(np.log(15.0), 0.4, 100_000)
+    st.session_state.peer_stats = PeerStats(rng.integers(0, 500, universe_pe.size), universe_pe)
+    st.session_state.peer_ticks = 0
+peer_stats = st.session_state.peer_stats
+if st.button("Apply 100,000 price ticks"):
+    rng = np.random.default_rng(st.session_state.peer_ticks)
+    ticked = rng.integers(0, peer_stats.values.size, 100_000)
+    start = time.perf_counter()
+    peer_stats.update_many(ticked, peer_stats.values[ticked] * rng.lognormal(0.0, 0.02, ticked.size))
+    st.session_state.peer_ticks += ticked.size
+    st.write(f"Absorbed 100,000 ticks in {(time.perf_counter() - start) * 1000:.0f} ms")
+company = st.number_input("Company", min_value=0, max_value=peer_stats.values.size - 1, value=0, step=1)
+sector = peer_stats.sector_of[company]
+st.write(f"**Sector {peer_stats.labels[sector]}:** {peer_stats.count[sector]:.0f} peers · "
+         f"mean P/E {peer_stats.mean[sector]:.2f} · std {peer_stats.std(sector):.2f} · "
+         f"median ≈ {peer_stats.quantile(sector, 0.5):.2f}")
+st.write(f"**Company {company}:** P/E {peer_stats.values[company]:.2f} · "
+         f"z-score {peer_stats.company_zscore(company):+.2f} · "
+         f"percentile rank {peer_stats.company_percentile(company):.0%}")
+st.caption(f"{st.session_state.peer_ticks:,} ticks applied this session.")
+st.markdown("---")
+
+# ----------------------------------------------------------------------------
+# Shared Result Cache
+# ----------------------------------------------------------------------------
+st.header("Shared Result Cache")
+st.markdown("Valuations are cached on disk and reused by every app process and background job on this machine.")
+cache_stats = vc.default_cache().stats()
+st.write(f"**Hit rate (this server):** {cache_stats['hit_rate']:.0%} of {cache_stats['lookups']} lookups")
+st.write(f"**Lookup latency:** {cache_stats['mean_lookup_ms']:.2f} ms mean, {cache_stats['p95_lookup_ms']:.2f} ms p95")
+st.write(f"**Stored:** {cache_stats['entries']} results, {cache_stats['size_mb']:.1f} MB")
+if st.button("Clear cache"):
+    vc.default_cache().invalidate()
+    st.rerun()
+
+st.markdown("---")
+st.markdown("""
+### Why Background Jobs?
+A universe of a million companies takes seconds, not milliseconds.
+Running it inside the page would freeze the app for everyone watching; a background worker keeps
+the page responsive and lets you cancel a run that is no longer needed.
+""")
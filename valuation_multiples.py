@@ -0,0 +1,126 @@
+import numpy as np
+
+# =============================================================================
+# Growth-adjusted multiples
+# =============================================================================
+# Lesson 2 compares a company's P/E with the peer median. A regression goes one
+# step further: within each sector it fits
+#
+#     multiple = b0 + b1 * growth + b2 * risk + b3 * payout + residual
+#
+# and compares each company with the multiple *predicted* for its fundamentals.
+# All sectors are fitted at once: the per-sector normal equations X'X and X'y
+# are accumulated with np.bincount in a single pass over the universe, then
+# solved as one stacked (sectors x p x p) system. Several multiples (e.g. P/E
+# and EV/EBITDA) share that pass.
+
+CHUNK_ROWS = 1_000_000
+
+
+def _sector_codes(sectors):
+    labels, codes = np.unique(np.asarray(sectors), return_inverse=True)
+    return labels, codes.ravel()
+
+
+def fit_sector_regressions(multiples, features, sectors, min_companies=None):
+    """Fit every multiple on the features separately within each sector.
+
+    multiples: (n,) or (n, k) array; NaN marks a missing multiple (for
+               example a P/E with negative earnings), excluded from that fit.
+    features:  (n, p) array such as growth, risk and payout.
+    sectors:   (n,) sector labels of any type.
+
+    Returns a dict with "sectors" (S labels), "coefficients" (k, S, p + 1;
+    intercept first), "counts" and "r2" (k, S), plus per company
+    "predicted" and "residual" (n, k). Sectors with fewer than
+    `min_companies` usable rows (default: number of features + 2) get NaN
+    coefficients.
+    """
+    y = np.asarray(multiples, dtype=np.float64)
+    y = y[:, None] if y.ndim == 1 else y
+    x = np.asarray(features, dtype=np.float64)
+    x = x[:, None] if x.ndim == 1 else x
+    n, k = y.shape
+    p = x.shape[1] + 1
+    labels, codes = _sector_codes(sectors)
+    n_sectors = labels.size
+    min_companies = p + 1 if min_companies is None else min_companies
+    # Centering the features keeps X'X well conditioned; the intercept is
+    # shifted back after the solve.
+    center = np.nanmean(x, axis=0)
+
+    xtx = np.zeros((k, n_sectors, p, p))
+    xty = np.zeros((k, n_sectors, p))
+    counts = np.zeros((k, n_sectors))
+    rows, cols = np.triu_indices(p)
+    for start in range(0, n, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, n)
+        design = np.empty((stop - start, p))
+        design[:, 0] = 1.0
+        design[:, 1:] = x[start:stop] - center
+        code = codes[start:stop]
+        design_ok = np.isfinite(design).all(axis=1)
+        shared = None
+        for m in range(k):
+            target = y[start:stop, m]
+            usable = design_ok & np.isfinite(target)
+            xw = np.where(usable[:, None], design, 0.0)
+            yw = np.where(usable, target, 0.0)
+            # Multiples without missing values share the same X'X.
+            if shared is None or not usable.all():
+                block = np.stack([np.bincount(code, xw[:, i] * xw[:, j], minlength=n_sectors)
+                                  for i, j in zip(rows, cols)], axis=-1)
+                if usable.all():
+                    shared = block
+            else:
+                block = shared
+            xtx[m, :, rows, cols] += block.T
+            counts[m] += np.bincount(code, usable, minlength=n_sectors)
+            for i in range(p):
+                xty[m, :, i] += np.bincount(code, xw[:, i] * yw, minlength=n_sectors)
+    xtx[..., cols, rows] = xtx[..., rows, cols]
+
+    # pinv handles sectors where a feature is constant (rank-deficient X'X).
+    beta = np.einsum("kspq,ksq->ksp", np.linalg.pinv(xtx), xty)
+    beta[counts < min_companies] = np.nan
+    beta[..., 0] -= beta[..., 1:] @ center
+    fit = dict(sectors=labels, coefficients=beta, counts=counts)
+    fit["predicted"] = _predict(beta, x, codes)
+    fit["residual"] = y - fit["predicted"]
+
+    # R^2 per sector from the same bincount machinery.
+    fit["r2"] = np.full((k, n_sectors), np.nan)
+    for m in range(k):
+        ok = np.isfinite(y[:, m]) & np.isfinite(fit["residual"][:, m])
+        code, target = codes[ok], y[ok, m]
+        used = np.bincount(code, minlength=n_sectors)
+        mean = np.bincount(code, target, minlength=n_sectors) / np.maximum(used, 1)
+        ss_res = np.bincount(code, fit["residual"][ok, m] ** 2, minlength=n_sectors)
+        ss_tot = np.bincount(code, (target - mean[code]) ** 2, minlength=n_sectors)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fit["r2"][m] = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.nan)
+    return fit
+
+
+def predict_multiples(fit, features, sectors):
+    """Multiples implied by a fitted regression, shape (n, k).
+
+    Companies in sectors the fit has not seen get NaN.
+    """
+    x = np.asarray(features, dtype=np.float64)
+    x = x[:, None] if x.ndim == 1 else x
+    labels = fit["sectors"]
+    sectors = np.asarray(sectors)
+    position = np.searchsorted(labels, sectors).clip(0, labels.size - 1)
+    predicted = _predict(fit["coefficients"], x, position)
+    predicted[labels[position] != sectors] = np.nan
+    return predicted
+
+
+def _predict(beta, x, codes):
+    predicted = np.empty((x.shape[0], beta.shape[0]))
+    for start in range(0, x.shape[0], CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, x.shape[0])
+        rows = beta[:, codes[start:stop], :]                        # (k, rows, p + 1)
+        predicted[start:stop] = (rows[..., 0] + np.einsum("knp,np->kn", rows[..., 1:], x[start:stop])).T
+    return predicted
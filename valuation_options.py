@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Real options
+# =============================================================================
+# Contingent valuation: the right, not the obligation, to act on a project
+# later is worth more than its static DCF says. The project's present value
+# plays the role of the stock price and the investment (or salvage value)
+# the role of the strike:
+#
+#   - Expansion:   a call; pay `cost` to get a project worth `value`.
+#   - Abandonment: a put; give up a project worth `value` for `salvage`.
+#   - Delay (e.g. a patent): a call whose value leaks away as the exclusive
+#     years run out; use dividend_yield = 1 / years of protection.
+#
+# black_scholes is the closed form for options exercised only at the end.
+# binomial is a Cox-Ross-Rubinstein lattice that also handles exercise at
+# any step (abandonment can happen at any time). Both price whole arrays of
+# options per call. The lattice keeps only one row of node values per option
+# (O(steps) memory, not the O(steps^2) tree) and walks back one step at a
+# time over all options of a chunk, so thousands of options x thousands of
+# steps need no Python loop over options or nodes. Large batches use the
+# compiled kernel of valuation_jit when numba is installed.
+#
+# Rates are continuously compounded; years, rate, volatility and yields are
+# annual.
+
+KINDS = ("call", "put")
+DEFAULT_STEPS = 500
+LATTICE_CHUNK_CELLS = 131_072   # options x nodes per lattice chunk (1 MB per array)
+
+# Normal tail probabilities without a Python call per element: Hart's (1968)
+# rational approximation for |x| < 10 / sqrt(2), as given by West, "Better
+# approximations to cumulative normal functions" (2005), and a 12-term
+# continued fraction of the Mills ratio beyond. Within 1e-15 of math.erf
+# absolutely and 1e-8 relatively, tails included.
+_HART_NUMERATOR = (3.52624965998911e-02, 0.700383064443688, 6.37396220353165, 33.912866078383,
+                   112.079291497871, 221.213596169931, 220.206867912376)
+_HART_DENOMINATOR = (8.83883476483184e-02, 1.75566716318264, 16.064177579207, 86.7807322029461,
+                     296.564248779674, 637.333633378831, 793.826512519948, 440.413735824752)
+
+
+def normal_cdf(x):
+    """Standard normal CDF, element-wise."""
+    x = np.asarray(x, dtype=np.float64)
+    z = np.abs(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gaussian = np.exp(-0.5 * z * z)
+        central = gaussian * np.polyval(_HART_NUMERATOR, z) / np.polyval(_HART_DENOMINATOR, z)
+        fraction = z
+        for k in range(12, 0, -1):
+            fraction = z + k / fraction
+        tail = np.where(z < 7.07106781186547, central, gaussian / fraction / math.sqrt(2.0 * math.pi))
+    tail = np.where(z > 37.0, 0.0, tail)
+    return np.where(x > 0, 1.0 - tail, tail)
+
+
+def _check_kind(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown option kind: {kind!r}")
+
+
+def black_scholes(value, strike, years, rate, volatility, dividend_yield=0.0, kind="call"):
+    """Closed-form value of European options, broadcast over all inputs.
+
+    value:          present value of the underlying project (or asset).
+    strike:         cost to exercise (call) or amount received (put).
+    dividend_yield: yearly loss of value from waiting (cash flows skipped).
+
+    Options with no time or no volatility are worth their discounted payoff.
+    """
+    _check_kind(kind)
+    value, strike, years, rate, volatility, dividend_yield = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (value, strike, years, rate, volatility, dividend_yield)))
+    forward = value * np.exp(-dividend_yield * years)
+    discounted_strike = strike * np.exp(-rate * years)
+    spread = volatility * np.sqrt(years)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(value / strike) + (rate - dividend_yield + 0.5 * volatility ** 2) * years) / spread
+    d2 = d1 - spread
+    if kind == "call":
+        price = forward * normal_cdf(d1) - discounted_strike * normal_cdf(d2)
+        intrinsic = np.maximum(forward - discounted_strike, 0.0)
+    else:
+        price = discounted_strike * normal_cdf(-d2) - forward * normal_cdf(-d1)
+        intrinsic = np.maximum(discounted_strike - forward, 0.0)
+    return np.where(spread > 0, price, intrinsic)
+
+
+def binomial(value, strike, years, rate, volatility, dividend_yield=0.0, kind="call",
+             american=True, steps=DEFAULT_STEPS):
+    """Cox-Ross-Rubinstein lattice value of options, broadcast over all inputs.
+
+    american: allow exercise at every step (False: only at the end).
+    steps:    lattice steps, the same for all options; the error shrinks
+              roughly as 1 / steps.
+
+    Options with no time left are worth their exercise value. Options whose
+    lattice has no valid up probability (volatility too low for the step
+    length) are NaN.
+    """
+    _check_kind(kind)
+    if steps < 1:
+        raise ValueError("steps must be at least 1.")
+    arrays = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (value, strike, years, rate, volatility, dividend_yield)))
+    shape = arrays[0].shape
+    flat = [a.ravel() for a in arrays]
+    n = flat[0].size
+    # A lattice of `steps` steps is at least as much work per option as
+    # `steps` DCF rows, so large batches go to the compiled kernel when numba
+    # is installed (valuation_engine's jit policy).
+    jit = ve._jit_kernels(n * steps)
+    if jit is not None:
+        out = jit.binomial(*flat, kind, american, steps)
+    else:
+        out = np.empty(n)
+        chunk = max(1, LATTICE_CHUNK_CELLS // (2 * steps + 1))
+        for start in range(0, n, chunk):
+            rows = slice(start, start + chunk)
+            out[rows] = _lattice(*(a[rows] for a in flat), kind, american, steps)
+    # A lattice of zero-length steps has no up probability; at expiry the
+    # option is simply exercised or not.
+    value, strike, years = flat[:3]
+    expired = years == 0
+    if expired.any():
+        sign = 1.0 if kind == "call" else -1.0
+        out[expired] = np.maximum(sign * (value[expired] - strike[expired]), 0.0)
+    return out.reshape(shape)
+
+
+def _lattice(value, strike, years, rate, volatility, dividend_yield, kind, american, steps):
+    # Arrays are (nodes, options): each step works on contiguous rows.
+    dt = years / steps
+    move = volatility * np.sqrt(dt)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        up = (np.exp((rate - dividend_yield) * dt) - np.exp(-move)) / (np.exp(move) - np.exp(-move))
+    discount = np.exp(-rate * dt)
+    p_up, p_down = discount * up, discount * (1.0 - up)
+    sign = 1.0 if kind == "call" else -1.0
+    # Exercise values of every node: value * u^k for k = -steps..steps, split
+    # by parity so that each step's nodes (k = -i, -i+2, ..., i) are one
+    # contiguous block of rows.
+    payoff = np.maximum(sign * (value * np.exp(move * np.arange(-steps, steps + 1)[:, None]) - strike), 0.0)
+    by_parity = (payoff[0::2].copy(), payoff[1::2].copy())
+    node_values = by_parity[0].copy()          # step `steps`: k = -steps, ..., steps
+    following = np.empty_like(node_values)
+    scratch = np.empty_like(node_values)
+    for i in range(steps - 1, -1, -1):
+        nodes = following[:i + 1]
+        np.multiply(node_values[1:i + 2], p_up, out=nodes)
+        np.multiply(node_values[:i + 1], p_down, out=scratch[:i + 1])
+        nodes += scratch[:i + 1]
+        if american:
+            first = steps - i
+            np.maximum(nodes, by_parity[first % 2][first // 2:first // 2 + i + 1], out=nodes)
+        node_values, following = following, node_values
+    valid = (up >= 0) & (up <= 1)
+    return np.where(valid, node_values[0], np.nan)
+
+
+def expansion_option(project_value, expansion_cost, years, rate, volatility, dividend_yield=0.0,
+                     steps=DEFAULT_STEPS):
+    """Value of the right to expand: an American call on the expansion project.
+
+    project_value:  today's PV of the expansion's cash flows.
+    expansion_cost: investment needed when expanding.
+    years:          time left to decide.
+    """
+    return binomial(project_value, expansion_cost, years, rate, volatility, dividend_yield,
+                    "call", True, steps)
+
+
+def abandonment_option(project_value, salvage_value, years, rate, volatility, dividend_yield=0.0,
+                       steps=DEFAULT_STEPS):
+    """Value of the right to quit: an American put on the project.
+
+    project_value: today's PV of the project's remaining cash flows.
+    salvage_value: what the firm gets by abandoning (sale, liquidation).
+    years:         time during which it can abandon.
+    """
+    return binomial(project_value, salvage_value, years, rate, volatility, dividend_yield,
+                    "put", True, steps)
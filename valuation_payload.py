@@ -0,0 +1,260 @@
+import argparse
+import gc
+import logging
+import os
+import statistics
+import sys
+import time
+import types
+
+from streamlit.logger import get_logger
+
+# =============================================================================
+# Per-rerun payload of the app scripts
+# =============================================================================
+# Every element a script draws reaches the browser as a ForwardMsg delta. On a
+# slow mobile connection the number of messages and their bytes decide how
+# fast a rerun shows up, so the app counts them while it runs:
+#
+#     payload = vp.start_rerun()          # first thing in the script
+#     ...
+#     vp.finish_rerun(payload, section, st.session_state)
+#
+# start_rerun wraps the session's message queue once; every message sent
+# after it is counted into the rerun's tally (messages, element deltas and
+# serialized bytes, after Streamlit's cached-message substitution, so the
+# bytes are what actually goes over the wire). finish_rerun logs the tally
+# on the "valuation.payload" logger, which follows Streamlit's log level
+# (`streamlit run valuation_small.py --logger.level=info`), and keeps the
+# latest tally per section in session state for the debug sidebar panel
+# (open the app with ?debug=payload).
+
+LOGGER = get_logger("valuation.payload")
+DEBUG_QUERY = ("debug", "payload")
+HISTORY_KEY = "payload_by_section"
+_TALLY = "_valuation_payload_tally"
+
+
+def _count_messages(ctx):
+    # ScriptRunContext._enqueue is private (checked against Streamlit 1.66.0):
+    # if a release renames it, the app runs on without payload counting.
+    enqueue = getattr(ctx, "_enqueue", None)
+    if not callable(enqueue):
+        LOGGER.warning("ScriptRunContext has no _enqueue; rerun payloads are not counted")
+        return False
+
+    def counted(msg):
+        tally = getattr(ctx, _TALLY)
+        tally["messages"] += 1
+        tally["bytes"] += msg.ByteSize()
+        if msg.WhichOneof("type") == "delta":
+            tally["deltas"] += 1
+        enqueue(msg)
+
+    ctx._enqueue = counted
+    return True
+
+
+def start_rerun():
+    """Start counting the messages of this rerun.
+
+    None outside a Streamlit run, or when this Streamlit's message queue
+    cannot be wrapped (see _count_messages).
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    if not hasattr(ctx, _TALLY):
+        # None marks a session that cannot be counted, so it warns only once.
+        setattr(ctx, _TALLY, {} if _count_messages(ctx) else None)
+    if getattr(ctx, _TALLY) is None:
+        return None
+    tally = dict(messages=0, deltas=0, bytes=0, started=time.perf_counter())
+    setattr(ctx, _TALLY, tally)
+    return tally
+
+
+def finish_rerun(tally, section, session_state):
+    """Log the rerun's tally and keep it as the latest one of `section`.
+
+    Returns the per-section history (section -> tally) stored in
+    session_state[HISTORY_KEY].
+    """
+    history = session_state.setdefault(HISTORY_KEY, {})
+    if tally is None:
+        return history
+    run_ms = (time.perf_counter() - tally["started"]) * 1000
+    history[section] = dict(messages=tally["messages"], deltas=tally["deltas"],
+                            bytes=tally["bytes"], run_ms=run_ms)
+    LOGGER.info("rerun %s: %d messages, %d element deltas, %d bytes, %.0f ms",
+                section, tally["messages"], tally["deltas"], tally["bytes"], run_ms)
+    return history
+
+
+def history_markdown(history):
+    """Markdown table of the per-section history, most bytes first."""
+    rows = sorted(history.items(), key=lambda item: -item[1]["bytes"])
+    return "\n".join(["| Section | Msgs | Deltas | KB | ms |", "|---|--:|--:|--:|--:|"] + [
+        f"| {section} | {row['messages']} | {row['deltas']} | {row['bytes'] / 1024:.1f} | {row['run_ms']:.0f} |"
+        for section, row in rows])
+
+
+# =============================================================================
+# Offline measurement
+# =============================================================================
+# Usage: python valuation_payload.py [script.py ...]
+#
+# Runs each script once with Streamlit's AppTest (widget defaults) and counts
+# the elements it sends on that rerun and their serialized size. Every
+# element is a separate delta message to the browser, so the element count
+# matters as much as the bytes. valuation_small.py is measured once per
+# sidebar section; since it calls start_rerun/finish_rerun, its rows also
+# show the forward messages, element deltas and wire bytes of the rerun.
+
+SECTIONS_SCRIPT = "valuation_small.py"
+
+
+def _leaves(node):
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from _leaves(child)
+    else:
+        yield node
+
+
+def measure(app):
+    """Element count, markdown element count and proto bytes of the last run."""
+    elements = [node for node in _leaves(app._tree) if getattr(node, "proto", None) is not None]
+    return dict(elements=len(elements),
+                markdown=sum(node.type == "markdown" for node in elements),
+                bytes=sum(node.proto.ByteSize() for node in elements))
+
+
+def _wire(app, section):
+    # The tally of an instrumented script, from its session state.
+    history = app.session_state[HISTORY_KEY] if HISTORY_KEY in app.session_state else {}
+    tally = history.get(section)
+    return {} if tally is None else dict(messages=tally["messages"], deltas=tally["deltas"],
+                                         wire_bytes=tally["bytes"])
+
+
+def profile(path):
+    """Rows of payload measurements; one per sidebar section for valuation_small.py."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(path, default_timeout=60).run()
+    name = os.path.basename(path)
+    if name != SECTIONS_SCRIPT:
+        return [dict(script=name, section="", **measure(app))]
+    rows = []
+    radio = app.sidebar.radio[0]
+    for option in radio.options:
+        app.sidebar.radio[0].set_value(option).run()
+        rows.append(dict(script=name, section=option, **measure(app), **_wire(app, option)))
+    return rows
+
+
+# =============================================================================
+# Cash-flow entry: one input per period vs one grid
+# =============================================================================
+# Usage: python valuation_payload.py --cash-flows
+#
+# Lesson 1 used to draw one st.number_input per projection year; it now draws
+# one st.data_editor grid backed by a NumPy array in session state. Both
+# layouts are reduced to minimal scripts and measured at growing horizons:
+# elements and bytes sent per rerun, the session's memory (the session state
+# object and everything it holds), the widget states the browser sends back
+# on every rerun, and the median time of a rerun.
+
+CASH_FLOW_PERIODS = (20, 120, 480)
+
+
+def _per_period_inputs(periods):
+    import streamlit as st
+
+    cash_flows = []
+    for period in range(1, periods + 1):
+        cash_flows.append(st.number_input(f"Cash Flow {period} ($)", value=100000.0, step=5000.0,
+                                          key=f"cf_{period}"))
+    st.write(sum(cash_flows))
+
+
+def _grid(periods):
+    import numpy as np
+    import pandas as pd
+    import streamlit as st
+
+    if "cash_flow_base" not in st.session_state:
+        st.session_state["cash_flow_base"] = np.full(periods, 100000.0)
+    edited = st.data_editor(
+        pd.DataFrame({"Period": np.arange(1, periods + 1), "Cash Flow ($)": st.session_state["cash_flow_base"]}),
+        key="cash_flow_grid", hide_index=True, disabled=["Period"])
+    st.session_state["cash_flows"] = edited["Cash Flow ($)"].to_numpy(dtype=np.float64)
+    st.write(st.session_state["cash_flows"].sum())
+
+
+def deep_size(obj):
+    """Bytes of `obj` and every object it references (modules, classes and functions excluded)."""
+    seen, size, pending = set(), 0, [obj]
+    while pending:
+        new = [o for o in pending if id(o) not in seen
+               and not isinstance(o, (type, types.ModuleType, types.FunctionType))]
+        for o in new:
+            seen.add(id(o))
+            size += sys.getsizeof(o)
+        pending = gc.get_referents(*new)
+    return size
+
+
+def cash_flow_inputs(periods=CASH_FLOW_PERIODS, repeat=5):
+    """Rows comparing the two cash-flow layouts at each horizon in `periods`."""
+    from streamlit.testing.v1 import AppTest
+
+    rows = []
+    for n in periods:
+        for layout, script in (("inputs", _per_period_inputs), ("grid", _grid)):
+            app = AppTest.from_function(script, args=(n,), default_timeout=120).run()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                app.run()
+                times.append(time.perf_counter() - start)
+            state = app.session_state._state._state
+            rows.append(dict(periods=n, layout=layout, **measure(app),
+                             session_bytes=deep_size(state),
+                             widget_bytes=sum(w.ByteSize() for w in state.get_widget_states()),
+                             rerun_ms=statistics.median(times) * 1000))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the elements and bytes each rerun sends.")
+    parser.add_argument("scripts", nargs="*")
+    parser.add_argument("--cash-flows", action="store_true",
+                        help="compare per-period inputs with the cash-flow grid")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    if args.cash_flows:
+        print(f"{'periods':>7} {'layout':8} {'elements':>9} {'bytes':>8} {'session KB':>11}"
+              f" {'widget bytes':>13} {'rerun ms':>9}")
+        for row in cash_flow_inputs():
+            print(f"{row['periods']:7} {row['layout']:8} {row['elements']:9} {row['bytes']:8,}"
+                  f" {row['session_bytes'] / 1024:11.1f} {row['widget_bytes']:13,} {row['rerun_ms']:9.0f}")
+        return
+    here = os.path.dirname(os.path.abspath(__file__))
+    scripts = args.scripts or [os.path.join(here, SECTIONS_SCRIPT)]
+    print(f"{'script':22} {'section':26} {'elements':>9} {'markdown':>9} {'bytes':>8}"
+          f" {'messages':>9} {'deltas':>7} {'wire bytes':>11}")
+    for script in scripts:
+        for row in profile(os.path.abspath(script)):
+            wire = (f" {row['messages']:9} {row['deltas']:7} {row['wire_bytes']:11,}"
+                    if "messages" in row else "")
+            print(f"{row['script']:22} {row['section']:26} {row['elements']:9} {row['markdown']:9}"
+                  f" {row['bytes']:8,}{wire}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import numpy as np
+
+# =============================================================================
+# Online peer statistics
+# =============================================================================
+# Lesson 2 recomputes the peer median and standard deviation from scratch. When
+# prices tick all day, PeerStats keeps per-sector statistics up to date
+# instead: every tick replaces one company's multiple in O(1).
+#
+#   - mean and variance: Welford's running update, extended with removals so a
+#     company's old multiple can be taken out before the new one goes in;
+#   - quantiles and percentile ranks: a DDSketch-style histogram with
+#     logarithmic bins. A value is off by at most `relative_accuracy` (1% by
+#     default) from its bin's representative, and bins can be decremented,
+#     which a t-digest cannot do.
+#
+# Queries read the per-sector summaries only and never rescan the peer group:
+# moments are O(1), quantiles and percentile ranks O(bins) of one sector.
+# tests/test_peer_stats.py checks them against exact NumPy rescans: mean and
+# std match to rounding, quantiles stay within the 1% bound of the exact peer,
+# and percentile ranks are off by at most a few points (peers that share a
+# bin count as half). `python valuation_bench.py --peer-stats` times a million
+# ticks and reports the same errors at that scale.
+# Multiples at or below `min_value` (e.g. negative P/E) share the first bin;
+# NaN marks a company without a multiple.
+
+
+class PeerStats:
+    """Running per-sector statistics of one multiple across a universe."""
+
+    def __init__(self, sectors, values, relative_accuracy=0.01, min_value=0.01, max_value=1e4):
+        self.labels, codes = np.unique(np.asarray(sectors), return_inverse=True)
+        self.sector_of = codes.ravel()
+        self.values = np.full(self.sector_of.size, np.nan)
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        n_bins = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        n_sectors = self.labels.size
+        self.count = np.zeros(n_sectors)
+        self.mean = np.zeros(n_sectors)
+        self.m2 = np.zeros(n_sectors)
+        self.bins = np.zeros((n_sectors, n_bins), dtype=np.int64)
+        self.update_many(np.arange(self.sector_of.size), values)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def _bin(self, value):
+        index = np.ceil(np.log(np.maximum(value, 1e-300)) / self._log_gamma) - self._offset
+        return np.clip(index, 0, self.bins.shape[1] - 1).astype(np.int64)
+
+    def _add(self, s, x):
+        self.count[s] += 1
+        delta = x - self.mean[s]
+        self.mean[s] += delta / self.count[s]
+        self.m2[s] += delta * (x - self.mean[s])
+        self.bins[s, self._bin(x)] += 1
+
+    def _remove(self, s, x):
+        self.count[s] -= 1
+        if self.count[s] == 0:
+            self.mean[s] = self.m2[s] = 0.0
+        else:
+            delta = x - self.mean[s]
+            self.mean[s] -= delta / self.count[s]
+            self.m2[s] = max(self.m2[s] - delta * (x - self.mean[s]), 0.0)
+        self.bins[s, self._bin(x)] -= 1
+
+    def update(self, company, value):
+        """Replace one company's multiple (NaN removes it from its sector)."""
+        s, old = self.sector_of[company], self.values[company]
+        if not np.isnan(old):
+            self._remove(s, old)
+        if not np.isnan(value):
+            self._add(s, value)
+        self.values[company] = value
+
+    def update_many(self, companies, values):
+        """Apply a batch of ticks at once; the last tick per company wins.
+
+        Removed and added values are merged into the summaries of the
+        sectors the batch touches with Chan's parallel formulas, so the cost
+        is O(batch log batch), independent of the number of peers and sectors.
+        """
+        companies = np.asarray(companies)
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), companies.shape)
+        last = companies.size - 1 - np.unique(companies[::-1], return_index=True)[1]
+        companies, values = companies[last], values[last]
+        sectors = self.sector_of[companies]
+        old = self.values[companies]
+        self._merge(sectors[~np.isnan(old)], old[~np.isnan(old)], sign=-1)
+        self._merge(sectors[~np.isnan(values)], values[~np.isnan(values)], sign=+1)
+        self.values[companies] = values
+
+    def _merge(self, sectors, values, sign):
+        touched, local = np.unique(sectors, return_inverse=True)
+        n_b = np.bincount(local, minlength=touched.size).astype(np.float64)
+        mean_b = np.bincount(local, values, minlength=touched.size) / np.maximum(n_b, 1)
+        m2_b = np.bincount(local, (values - mean_b[local]) ** 2, minlength=touched.size)
+        n_a, mean_a, m2_a = self.count[touched], self.mean[touched], self.m2[touched]
+        if sign > 0:
+            n = n_a + n_b
+            delta = mean_b - mean_a
+            mean = mean_a + delta * n_b / n
+            m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+        else:
+            # Inverse of the merge: recover the summary of what remains.
+            n = n_a - n_b
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(n > 0, (n_a * mean_a - n_b * mean_b) / n, 0.0)
+                delta = mean_b - mean
+                m2 = np.where(n > 0, np.maximum(m2_a - m2_b - delta ** 2 * n * n_b / n_a, 0.0), 0.0)
+        self.count[touched], self.mean[touched], self.m2[touched] = n, mean, m2
+        np.add.at(self.bins, (sectors, self._bin(values)), sign)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def sector_index(self, sector):
+        position = np.searchsorted(self.labels, sector)
+        if position >= self.labels.size or self.labels[position] != sector:
+            raise KeyError(f"Unknown sector: {sector!r}")
+        return position
+
+    def std(self, s):
+        """Population standard deviation (np.std's default), like lesson 2."""
+        return np.sqrt(self.m2[s] / self.count[s]) if self.count[s] else np.nan
+
+    def zscore(self, value, s):
+        std = self.std(s)
+        return (value - self.mean[s]) / std if std > 0 else np.nan
+
+    def percentile_rank(self, value, s):
+        """Share of peers below `value`; peers in the same bin count as half."""
+        if np.isnan(value) or not self.count[s]:
+            return np.nan
+        counts = self.bins[s]
+        b = self._bin(value)
+        below = counts[:b].sum()
+        return (below + 0.5 * counts[b]) / self.count[s]
+
+    def quantile(self, s, q):
+        """Approximate q-quantile (q = 0.5 gives the peer median).
+
+        Within `relative_accuracy` of the peer at rank floor(q * (n - 1)).
+        """
+        counts = self.bins[s]
+        total = counts.sum()
+        if total == 0:
+            return np.nan
+        b = int(np.searchsorted(np.cumsum(counts), np.floor(q * (total - 1)), side="right"))
+        return 2.0 * self.gamma ** (b + self._offset) / (self.gamma + 1.0)
+
+    def company_zscore(self, company):
+        return self.zscore(self.values[company], self.sector_of[company])
+
+    def company_percentile(self, company):
+        return self.percentile_rank(self.values[company], self.sector_of[company])
+
+    def exact(self, s):
+        """Exact statistics from a full rescan, for checking the running ones."""
+        peers = self.values[(self.sector_of == s) & ~np.isnan(self.values)]
+        return dict(count=peers.size, mean=peers.mean(), std=peers.std(),
+                    median=np.quantile(peers, 0.5, method="lower"))
@@ -0,0 +1,167 @@
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Tornado sensitivity
+# =============================================================================
+# Every input is moved down and up while all others stay at their base value.
+# Instead of re-running the model 2 x N times, the base case and all 2 x N
+# perturbed cases are stacked into one batch of 2N + 1 rows and valued with a
+# single call of the vectorized model. The inputs are then ranked by swing
+# (|high - low|), which gives the bar order of the tornado chart.
+
+
+def tornado(model, base, cases, output=None):
+    """Value every one-at-a-time perturbation of `base` in one batched call.
+
+    model:  vectorized function taking the keys of `base` as keyword arguments.
+    base:   dict of scalar inputs.
+    cases:  dict name -> (low value, high value) for the inputs to perturb.
+    output: picks the value from the model result (e.g. an index into a tuple).
+
+    Returns (base value, rows) where rows are dicts with "input", "low_input",
+    "high_input", "low", "high" and "swing", largest swing first. Cases the
+    model cannot value (NaN) rank last.
+    """
+    names = list(cases)
+    batch = {key: np.full(2 * len(names) + 1, value) for key, value in base.items()}
+    for i, name in enumerate(names):
+        batch[name][2 * i + 1], batch[name][2 * i + 2] = cases[name]
+    values = model(**batch)
+    values = np.asarray(values if output is None else output(values), dtype=np.float64)
+    rows = [dict(input=name, low_input=cases[name][0], high_input=cases[name][1],
+                 low=values[2 * i + 1], high=values[2 * i + 2],
+                 swing=abs(values[2 * i + 2] - values[2 * i + 1]))
+            for i, name in enumerate(names)]
+    rows.sort(key=lambda row: -row["swing"] if np.isfinite(row["swing"]) else np.inf)
+    return values[0], rows
+
+
+def growth_company_tornado(startup_years, expansion_years, maturity_years,
+                           startup_cf, expansion_initial_cf, expansion_growth,
+                           maturity_growth, rate, years_shift=1, cf_shift=0.20,
+                           rate_shift=0.02):
+    """Tornado of the three-phase growth company (lesson 3).
+
+    Phase lengths move by `years_shift` years (within the lesson's widget
+    bounds), cash flows by `cf_shift` of their size and the growth and
+    discount rates by `rate_shift` (rates are decimals). Returns the same
+    (base value, rows) as `tornado`.
+    """
+    base = dict(startup_years=startup_years, expansion_years=expansion_years,
+                maturity_years=maturity_years, startup_cf=startup_cf,
+                expansion_initial_cf=expansion_initial_cf,
+                expansion_growth=expansion_growth, maturity_growth=maturity_growth,
+                rate=rate)
+    cases = {
+        "startup_years": (max(startup_years - years_shift, 0), min(startup_years + years_shift, 10)),
+        "expansion_years": (max(expansion_years - years_shift, 1), min(expansion_years + years_shift, 10)),
+        "maturity_years": (max(maturity_years - years_shift, 1), min(maturity_years + years_shift, 20)),
+        "startup_cf": (startup_cf - cf_shift * abs(startup_cf), startup_cf + cf_shift * abs(startup_cf)),
+        "expansion_initial_cf": (expansion_initial_cf - cf_shift * abs(expansion_initial_cf),
+                                 expansion_initial_cf + cf_shift * abs(expansion_initial_cf)),
+        "expansion_growth": (max(expansion_growth - rate_shift, 0.0), expansion_growth + rate_shift),
+        "maturity_growth": (max(maturity_growth - rate_shift, 0.0), maturity_growth + rate_shift),
+        "rate": (rate - rate_shift, rate + rate_shift),
+    }
+    return tornado(ve.growth_company_dcf, base, cases, output=lambda result: result[2])
+
+
+# =============================================================================
+# Probability-weighted scenarios
+# =============================================================================
+# Each scenario is a complete input set with a probability. Scenarios x
+# companies are flattened into one batch, valued with a single model call and
+# reshaped back, so adding scenarios or companies never adds reruns.
+
+CHUNK_ROWS = 250_000
+
+
+def weighted_scenarios(model, scenarios, probabilities, output=None):
+    """Value every scenario in one batched call and weight by probability.
+
+    scenarios:     dict input -> value per scenario: a scalar (same in every
+                   scenario), shape (S,) or, for several companies, (S, n)
+                   or (1, n) (per company, same in every scenario).
+    probabilities: (S,) non-negative weights; they are normalized to sum to 1.
+    output:        picks the value from the model result, as in `tornado`.
+
+    Returns a dict with "values" (S, n), "probabilities" (S,) and per company
+    "expected", "std" (probability-weighted), "low" and "high" (n,). A
+    scenario the model cannot value (NaN) makes that company's summary NaN.
+    """
+    p = np.asarray(probabilities, dtype=np.float64)
+    if p.ndim != 1 or p.size == 0 or (p < 0).any() or not p.sum() > 0:
+        raise ValueError("Scenario probabilities must be non-negative and sum to more than 0.")
+    p = p / p.sum()
+    arrays = {}
+    for name, value in scenarios.items():
+        array = np.asarray(value)
+        if array.ndim == 1:
+            array = array[:, None]
+        if array.ndim and array.shape[0] not in (1, p.size):
+            raise ValueError(f"Input {name!r} has {array.shape[0]} scenarios, expected {p.size}.")
+        arrays[name] = array
+    shape = np.broadcast_shapes((p.size, 1), *(array.shape for array in arrays.values()))
+    arrays = {name: np.broadcast_to(array, shape) for name, array in arrays.items()}
+    values = np.empty(shape)
+    # Large grids are valued in blocks of at most CHUNK_ROWS cells so the
+    # model's per-year intermediates stay bounded.
+    n_companies = min(shape[1], CHUNK_ROWS)
+    n_scenarios = max(CHUNK_ROWS // n_companies, 1)
+    for s0 in range(0, shape[0], n_scenarios):
+        for c0 in range(0, shape[1], n_companies):
+            block = (slice(s0, s0 + n_scenarios), slice(c0, c0 + n_companies))
+            result = model(**{name: array[block].ravel() for name, array in arrays.items()})
+            result = result if output is None else output(result)
+            values[block] = np.asarray(result, dtype=np.float64).reshape(values[block].shape)
+    expected = p @ values
+    return dict(values=values, probabilities=p, expected=expected,
+                std=np.sqrt(p @ (values - expected) ** 2),
+                low=values.min(axis=0), high=values.max(axis=0))
+
+
+def growth_company_scenarios(scenarios, probabilities):
+    """weighted_scenarios of the three-phase growth company (lesson 3).
+
+    `scenarios` uses the argument names of valuation_engine.growth_company_dcf
+    (rates as decimals). Phase lengths must be non-negative whole numbers of
+    years; anything else raises ValueError before any scenario is valued.
+    """
+    ve._phase_years(*(scenarios.get(name, 0) for name in PHASE_BOUNDS))
+    return weighted_scenarios(ve.growth_company_dcf, scenarios, probabilities,
+                              output=lambda result: result[2])
+
+
+# =============================================================================
+# Phase-length sweep
+# =============================================================================
+# Lesson 3 asks "What if profitability is delayed by 2 years?". Instead of
+# editing the phase lengths one rerun at a time, every combination allowed by
+# the lesson's widgets (11 x 10 x 20 = 2,200 companies) is valued in one call
+# of the padded-schedule model, where each row's horizon is masked to its own
+# phase lengths. Delay curves and heatmaps are slices of the resulting grid.
+
+# input -> (min, max) years, the bounds of the lesson 3 widgets
+PHASE_BOUNDS = {
+    "startup_years": (0, 10),
+    "expansion_years": (1, 10),
+    "maturity_years": (1, 20),
+}
+
+
+def phase_length_sweep(startup_cf, expansion_initial_cf, expansion_growth, maturity_growth,
+                       rate, bounds=PHASE_BOUNDS):
+    """Intrinsic value of the growth company on the full grid of phase lengths.
+
+    Cash flows and rates are scalars (rates as decimals). Returns a dict with
+    the axes "startup_years", "expansion_years", "maturity_years" and
+    "value" of shape (startup, expansion, maturity); NaN where rate <= the
+    maturity growth.
+    """
+    axes = [np.arange(low, high + 1) for low, high in (bounds[name] for name in PHASE_BOUNDS)]
+    startup, expansion, maturity = np.meshgrid(*axes, indexing="ij")
+    value = ve.growth_company_dcf(startup.ravel(), expansion.ravel(), maturity.ravel(), startup_cf,
+                                  expansion_initial_cf, expansion_growth, maturity_growth, rate)[2]
+    return dict(zip(PHASE_BOUNDS, axes), value=value.reshape(startup.shape))
@@ -1,6 +1,12 @@
+import time
+
 import streamlit as st
-import numpy as np
-import pandas as pd
+
+import valuation_content as vct
+import valuation_payload as vp
+
+# Count the messages and bytes this rerun sends to the browser
+payload = vp.start_rerun()
 
 # Configure the Streamlit app
 st.set_page_config(
@@ -40,235 +46,216 @@ section = st.sidebar.radio(
     ]
 )
 
-# Main content based on selection
-if section == "0. Valuing a Company":
-    st.title("Valuing a Company – An Art, A Science, a Challenge!")
-    st.markdown("---")
+# Valuation results shared with other app processes and background jobs.
+# numpy, pandas and the cache are imported by the sections and branches that
+# use them, so a section pays only for its own default path.
+if st.sidebar.checkbox("Show result cache statistics"):
+    import valuation_cache as vc
 
-    # Introduction
-    st.header("Introduction")
-    st.markdown("""
-    **Welcome!**  
-    Imagine you're about to buy a house—you don’t just admire its looks. You ask:
-    - **How much is it really worth?**
-    - **Is it overpriced?**
-    - **Is it a good deal?**
-    
-    The same applies to stocks and companies. Valuation acts like a GPS that guides you through the complex world of investments.
-    """)
-    st.markdown("---")
-
-    # Why Value?
-    st.header("Why Value?")
-    st.markdown("""
-    Similarly, when investing in stocks or companies, the market price is just a starting point.  
-    Valuation tells you the real worth and whether the investment makes sense.
-    
-    Valuation is the essential tool that prevents you from wandering blindly in the investment world.
-    """)
-    st.markdown("---")
+    cache_stats = vc.default_cache().stats()
+    st.sidebar.write(f"Hit rate: {cache_stats['hit_rate']:.0%} of {cache_stats['lookups']} lookups")
+    st.sidebar.write(f"Lookup latency: {cache_stats['mean_lookup_ms']:.2f} ms (p95 {cache_stats['p95_lookup_ms']:.2f} ms)")
+    st.sidebar.write(f"Stored: {cache_stats['entries']} results, {cache_stats['size_mb']:.1f} MB")
 
-    # Two Worlds, One Mission
-    st.header("Two Worlds, One Mission")
-    st.markdown("""
-    There are two main types of investors:
-    1. **The Technical Analyst (Chartist):**  
-       Focuses on charts, trends, and market movements.
-    2. **The Fundamental Analyst:**  
-       Digs deep to understand the real value of a company, like a financial detective.
-    
-    **Key Insight:**  
-    Valuation lies at the heart of fundamental analysis, helping you differentiate between what you pay (price) and what you actually receive (value).
-    """)
-    st.markdown("---")
+# Main content based on selection
+if section == "0. Valuing a Company":
+    import pandas as pd
+    import valuation_cache as vc
 
-    # The Science of Valuation
-    st.header("The Science of Valuation")
-    st.markdown("""
-    Although valuation might seem like a subjective art, it follows a well-defined recipe:
-    - **Mathematical Models:** Use formulas and projections.
-    - **Real Financial Data:** Base your analysis on actual financial figures.
-    - **Rational Assumptions:** Apply logical assumptions about growth and risk.
-    
-    But… there's also room for professional judgment. Even small differences in your estimates (for example, in growth or risk) can lead to large differences in the final valuation.
-    """)
-    st.subheader("Discounted Cash Flow (DCF) Calculator")
+    cache = vc.default_cache()
+    page = vct.load("small_0_valuing_a_company")
+    st.markdown(page["valuing-a-company-an"])
     cash_flow = st.number_input("Expected Annual Cash Flow ($)", value=100000.0, step=10000.0, format="%.2f")
     growth_rate = st.slider("Growth Rate (%)", min_value=0.0, max_value=20.0, value=5.0)
     discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=20.0, value=10.0)
     years = st.slider("Projection Period (years)", min_value=1, max_value=20, value=10)
-    dcf_values = [cash_flow * ((1 + growth_rate/100)**year) / ((1 + discount_rate/100)**year) for year in range(1, years+1)]
-    total_dcf = sum(dcf_values)
+    total_dcf = float(cache.call("constant_growth_dcf", cash_flow=cash_flow, growth=growth_rate/100, rate=discount_rate/100, years=years)[0])
     st.write("**Estimated Company Value (DCF):** $", f"{total_dcf:,.2f}")
-    st.markdown("---")
-
-    # Price vs. Value
-    st.header("Price vs. Value")
-    st.markdown("""
-    **The Classic Duel:**  
-    - **Price:** What the market tells you—the sticker price.
-    - **Value:** What you, after a deep analysis, believe the company is really worth.
-    
-    **Secret to Profitable Investing:** Buy when **Value > Price** (i.e., when the stock is undervalued).
-    """)
-    sample_years = list(range(1, 11))
-    intrinsic = [total_dcf * (1 + i*0.02) for i in range(10)]
-    market = [total_dcf * (1 + i*0.015) for i in range(10)]
-    chart_data = pd.DataFrame({
-        "Year": sample_years,
-        "Intrinsic Value": intrinsic,
-        "Market Price": market,
-    })
-    st.line_chart(chart_data.set_index("Year"))
-    st.markdown("---")
+    st.markdown(page["price-vs-value"])
+    if st.checkbox("Use a historical intrinsic-value series"):
+        import valuation_history as vh
 
-    # Types of Valuation
-    st.header("Types of Valuation")
-    st.markdown("""
-    There are three primary methods to value a company:
-    1. **Intrinsic Valuation (DCF):**  
-       Forecast the future cash flows the company will generate and discount them back to the present.
-    2. **Relative Valuation (Multiples):**  
-       Compare the company with similar firms.
-    3. **Contingent Valuation (Real Options):**  
-       For valuing future opportunities.
-    """)
-    st.markdown("---")
-
-    # Valuation Challenges
-    st.header("Valuation Challenges")
-    st.markdown("""
-    Even with solid methods and data, valuing a company is challenging because:
-    - **Forecasting Imperfections**
-    - **Market Emotions**
-    - **Limited Data**
-    
-    Continuous practice and a solid knowledge base help refine the process over time.
-    """)
-    st.markdown("---")
-
-    # Common Mistake
-    st.header("Common Mistake")
-    st.markdown("""
-    **Pitfall:**  
-    “The stock went up 20%—so it must be a good buy!”  
-    
-    **Reality:**  
-    A price increase doesn’t necessarily mean that the fundamentals have changed.
-    
-    **Analogy:**  
-    Buying a bicycle isn’t just about its looks; it must work properly, last long, and justify the cost.
-    """)
-    st.markdown("---")
-
-    # Get Motivated!
-    st.header("Get Motivated!")
-    st.markdown("""
-    **The Art of Valuation is Your Financial Superpower!**
-    - **Build Confidence:** Learn to make better investment decisions.
-    - **Prevent Bad Decisions:** Protect yourself from overpaying.
-    - **Think Like an Analyst:** Empower your investment strategy.
-    
-    Every step you take in mastering valuation brings you closer to financial independence.
-    """)
-    st.markdown("---")
+        st.markdown("""
+        At every month-end the DCF is re-run with only the free cash flow **published by that date**.
+        The growth of the previous 3 years is assumed for the next 5 years, then the stable growth
+        below; everything is discounted at the calculator's discount rate.
+        """)
+        price_file = st.file_uploader("Prices (CSV: date, ticker, price)", type="csv")
+        report_file = st.file_uploader("FCF reports (CSV: ticker, report_date, fcf_per_share)", type="csv")
+        history_growth = st.slider("Stable Growth after 5 Years (%)", min_value=0.0, max_value=5.0, value=3.0)
+        if price_file is None or report_file is None:
+            st.caption("No files uploaded: 25 years of synthetic prices and yearly reports for 50 tickers.")
+            history_prices, history_reports = vh.sample_history()
+        else:
+            history_prices, history_reports = pd.read_csv(price_file), pd.read_csv(report_file)
+        try:
+            history_dates, history_tickers, price_panel, value_panel = vh.intrinsic_value_history(
+                history_prices, history_reports, discount_rate/100, history_growth/100)
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            ticker = st.selectbox("Ticker", history_tickers)
+            column = list(history_tickers).index(ticker)
+            st.line_chart(pd.DataFrame({
+                "Intrinsic Value": value_panel[:, column],
+                "Market Price": price_panel[:, column],
+            }, index=pd.DatetimeIndex(history_dates)))
+            undervalued = value_panel[:, column] > price_panel[:, column]
+            st.write(f"**Months with Value > Price:** {undervalued.sum()} of {len(history_dates)}")
+            if st.checkbox("Backtest the rule: buy when Value > Price"):
+                import valuation_backtest as vbt
+
+                margin = st.slider("Margin of Safety (%)", min_value=0, max_value=50, value=20)
+                schedule = st.radio("Rebalance", list(vbt.REBALANCE_PERIODS), index=1, horizontal=True)
+                cost_bps = st.number_input("Trading Cost (basis points per trade)", min_value=0.0, value=10.0, step=5.0)
+                rule, universe = vbt.compare_with_universe(
+                    price_panel, value_panel, margin_of_safety=margin/100,
+                    rebalance_every=vbt.REBALANCE_PERIODS[schedule], cost_bps=cost_bps)
+                st.line_chart(pd.DataFrame({
+                    "Value > Price": rule["equity"],
+                    "All stocks (equal weight)": universe["equity"],
+                }, index=pd.DatetimeIndex(history_dates)))
+                st.markdown(f"""
+                | | Value > Price | All stocks |
+                |---|--:|--:|
+                | Annual return | {rule['cagr']:.1%} | {universe['cagr']:.1%} |
+                | Volatility | {rule['volatility']:.1%} | {universe['volatility']:.1%} |
+                | Max drawdown | {rule['max_drawdown']:.1%} | {universe['max_drawdown']:.1%} |
+                | Turnover per rebalance | {rule['avg_turnover']:.1%} | {universe['avg_turnover']:.1%} |
+                | Average holdings | {rule['avg_positions']:,.0f} | {universe['avg_positions']:,.0f} |
+                """)
+    else:
+        sample_years = list(range(1, 11))
+        intrinsic = [total_dcf * (1 + i*0.02) for i in range(10)]
+        market = [total_dcf * (1 + i*0.015) for i in range(10)]
+        chart_data = pd.DataFrame({
+            "Year": sample_years,
+            "Intrinsic Value": intrinsic,
+            "Market Price": market,
+        })
+        st.line_chart(chart_data.set_index("Year"))
+    st.markdown(page["types-of-valuation"])
+    if st.checkbox("Try it: value an option to expand or to abandon"):
+        import valuation_options as vo
+
+        option = st.radio("Real option", ["Expand", "Abandon"], horizontal=True)
+        expand = option == "Expand"
+        col1, col2 = st.columns(2)
+        with col1:
+            project_value = st.number_input("Project value today ($)", min_value=0.01, value=100.0, step=10.0)
+            strike = st.number_input("Cost to expand ($)" if expand else "Salvage value ($)", min_value=0.0,
+                                     value=120.0 if expand else 80.0, step=10.0)
+            option_years = st.slider("Years left to decide", min_value=0.5, max_value=20.0, value=5.0, step=0.5)
+        with col2:
+            volatility = st.slider("Volatility of the project value (%)", min_value=5, max_value=100, value=30)
+            riskless = st.slider("Riskless rate (%)", min_value=0.0, max_value=10.0, value=4.0, step=0.25)
+            leakage = st.slider("Value lost per year of waiting (%)", min_value=0.0, max_value=20.0, value=0.0, step=0.5)
+        inputs = (project_value, strike, option_years, riskless/100, volatility/100, leakage/100)
+        kind = "call" if expand else "put"
+        static = max(project_value - strike, 0.0) if expand else max(strike - project_value, 0.0)
+        at_end = float(vo.black_scholes(*inputs, kind=kind))
+        any_time = float(vo.binomial(*inputs, kind=kind, steps=vo.DEFAULT_STEPS))
+        st.markdown(f"""
+        | Decision | Value |
+        |---|--:|
+        | Act today (static NPV) | \\${static:,.2f} |
+        | Decide at the end (Black-Scholes) | \\${at_end:,.2f} |
+        | Decide any time (binomial, {vo.DEFAULT_STEPS} steps) | \\${any_time:,.2f} |
+        """)
+        st.caption("The gap between acting today and keeping the choice open is the value of flexibility "
+                   "that a static DCF leaves out.")
+    st.markdown(page["valuation-challenges"])
 
 elif section == "1. Intrinsic Value":
-    st.title("💎 Intrinsic Value: The Hidden Treasure")
-    st.markdown("""
-    ### 🧭 What is Intrinsic Value?
-    It is the real value of a company calculated based on its ability to generate cash in the future.  
-    Imagine buying a popcorn machine: how much would you pay? It depends on:
-    - **How many popcorns** it produces 🍿  
-    - **For how many years** it operates ⏳  
-    - **If it is safe and reliable** ⚙️  
-    
-    Similarly, when valuing a company, we want to know how much *cash* it will generate and then bring that value to the present.
-    """)
-    st.markdown("---")
+    import numpy as np
+    import pandas as pd
 
-    st.markdown("### 🧮 The Base Formula: Value = Future Cash, Today")
-    st.markdown(r"""
-    The DCF (Discounted Cash Flow) model tells us:
-    > A company is worth today the present value of the cash flows it will generate in the future.
-    
-    **Translation:**
-    - **Cash Flows:** The actual money the company can distribute  
-    - **Present Value:** What that money is worth today  
-    - **Discount Rate:** A type of “risk interest” rate applied to adjust future cash flows  
-    """)
-    st.markdown("---")
-
-    st.markdown("### ⛏️ The Step-by-Step DCF Model (Simplified)")
-    st.markdown("#### 1️⃣ Estimate Future Cash Flows")
-    st.markdown("""
-    Focus on what remains after investments and operating expenses.  
-    - For a mature company, cash flows tend to be stable.  
-    - For a startup, the cash flows are often unpredictable (and there might be no profit in the early years!).
-    
-    *Technical term: Free Cash Flow to the Firm (FCFF)*
-    """)
+    page = vct.load("small_1_intrinsic_value")
+    st.markdown(page["intrinsic-value-the-hidden"])
     with st.expander("Enter Your Future Cash Flows"):
-        years = st.number_input("Number of projection years", min_value=1, max_value=20, value=5)
-        cash_flows = []
-        for year in range(1, years + 1):
-            cf = st.number_input(f"Estimated Cash Flow for Year {year} ($)", value=100000.0, step=5000.0, key=f"cf_{year}")
-            cash_flows.append(cf)
-        st.write("Your projected cash flows:", cash_flows)
-    st.markdown("---")
-
-    st.markdown("#### 2️⃣ Choose the Projection Horizon")
-    st.markdown("""
-    Typically, you choose a projection horizon of **5 to 10 years**.  
-    After this period, we assume a stable growth and use a terminal value calculation.  
-    *Think of it like a train that accelerates and then cruises at a steady speed.*
-    """)
-    st.markdown("---")
-
-    st.markdown("#### 3️⃣ Estimate the Discount Rate")
-    st.markdown("""
-    The discount rate reflects the risk of the company.  
-    - More stable companies (like large, established firms) → lower discount rate  
-    - Riskier companies (startups, companies in unstable regions) → higher discount rate
-    
-    For companies, we usually use the WACC (Weighted Average Cost of Capital).
-    """)
-    discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=20.0, value=10.0)
-    st.markdown("---")
-
-    st.markdown("#### 4️⃣ Calculate the Present Value")
-    st.markdown(r"""
-    We calculate the present value (PV) of each future cash flow using the formula:
-    
-    $$PV = \frac{FCF_{t}}{(1+r)^t}$$
-    
-    Where:  
-    - $FCF_{t}$ = cash flow in year *t*  
-    - $r$ = discount rate (in decimal form)  
-    - $t$ = year number
-    
-    Let's compute the PV for each year's cash flow.
-    """)
-    present_values = [cf / ((1 + discount_rate/100)**t) for t, cf in enumerate(cash_flows, start=1)]
+        col1, col2 = st.columns(2)
+        with col1:
+            unit = st.radio("Cash flow period", ["Years", "Months"], horizontal=True)
+        periods_per_year = 12 if unit == "Months" else 1
+        # Switching the unit keeps the projection in calendar time: the horizon
+        # and the cash flows are converted (a year's cash flow spread over its
+        # months, or each twelve months summed into a year), not reseeded.
+        if "projection_periods" not in st.session_state:
+            st.session_state["projection_periods"] = 5
+        if st.session_state.get("cash_flow_unit", unit) != unit:
+            flows = st.session_state.get("cash_flows", np.array([100000.0]))
+            if unit == "Months":
+                flows = np.repeat(flows / 12, 12)[:480]
+            else:
+                flows = np.add.reduceat(flows, np.arange(0, flows.size, 12))
+            st.session_state["cash_flows"] = flows
+            st.session_state["projection_periods"] = flows.size
+        st.session_state["cash_flow_unit"] = unit
+        with col2:
+            periods = st.number_input(f"Number of projection {unit.lower()}", min_value=1, max_value=480,
+                                      key="projection_periods")
+        # One editable grid backed by one array in session state. A new horizon
+        # starts a new grid from the current values (cut, or extended with the
+        # last one); within a horizon the grid keeps its own edits.
+        grid_key = f"cash_flow_grid_{unit}_{periods}"
+        if st.session_state.get("cash_flow_grid") != grid_key:
+            previous = st.session_state.get("cash_flows", np.array([100000.0]))
+            st.session_state["cash_flow_base"] = np.concatenate(
+                (previous[:periods], np.full(max(periods - len(previous), 0), previous[-1])))
+            st.session_state["cash_flow_grid"] = grid_key
+        edited = st.data_editor(
+            pd.DataFrame({unit[:-1]: np.arange(1, periods + 1), "Cash Flow ($)": st.session_state["cash_flow_base"]}),
+            key=grid_key, hide_index=True, disabled=[unit[:-1]],
+            column_config={"Cash Flow ($)": st.column_config.NumberColumn(step=5000.0, format="dollar")})
+        cash_flows = edited["Cash Flow ($)"].to_numpy(dtype=np.float64)
+        st.session_state["cash_flows"] = cash_flows
+    st.markdown(page["2-choose-the-projection"])
+    if st.checkbox("Estimate the discount rate as a WACC"):
+        import valuation_wacc as vw
+
+        col1, col2 = st.columns(2)
+        with col1:
+            beta = st.number_input("Equity beta", value=1.0, step=0.05)
+            riskless = st.number_input("Riskless rate (%)", value=4.0, step=0.25)
+            equity_premium = st.number_input("Equity risk premium (%)", value=5.0, step=0.25)
+        with col2:
+            cost_of_debt = st.number_input("Pre-tax cost of debt (%)", value=6.0, step=0.25)
+            tax_rate = st.number_input("Tax rate (%)", min_value=0.0, max_value=100.0, value=25.0, step=1.0)
+            debt_share = st.slider("Debt share of capital (%)", min_value=0, max_value=95, value=30)
+        price_file = st.file_uploader("Or estimate the beta from prices (CSV: date, stock, market)", type="csv")
+        if price_file is not None:
+            try:
+                estimated, periods_used = vw.beta_from_prices(pd.read_csv(price_file))
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                if np.isfinite(estimated):
+                    beta = estimated
+                    st.write(f"Beta over the last {periods_used} returns: **{beta:.2f}**")
+                else:
+                    st.warning("Too many missing prices to estimate a beta; using the beta above.")
+        wacc = float(vw.wacc(beta, riskless/100, equity_premium/100, cost_of_debt/100, tax_rate/100,
+                             100 - debt_share, debt_share))
+        st.write(f"**Cost of equity:** {float(vw.cost_of_equity(beta, riskless/100, equity_premium/100)):.2%}"
+                 f" · **WACC:** {wacc:.2%}")
+        discount_rate = wacc * 100
+        wacc_inputs = dict(cost_of_equity=float(vw.cost_of_equity(beta, riskless, equity_premium)), cost_of_debt=cost_of_debt,
+                           tax_rate=tax_rate, debt_share=debt_share)
+    else:
+        discount_rate = st.slider("Discount Rate (%)", min_value=0.0, max_value=20.0, value=10.0)
+        wacc_inputs = None
+    st.markdown(page["4-calculate-the-present"])
+    present_values = [cf / ((1 + discount_rate/100)**(t / periods_per_year)) for t, cf in enumerate(cash_flows, start=1)]
     total_pv = np.sum(present_values)
     st.write("**Total Present Value of Cash Flows:** $", f"{total_pv:,.2f}")
-    st.markdown("---")
-
-    st.markdown("#### 5️⃣ Estimate the Terminal Value")
-    st.markdown(r"""
-    At the end of the projection horizon, we estimate the terminal value using the formula:
-    
-    $$\text{Terminal Value} = \frac{FCF_{last} \times (1+g)}{(r - g)}$$
-    
-    Where:
-    - $FCF_{last}$ = the cash flow in the final projected year  
-    - $g$ = perpetual growth rate  
-    - $r$ = discount rate  
-    """)
+    st.markdown(page["5-estimate-the-terminal"])
     g_rate = st.slider("Perpetual Growth Rate (%)", min_value=0.0, max_value=10.0, value=3.0)
+    # Monthly cash flows are discounted and grown at the equivalent monthly rates.
+    rate = (1 + discount_rate/100)**(1 / periods_per_year) - 1
+    growth = (1 + g_rate/100)**(1 / periods_per_year) - 1
     if discount_rate > g_rate:
-        terminal_value = cash_flows[-1] * (1 + g_rate/100) / ((discount_rate/100) - (g_rate/100))
-        terminal_value_pv = terminal_value / ((1 + discount_rate/100)**years)
+        terminal_value = cash_flows[-1] * (1 + growth) / (rate - growth)
+        terminal_value_pv = terminal_value / ((1 + rate)**periods)
         st.write("**Present Value of Terminal Value:** $", f"{terminal_value_pv:,.2f}")
         
         intrinsic_value = total_pv + terminal_value_pv
@@ -276,160 +263,79 @@ elif section == "1. Intrinsic Value":
         st.write("**Intrinsic Value (based on DCF):** $", f"{intrinsic_value:,.2f}")
     else:
         st.error("Discount rate must be greater than growth rate for a valid terminal value.")
-    st.markdown("---")
-
-    st.markdown("### 🔍 Variations of the DCF Model")
-    st.markdown("""
-    Depending on what you want to value, there are three main approaches:
-    1. **Free Cash Flow to the Firm (FCFF):**  
-       Values the entire company (debt + equity), later subtracting debt to derive equity value.
-    2. **Free Cash Flow to Equity (FCFE):**  
-       Values only the cash available to shareholders.
-    3. **Dividend Discount Model (DDM):**  
-       Uses dividends as a proxy for cash flows (works best for companies that pay stable dividends).
-    """)
-    st.markdown("---")
-
-    st.markdown("### ⚠️ Sensitivity of the DCF Model")
-    st.markdown("""
-    Even minor changes in:
-    - **Growth Rate** 📈  
-    - **Discount Rate** 🎯  
-    - **Terminal Value Assumptions** 🔚  
-    
-    …can significantly alter the final valuation, much like a super-sensitive scale where even a small breath can move the needle.
-    
-    Many analysts perform sensitivity analyses and scenario testing (the “what-if” analysis) to assess the impact of these changes.
-    """)
-    st.markdown("---")
-
-    st.markdown("### 💬 Special Considerations for Young or Uncertain Companies")
-    st.markdown("""
-    Young companies, those with losses or inconsistent histories, require:
-    - More assumptions
-    - Greater prudence
-    - Sometimes even alternative methods (such as real options)
-    """)
-    st.markdown("---")
 
-    st.markdown("### 📊 Why DCF is Still the Gold Standard")
-    st.markdown("""
-    The DCF method forces us to think about the fundamentals of a company:
-    - **How does it generate cash?**
-    - **How much does it reinvest?**
-    - **What is the real risk?**
-    
-    It isn’t magic—it’s a practical tool for better understanding and evaluating businesses.
-    """)
-    st.markdown("---")
-
-    st.markdown("### 🧠 Final Thought")
-    st.markdown("> *\"The value of an asset is determined by the expected cash flows and the risk associated with them.\"*")
+    # Export the schedule for spreadsheets and BI tools
+    st.markdown("#### 💾 Export Your Valuation")
+    if st.checkbox("Prepare export files"):
+        import valuation_engine as ve
+        import valuation_export as vx
+
+        export_format = st.radio("Export format", ["Parquet", "Arrow"], horizontal=True)
+        extension = export_format.lower()
+        schedule = ve.dcf_schedule([cash_flows], rate, growth)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇️ Yearly Schedule", vx.to_bytes(vx.schedule_batch(schedule), extension), file_name=f"dcf_schedule.{extension}")
+        with col2:
+            st.download_button("⬇️ Valuation Summary", vx.to_bytes(vx.summary_batch(schedule), extension), file_name=f"dcf_summary.{extension}")
+    st.markdown(page["variations-of-the-dcf"])
+    if st.checkbox("Compare FCFF, FCFE and DDM on one projection"):
+        import valuation_statements as vs
+
+        col1, col2 = st.columns(2)
+        with col1:
+            ebit = st.number_input("EBIT next year ($)", min_value=0.0, value=150000.0, step=10000.0)
+            ebit_growth = st.slider("EBIT growth (%)", min_value=0.0, max_value=20.0, value=3.0, step=0.5)
+            reinvestment = st.slider("Reinvestment (% of after-tax EBIT)", min_value=0, max_value=100, value=40)
+            payout = st.slider("Dividend payout (% of net income)", min_value=0, max_value=100, value=65)
+        if wacc_inputs is None:
+            st.caption("The discount rate and perpetual growth rate above are reused as the WACC and the stable growth; the projection is yearly. "
+                       "On consistent inputs the three methods agree; a gap above 10% is flagged, because it usually means the WACC does not "
+                       "match the debt plan or the payout leaves cash in the company.")
+            with col2:
+                net_debt = st.number_input("Net debt today ($)", min_value=0.0, value=300000.0, step=50000.0)
+                debt_rate = st.number_input("Interest rate on debt (%)", min_value=0.0, value=5.0, step=0.25)
+                equity_rate = st.number_input("Cost of equity (%)", min_value=0.0, value=13.0, step=0.25)
+                ebit_tax = st.number_input("Tax rate on profits (%)", min_value=0.0, max_value=100.0, value=25.0, step=1.0)
+        else:
+            # The WACC block's own inputs: CAPM cost of equity, cost of debt, tax
+            # rate, and net debt at its debt share of the firm value (FCFF does
+            # not depend on the debt, so the firm value comes first).
+            equity_rate, debt_rate, ebit_tax = (wacc_inputs[name] for name in ("cost_of_equity", "cost_of_debt", "tax_rate"))
+            unlevered = vs.simple_projection(ebit, ebit_growth/100, 10, reinvestment/100, tax_rate=ebit_tax/100, payout_ratio=payout/100)
+            firm_value = vs.three_way_valuation(**unlevered, wacc=discount_rate/100, cost_of_equity=equity_rate/100,
+                                                stable_growth=g_rate/100)["firm_value"][0]
+            net_debt = max(wacc_inputs["debt_share"] / 100 * firm_value, 0.0) if np.isfinite(firm_value) else 0.0
+            st.caption(f"The WACC above is reused with its cost of equity ({equity_rate:.2f}%), cost of debt ({debt_rate:.2f}%) and tax rate "
+                       f"({ebit_tax:.0f}%), and net debt is its {wacc_inputs['debt_share']}% debt share of the firm value (\\${net_debt:,.0f}); "
+                       "the perpetual growth rate above is the stable growth and the projection is yearly. On consistent inputs the three "
+                       "methods agree; a gap above 10% is flagged, because it usually means the WACC does not match the debt plan or the "
+                       "payout leaves cash in the company.")
+        statements = vs.simple_projection(ebit, ebit_growth/100, 10, reinvestment/100, tax_rate=ebit_tax/100,
+                                          net_debt=net_debt, cost_of_debt=debt_rate/100, payout_ratio=payout/100)
+        three_way = vs.three_way_valuation(**statements, wacc=discount_rate/100, cost_of_equity=equity_rate/100,
+                                           stable_growth=g_rate/100)
+        st.markdown(f"""
+        | Method | Equity value |
+        |---|--:|
+        | FCFF at the WACC, minus net debt | \\${three_way['equity_fcff'][0]:,.0f} |
+        | FCFE at the cost of equity | \\${three_way['equity_fcfe'][0]:,.0f} |
+        | Dividends at the cost of equity (DDM) | \\${three_way['equity_ddm'][0]:,.0f} |
+        """)
+        if not np.isfinite(three_way["spread"][0]):
+            st.error("The WACC and the cost of equity must be greater than the perpetual growth rate.")
+        elif three_way["flag"][0]:
+            st.warning(f"The methods disagree by {three_way['spread'][0]:.0%} of the middle value. Check that the WACC "
+                       "matches the debt plan and that the payout does not leave cash piling up in the company.")
+        else:
+            st.success(f"The three methods agree within {three_way['spread'][0]:.1%}.")
+    st.markdown(page["sensitivity-of-the-dcf"])
 
 elif section == "2. Relative Valuation":
-    st.title("🧭 Relative Valuation – The Game of Comparisons")
-    st.markdown("""
-    ### 🎯 What is Relative Valuation?
-    It’s like looking at houses in the same neighborhood:
-    - One house with 3 rooms costs **€300,000**
-    - Another, also with 3 rooms, costs **€400,000**
-    
-    Naturally, you ask: *"What justifies the difference?"*  
-    Relative valuation does exactly that – but with companies!
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### ⚖️ Relative Price vs. Absolute Value
-    While intrinsic valuation asks, *"How much is this company worth by its own merits?"*  
-    Relative valuation asks,  
-    *"How much is this company worth compared to other similar companies?"*  
-    It forces you to consider:
-    - **“This stock seems cheap… but cheap compared to what?”**
-    """)
-    st.markdown("---")
+    import numpy as np
 
-    st.markdown("""
-    ### 🔢 Multiples: The Units of Comparison
-    Multiples are simple formulas that relate market price to a performance measure. Common examples include:
-    
-    | **Multiple**          | **Meaning**                                                                 |
-    |-----------------------|------------------------------------------------------------------------------|
-    | **P/E (Price/Earnings)**    | How much investors are paying for each € of profit                       |
-    | **EV/EBITDA**         | How the entire firm (debt + equity) is valued relative to its operating results |
-    | **P/BV (Price/Book Value)** | How much you pay for each € of net assets                                |
-    | **P/Sales**           | How much you pay for each € of generated sales                               |
-    
-    These multiples serve as "quick measures" for comparing companies but should be used carefully.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🕵️‍♂️ Steps for a Good Relative Valuation
-    1️⃣ **Choose the Right Multiple:**  
-       Depends on the sector and type of company.  
-       *Example: Tech startups → P/Sales; Banks → P/BV; Mature companies → P/E*  
-       **Golden Rule:** Use multiples aligned with the company's value creation.
-    
-    2️⃣ **Choose the Peer Group:**  
-       Compare companies similar in:
-       - Sector  
-       - Size  
-       - Risk  
-       - Business model  
-       *Example: Don't compare Apple with a tiny mobile app startup.*
-    
-    3️⃣ **Analyze the Differences:**  
-       If a company has a much lower multiple than its peers, it might seem undervalued—but only if there’s no structural reason for that difference.  
-       Always ask: **“Is this discount justified or is it an opportunity?”**
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 💣 Traps to Avoid
-    1. **Superficial Comparisons:**  
-       Using multiples without understanding the fundamentals can be misleading.
-    2. **Not Adjusting for Real Differences:**  
-       Companies might appear similar but differ in risk, growth, or debt.
-    3. **Taking Multiples as Absolute Truth:**  
-       Multiples are symptoms – proper diagnosis requires deeper analysis!
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🤖 Statistical Adjustment Methods
-    To avoid unfair comparisons, you might use:
-    - Regressions (e.g. P/E adjusted for growth)
-    - Sector median multiples
-    - Standard deviation and z-scores
-    
-    These methods help assess how far a company's multiple deviates from the norm.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🧠 A Concrete Example
-    Imagine:
-    - **Company A** has a P/E of **10**
-    - **Company B** (in the same sector) has a P/E of **15**
-    
-    A hasty conclusion might be: “Company A is cheap!”  
-    But consider:
-    - Is Company A’s profit declining?
-    - Does it carry huge debt?
-    - Is it facing regulatory risks?
-    
-    A low multiple might actually be a red flag, not a buying opportunity.
-    
-    > *"A multiple doesn’t tell you the value. It tells you where to look."*
-    """)
-    st.markdown("---")
-
-    st.header("Interactive Relative Valuation Example")
-    st.markdown("""
-    In this exercise, we’ll compare the target company’s P/E ratio with those of its peer group.  
-    Enter the values below and see how the target company compares!
-    """)
+    page = vct.load("small_2_relative_valuation")
+    st.markdown(page["relative-valuation-the-game"])
     target_pe = st.number_input("Enter the target company's P/E ratio:", min_value=0.0, value=10.0, step=0.1)
     n_peers = st.number_input("Number of peer companies:", min_value=1, max_value=20, value=3, step=1)
     peer_pe = []
@@ -451,135 +357,36 @@ elif section == "2. Relative Valuation":
         st.info("The target company's P/E is equal to the peer median.")
     else:
         st.error("The target company's P/E is above the peer median, which may indicate it is overvalued compared to its peers.")
-    
-    st.markdown("---")
-    st.markdown("### Final Interactive Observation")
-    st.markdown("""
-    Relative valuation is a fast method to get an initial sense of whether a company might be mispriced.  
-    **Remember:**
-    - Adjust for differences in growth, risk, and debt.
-    - Use statistical methods to refine your analysis.
-    - Multiples are a starting point – they guide you, but do not provide definitive answers.
-    """)
-
-elif section == "3. Growth Companies":
-    st.title("🚀 Valuing Growth Companies: Between Potential and Danger")
-    st.markdown("""
-    ### 🧨 The Challenge
-    Many promising companies are not yet profitable—or even have chronic losses.  
-    Yet the market believes in them, and investors bet strongly.  
-    **How do you value something that is not yet generating cash?**
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🎢 Growth Companies: A Roller Coaster Ride
-    - **Exciting journey:** They promise a thrilling ride.
-    - **Future confidence:** They require belief in their future.
-    - **Careful analysis:** It is essential to determine whether the ride leads to success—or an impending derailment.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🏗️ Phases of Growth — The Life Curve of Companies
-    1. **Startup Phase**  
-       - Low revenues, recurring losses  
-       - Extremely high risk  
-       - But enormous growth potential
-    2. **Expansion Phase**  
-       - Accelerating revenues  
-       - Profits are still small (or even nil)  
-       - Growth begins to pave the way
-    3. **Maturity Phase**  
-       - Slowing growth  
-       - Stabilized margins  
-       - Consistent profitability emerges  
-    
-    **Key:** The secret lies in knowing in which phase the company is—and how it will transition to the next.
-    """)
-    st.markdown("---")
 
-    st.markdown("""
-    ### 📐 Adapting the DCF Model to Tough Realities
-    **Fundamental Adjustments:**
-    1. **Forecast Negative Cash Flows:**  
-       Instead of ignoring losses, model them—including the need for additional capital (future financing).
-    2. **Longer Projection Period:**  
-       Often 10–15 years are needed until the company reaches a "stable" phase.
-    3. **Variable Growth:**  
-       Apply different growth rates over time—high at first, then gradually decreasing, and finally stabilizing.
-    4. **Risk-Adjusted Discount Rates:**  
-       Use higher rates initially (when risk is greater), then lower them as the company matures.
-    """)
-    st.markdown("---")
+    st.markdown(page["growth-adjusted-comparison-regression"])
+    if st.checkbox("Adjust P/E for growth"):
+        import valuation_multiples as vm
+
+        target_growth = st.number_input("Target company's expected earnings growth (%):", value=5.0, step=0.5)
+        peer_growth = []
+        for i in range(1, int(n_peers)+1):
+            value = st.number_input(f"Expected earnings growth for Peer {i} (%):", value=5.0 + 2.0 * i, step=0.5, key=f"peer_growth_{i}")
+            peer_growth.append(value)
+        peer_growth = np.array(peer_growth)
+    
+        if n_peers < 3 or np.ptp(peer_growth) == 0:
+            st.warning("The regression needs at least three peers with different growth rates.")
+        else:
+            fit = vm.fit_sector_regressions(peer_pe, peer_growth, np.zeros(int(n_peers)))
+            intercept, slope = fit["coefficients"][0, 0]
+            justified_pe = intercept + slope * target_growth
+            st.write(f"**Fitted line:** P/E = {intercept:.2f} + {slope:.2f} × growth (R² = {fit['r2'][0, 0]:.2f})")
+            st.write(f"**P/E justified by the target's growth:** {justified_pe:.2f}")
+            if target_pe < justified_pe:
+                st.success("Even after adjusting for growth, the target trades below its justified P/E.")
+            else:
+                st.error("After adjusting for growth, the target trades at or above its justified P/E – the lower multiple may simply reflect lower growth.")
+    
+    st.markdown(page["final-interactive-observation"])
 
-    st.markdown("""
-    ### 💡 Tip: The Value is in the Future, Not the Present  
-    The key is the potential future profits—and your ability to estimate them rationally.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🧮 Simplified Example  
-    Imagine a company that:
-    - Has losses during the **first 3 years**.
-    - Begins generating profits in the **4th year**.
-    - Achieves stability by the **8th year**.
-    
-    Your DCF model must include:
-    - **Negative cash flows** at the beginning.
-    - The **need to raise capital** (dilution may occur).
-    - **Non-linear growth.**
-    - A **terminal value** after the stabilization phase.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🧨 Hidden Risks
-    1. **Underestimating Time to Profitability:**  
-       Companies often take longer to become profitable than expected.
-    2. **Overly Optimistic Assumptions:**  
-       High margins? Eternal growth?
-    3. **Shareholder Dilution:**  
-       Extensive capital raises can shrink your ownership stake.
-    4. **Fierce Competition:**  
-       A promising sector might attract too many competitors.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🔐 Strategies to Reduce Uncertainty
-    - **Use Multiple Scenarios:**  
-      *Optimistic, Realistic, and Conservative.*
-    - **Perform Sensitivity Analysis:**  
-      For instance:  
-      - What if growth is 2% lower?  
-      - What if profitability is delayed by 2 years?
-    - **Consider Exit Strategies:**  
-      IPO? Acquisition?
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🧠 Key Takeaway
-    > *"In a growth company, value is not in what it is today—but in what it could become tomorrow."*
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 🎓 Fundamental Lesson
-    Valuing growth companies requires more than just formulas—it demands strategic vision, financial realism, and a dash of informed intuition.  
-    It's like planting a tree:
-    - You water it for years.
-    - No fruits are visible in the early stages.
-    - But one day, it might yield a generous harvest.
-    """)
-    st.markdown("---")
-
-    st.header("Interactive DCF Model for a Growth Company")
-    st.markdown("Adjust the parameters below to model a growth company’s cash flows across different phases:")
-    
-    st.subheader("1. Define Growth Phases")
+elif section == "3. Growth Companies":
+    page = vct.load("small_3_growth_companies")
+    st.markdown(page["valuing-growth-companies-between"])
     col1, col2 = st.columns(2)
     with col1:
         startup_years = st.number_input("Years in Startup Phase (losses)", min_value=0, max_value=10, value=3, step=1)
@@ -589,16 +396,14 @@ elif section == "3. Growth Companies":
     total_years = startup_years + expansion_years + maturity_years
     st.markdown(f"**Total Projection Period:** {total_years} years")
     
-    st.subheader("2. Cash Flows Input")
-    st.markdown("Enter the average annual cash flows for each phase:")
+    st.markdown(page["2-cash-flows-input"])
     
     startup_cf = st.number_input("Average Annual Cash Flow in Startup Phase (negative)", value=-50000.0, step=1000.0)
     expansion_initial_cf = st.number_input("Cash Flow at the Start of Expansion Phase", value=20000.0, step=1000.0)
     expansion_growth_rate = st.slider("Annual Growth Rate during Expansion Phase (%)", min_value=0.0, max_value=50.0, value=20.0)
     maturity_growth_rate = st.slider("Annual Growth Rate during Maturity Phase (%)", min_value=0.0, max_value=20.0, value=5.0)
     
-    st.subheader("3. Discount Rate and Scenario")
-    st.markdown("Select a scenario for discount rate adjustment:")
+    st.markdown(page["3-discount-rate-and"])
     scenario = st.radio("Scenario", options=["Optimistic", "Realistic", "Conservative"], index=1)
     
     if scenario == "Optimistic":
@@ -608,9 +413,7 @@ elif section == "3. Growth Companies":
     else:
         discount_rate = st.number_input("Discount Rate (%)", value=18.0, step=0.5)
     
-    st.markdown("---")
-    
-    st.markdown("### Calculating Cash Flows and Present Values")
+    st.markdown(page["calculating-cash-flows-and"])
     cash_flow_series = []
     
     for t in range(1, startup_years + 1):
@@ -626,23 +429,13 @@ elif section == "3. Growth Companies":
         cf = cf * (1 + maturity_growth_rate / 100)
     
     st.write("**Projected Cash Flows (by year):**")
-    st.write(cash_flow_series)
+    st.json(cash_flow_series)
     
     pv_values = [cf / ((1 + discount_rate / 100) ** t) for t, cf in enumerate(cash_flow_series, start=1)]
-    total_pv = np.sum(pv_values)
+    total_pv = sum(pv_values)
     st.write("**Total Present Value of Cash Flows:** $", f"{total_pv:,.2f}")
     
-    st.markdown("### Terminal Value Calculation")
-    st.markdown(r"""
-    Assuming the company reaches a stable state at the end of the projection period, we calculate the Terminal Value using:
-    
-    $$\text{Terminal Value} = \frac{FCF_{last} \times (1+g)}{(r - g)}$$
-    
-    Where:
-    - $FCF_{last}$ is the cash flow in the final projected year
-    - $g$ is the long-term stable (maturity) growth rate
-    - $r$ is the discount rate
-    """)
+    st.markdown(page["terminal-value-calculation"])
     if discount_rate > maturity_growth_rate:
         terminal_value = cash_flow_series[-1] * (1 + maturity_growth_rate / 100) / ((discount_rate / 100) - (maturity_growth_rate / 100))
         terminal_value_pv = terminal_value / ((1 + discount_rate / 100) ** total_years)
@@ -654,38 +447,202 @@ elif section == "3. Growth Companies":
     else:
         st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
     
-    st.markdown("---")
-    st.markdown("### Interactive Analysis")
-    st.markdown("""
-    **Observe the impact of changes:**  
-    - Adjust the number of years in each phase.  
-    - Modify cash flow inputs and growth rates.  
-    - Experiment with different discount rate scenarios.
-    
-    Valuing growth companies is challenging due to initial losses, non-linear growth, and uncertainty in reaching profitability.  
-    Use these tools to refine your analysis and better understand the risk-return trade-offs.
-    """)
+    # Export the schedule for spreadsheets and BI tools
+    st.markdown("#### 💾 Export Your Valuation")
+    if st.checkbox("Prepare export files"):
+        import valuation_engine as ve
+        import valuation_export as vx
+
+        export_format = st.radio("Export format", ["Parquet", "Arrow"], horizontal=True)
+        extension = export_format.lower()
+        schedule = ve.growth_company_schedule(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("⬇️ Yearly Schedule", vx.to_bytes(vx.schedule_batch(schedule), extension), file_name=f"growth_company_schedule.{extension}")
+        with col2:
+            st.download_button("⬇️ Valuation Summary", vx.to_bytes(vx.summary_batch(schedule), extension), file_name=f"growth_company_summary.{extension}")
+    
+    # Tornado: every input nudged down and up, valued in one batched call
+    st.markdown(page["sensitivity-analysis-tornado"])
+    if st.checkbox("Run the sensitivity analysis"):
+        import altair as alt
+        import numpy as np
+        import pandas as pd
+        import valuation_sensitivity as vs
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            years_shift = st.number_input("Shift phase lengths by (years)", min_value=1, max_value=5, value=1, step=1)
+        with col2:
+            cf_shift = st.number_input("Shift cash flows by (%)", min_value=1.0, max_value=100.0, value=20.0, step=5.0)
+        with col3:
+            rate_shift = st.number_input("Shift rates by (percentage points)", min_value=0.5, max_value=10.0, value=2.0, step=0.5)
+        start = time.perf_counter()
+        base_value, tornado_rows = vs.growth_company_tornado(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100, years_shift, cf_shift / 100, rate_shift / 100)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        labels = {"startup_years": "Years in Startup Phase", "expansion_years": "Years in Expansion Phase", "maturity_years": "Years in Maturity Phase",
+                  "startup_cf": "Startup Cash Flow", "expansion_initial_cf": "Initial Expansion Cash Flow", "expansion_growth": "Expansion Growth Rate",
+                  "maturity_growth": "Maturity Growth Rate", "rate": "Discount Rate"}
+        tornado_df = pd.DataFrame([{"Input": labels[row["input"]], "Case": case, "Change in Value": row[case.lower()] - base_value}
+                                   for row in tornado_rows for case in ("Low", "High")])
+        if np.isfinite(base_value):
+            st.altair_chart(alt.Chart(tornado_df.dropna()).mark_bar().encode(
+                x=alt.X("Change in Value:Q", title="Change in Intrinsic Value ($)"),
+                y=alt.Y("Input:N", sort=[labels[row["input"]] for row in tornado_rows], title=None),
+                color=alt.Color("Case:N", scale=alt.Scale(domain=["Low", "High"], range=["#d62728", "#2ca02c"]))))
+            if tornado_df["Change in Value"].isna().any():
+                st.warning("Some perturbations push the discount rate to or below the maturity growth rate; they have no terminal value and are left out.")
+            st.caption(f"{2 * len(tornado_rows) + 1} valuations computed in one batch in {elapsed_ms:.1f} ms.")
+        else:
+            st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+
+    # Probability-weighted scenarios: full input sets, valued together in one batch
+    st.markdown(page["probability-weighted-scenarios"])
+    if st.checkbox("Compare probability-weighted scenarios"):
+        import numpy as np
+        import pandas as pd
+        import valuation_sensitivity as vs
+
+        default_scenarios = pd.DataFrame({
+            "Scenario": ["Optimistic", "Realistic", "Conservative"],
+            "Probability (%)": [25.0, 50.0, 25.0],
+            "Startup Years": [max(startup_years - 1, 0), startup_years, min(startup_years + 2, 10)],
+            "Expansion Years": [expansion_years] * 3,
+            "Maturity Years": [maturity_years] * 3,
+            "Startup CF": [startup_cf * 0.8, startup_cf, startup_cf * 1.2],
+            "Expansion CF": [expansion_initial_cf * 1.2, expansion_initial_cf, expansion_initial_cf * 0.8],
+            "Expansion Growth (%)": [expansion_growth_rate + 5, expansion_growth_rate, max(expansion_growth_rate - 5, 0.0)],
+            "Maturity Growth (%)": [maturity_growth_rate] * 3,
+            "Discount Rate (%)": [12.0, 15.0, 18.0],
+        })
+        # The phase-length columns take whole years within the bounds of the inputs above.
+        year_columns = {column: st.column_config.NumberColumn(min_value=low, max_value=high, step=1)
+                        for column, (low, high) in zip(("Startup Years", "Expansion Years", "Maturity Years"),
+                                                       vs.PHASE_BOUNDS.values())}
+        scenario_table = st.data_editor(default_scenarios, num_rows="dynamic", hide_index=True, key="scenario_table",
+                                        column_config=year_columns).dropna()
+        if scenario_table.empty or scenario_table["Probability (%)"].sum() <= 0 or (scenario_table["Probability (%)"] < 0).any():
+            st.error("Enter at least one scenario with non-negative probabilities that sum to more than 0%.")
+        else:
+            if abs(scenario_table["Probability (%)"].sum() - 100) > 1e-9:
+                st.info(f"Probabilities sum to {scenario_table['Probability (%)'].sum():.1f}% and were rescaled to 100%.")
+            try:
+                weighted = vs.growth_company_scenarios(dict(
+                    startup_years=scenario_table["Startup Years"].to_numpy(), expansion_years=scenario_table["Expansion Years"].to_numpy(),
+                    maturity_years=scenario_table["Maturity Years"].to_numpy(), startup_cf=scenario_table["Startup CF"].to_numpy(dtype=float),
+                    expansion_initial_cf=scenario_table["Expansion CF"].to_numpy(dtype=float), expansion_growth=scenario_table["Expansion Growth (%)"].to_numpy(dtype=float) / 100,
+                    maturity_growth=scenario_table["Maturity Growth (%)"].to_numpy(dtype=float) / 100, rate=scenario_table["Discount Rate (%)"].to_numpy(dtype=float) / 100),
+                    scenario_table["Probability (%)"].to_numpy(dtype=float))
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                breakdown = pd.DataFrame({
+                    "Scenario": scenario_table["Scenario"].to_numpy(),
+                    "Probability": weighted["probabilities"],
+                    "Intrinsic Value ($)": weighted["values"][:, 0],
+                    "Weighted Contribution ($)": weighted["probabilities"] * weighted["values"][:, 0],
+                })
+                st.dataframe(breakdown.style.format({"Probability": "{:.0%}", "Intrinsic Value ($)": "{:,.2f}", "Weighted Contribution ($)": "{:,.2f}"}), hide_index=True)
+                if np.isfinite(weighted["expected"][0]):
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Expected Value", f"${weighted['expected'][0]:,.0f}")
+                    col2.metric("Standard Deviation", f"${weighted['std'][0]:,.0f}")
+                    col3.metric("Range", f"${weighted['low'][0]:,.0f} – ${weighted['high'][0]:,.0f}")
+                else:
+                    st.error("In at least one scenario the discount rate does not exceed the maturity growth rate, so it has no valid terminal value.")
+
+    st.markdown(page["what-if-profitability-is"])
+    if st.checkbox("Sweep every combination of phase lengths"):
+        import altair as alt
+        import numpy as np
+        import pandas as pd
+        import valuation_sensitivity as vs
+
+        start = time.perf_counter()
+        sweep = vs.phase_length_sweep(startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if np.isfinite(sweep["value"]).any():
+            at_current = sweep["value"][:, list(sweep["expansion_years"]).index(expansion_years), list(sweep["maturity_years"]).index(maturity_years)]
+            delay_curve = pd.DataFrame({"Delay (years)": sweep["startup_years"] - startup_years, "Intrinsic Value ($)": at_current})
+            st.line_chart(delay_curve.set_index("Delay (years)"))
+            if startup_years + 2 <= sweep["startup_years"][-1]:
+                current_value, delayed_value = at_current[startup_years], at_current[startup_years + 2]
+                st.metric("Profitability Delayed by 2 Years", f"${delayed_value:,.0f}", f"{delayed_value - current_value:+,.0f} vs. today's plan")
+            heatmap = pd.DataFrame({
+                "Startup Years": np.repeat(sweep["startup_years"], len(sweep["expansion_years"])),
+                "Expansion Years": np.tile(sweep["expansion_years"], len(sweep["startup_years"])),
+                "Intrinsic Value ($)": sweep["value"][:, :, list(sweep["maturity_years"]).index(maturity_years)].ravel(),
+            })
+            st.altair_chart(alt.Chart(heatmap).mark_rect().encode(
+                x=alt.X("Expansion Years:O"), y=alt.Y("Startup Years:O", sort="descending"),
+                color=alt.Color("Intrinsic Value ($):Q", scale=alt.Scale(scheme="redyellowgreen", domainMid=0)),
+                tooltip=["Startup Years", "Expansion Years", alt.Tooltip("Intrinsic Value ($):Q", format=",.0f")]))
+            st.caption(f"{sweep['value'].size:,} phase-length combinations valued in one batch in {elapsed_ms:.1f} ms; the heatmap shows your {maturity_years}-year maturity phase.")
+        else:
+            st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+
+    st.markdown(page["raising-capital-and-dilution"])
+    if st.checkbox("Simulate the capital raises"):
+        import numpy as np
+        import pandas as pd
+        import valuation_engine as ve
+        import valuation_financing as vf
+
+        col1, col2 = st.columns(2)
+        with col1:
+            cash_today = st.number_input("Cash Today ($)", min_value=0.0, value=100000.0, step=10000.0)
+            shares_today = st.number_input("Shares Outstanding Today", min_value=1.0, value=1000000.0, step=100000.0)
+            min_cash = st.number_input("Raise When Cash Falls Below ($)", min_value=0.0, value=25000.0, step=5000.0)
+            round_size = st.number_input("Size of a Funding Round ($)", min_value=1000.0, value=100000.0, step=10000.0)
+        with col2:
+            cf_volatility = st.slider("Cash Flow Uncertainty (%)", min_value=0, max_value=100, value=25)
+            max_delay = st.slider("Profitability Delayed by Up To (years)", min_value=0, max_value=5, value=2)
+            n_paths = st.number_input("Simulated Paths", min_value=100, max_value=100000, value=2000, step=1000)
+        base_value = ve.growth_company_dcf(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, discount_rate / 100)[2][0]
+        value_per_share = (base_value + cash_today) / shares_today
+        if not np.isfinite(value_per_share):
+            st.error("Discount rate must be greater than maturity growth rate for a valid terminal value.")
+        elif value_per_share <= 0:
+            st.error("The plan has no positive value per share to price new shares at.")
+        else:
+            # Three pricing scenarios x all paths in one simulation: new shares are
+            # sold at a share of today's value per share, growing at the discount rate.
+            pricing = np.array([1.0, 0.75, 0.5])
+            start = time.perf_counter()
+            cash_flows, lengths = vf.sample_cash_flows(startup_years, expansion_years, maturity_years, startup_cf, expansion_initial_cf, expansion_growth_rate / 100, maturity_growth_rate / 100, n_paths=int(n_paths), volatility=cf_volatility / 100, max_delay=max_delay)
+            price = pricing[:, None, None] * value_per_share * (1 + discount_rate / 100) ** np.arange(1, cash_flows.shape[-1] + 1)
+            financing = vf.simulate_financing(cash_flows, discount_rate / 100, maturity_growth_rate / 100, cash_today, shares_today, min_cash, round_size, price, lengths=lengths)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            st.metric("Value per Share Without Dilution", f"${value_per_share:,.4f}", help="Intrinsic value of the plan plus today's cash, over today's shares.")
+            summary = pd.DataFrame({
+                "New Shares Priced At": [f"{p:.0%} of value" for p in pricing],
+                "Paths Raising Capital": (financing["rounds"] > 0).mean(axis=1),
+                "Median Rounds": np.median(financing["rounds"], axis=1),
+                "Median Dilution": np.median(financing["dilution"], axis=1),
+                "Plain DCF per Share ($)": np.median(financing["value_per_share_undiluted"], axis=1),
+                "Median Value per Share ($)": np.median(financing["value_per_share"], axis=1),
+                "5th Percentile ($)": np.percentile(financing["value_per_share"], 5, axis=1),
+            })
+            st.dataframe(summary.style.format({"Paths Raising Capital": "{:.0%}", "Median Rounds": "{:.0f}", "Median Dilution": "{:.1%}", "Plain DCF per Share ($)": "{:,.4f}",
+                                               "Median Value per Share ($)": "{:,.4f}", "5th Percentile ($)": "{:,.4f}"}), hide_index=True)
+            st.caption("New shares are priced at a share of your plan's value per share, growing at the discount rate. On paths that turn out worse than the plan, new investors overpay and today's shareholders gain; on better paths they lose.")
+            cash_bands = pd.DataFrame(np.percentile(financing["cash"][0], [5, 50, 95], axis=0).T, columns=["5th Percentile", "Median", "95th Percentile"])
+            cash_bands.index = np.arange(1, len(cash_bands) + 1)
+            cash_bands.index.name = "Year"
+            st.markdown("**Cash Balance after Raises ($)**")
+            st.line_chart(cash_bands)
+            st.caption(f"{financing['rounds'].size:,} paths (3 pricing scenarios × {int(n_paths):,} draws) simulated in {elapsed_ms:.1f} ms. "
+                       f"Peak cumulative burn: median \\${np.median(financing['peak_burn'][0]):,.0f}, 95th percentile \\${np.percentile(financing['peak_burn'][0], 95):,.0f}.")
+
+    st.markdown(page["interactive-analysis"])
 
 elif section == "4. Mature Companies":
-    st.title("🧓 Evaluating Mature Companies: Less Fireworks, More Reliability")
-    st.markdown("""
-    ### 🧭 The Scenario
-    Mature companies have already passed the turbulent growth phases:
-    - **Modest growth** 📉  
-    - **Saturated market** 🧱  
-    - **Predictable cash flows** 💰  
-    
-    They may not look exciting, but they often form the backbone of a solid portfolio.
-    """)
-    st.markdown("---")
+    import pandas as pd
+    import valuation_cache as vc
 
-    st.markdown("""
-    ### 🎯 The Valuation Objective
-    The goal here is not to discover a "unicorn" but to determine whether the current market price accurately reflects the stable fundamentals of the company.
-    """)
-    st.markdown("---")
-
-    st.markdown("### 📊 Typical Characteristics of Mature Companies")
+    cache = vc.default_cache()
+    page = vct.load("small_4_mature_companies")
+    st.markdown(page["evaluating-mature-companies-less"])
     characteristics = {
         "Characteristic": [
             "Low Growth", 
@@ -704,214 +661,41 @@ elif section == "4. Mature Companies":
     }
     df_chars = pd.DataFrame(characteristics)
     st.table(df_chars)
-    st.markdown("---")
-
-    st.markdown("### 🧮 Most Suitable Valuation Tools")
-    st.markdown("""
-    1️⃣ **Discounted Cash Flow (DCF) – Stable Version**  
-       - Cash flow forecasts are relatively constant  
-       - Less uncertainty → greater confidence in the results  
-       - Often, a projection of 5 years plus a terminal value is enough
-    
-    2️⃣ **Dividend Discount Model (DDM)**  
-       - Ideal for companies with regular, predictable dividends  
-       - Focuses on the present value of a constant stream of future dividends  
-       
-       **Typical Formula:**  
-       $$\\text{Value} = \\frac{D_1}{r - g}$$  
-       Where:  
-       - $D_1$ = Dividend expected next year  
-       - $r$ = Discount rate  
-       - $g$ = Dividend growth rate
-    
-    3️⃣ **Relative Multiples** (e.g., P/E, EV/EBITDA)  
-       - Commonly used for "cash cow" companies  
-       - Helps confirm if the market is paying a reasonable price
-    """)
-    st.markdown("---")
-
-    st.markdown("### ⚠️ Hidden Dangers — Even in Mature Companies")
-    st.markdown("""
-    - **Complacency:** “Everything is fine now, so it will continue to be so” – not always true!
-    - **Disguised Decline:** A slow drop in revenues can pass unnoticed.
-    - **Excessive Debt:** Borrowing to sustain dividends can be risky.
-    - **Forced Dividends:** Companies might pay dividends artificially high to please shareholders.
-    """)
-    st.markdown("---")
-
-    st.markdown("### 💡 Tips for a Solid Valuation")
-    st.markdown("""
-    ✅ Check for consistent earnings in recent years.  
-    ✅ Review the payout ratio (dividends/net income).  
-    ✅ Compare with peers in the same sector.  
-    ✅ Watch long-term trends for structural declines.  
-    ✅ Consider disruption risks (new technologies, global competition).
-    """)
-    st.markdown("---")
-
-    st.markdown("### 🧠 Key Phrase to Remember")
-    st.markdown("> *\"Mature companies offer stability, but stability is not synonymous with immortality.\"*")
-    st.markdown("---")
-
-    st.markdown("### 🎓 Pedagogical Analogy")
-    st.markdown("""
-    Evaluating a mature company is like caring for a fully grown plant:  
-    - It doesn't require daily intensive attention.  
-    - But if you stop watering or ignore pests, it may wither.
-    """)
-    st.markdown("---")
-
-    st.markdown("### 🛠️ Mini-Exercise for the Classroom")
-    st.markdown("""
-    **Given:**  
-    - A company pays stable dividends of **2€ per share**  
-    - Discount rate: **8%**  
-    - Expected growth rate: **2%**
-    
-    **Question:**  
-    What would be the value of the share based on the DDM?
-    
-    **Formula:**  
-    $$\\text{Value} = \\frac{D_1 \\times (1+g)}{r - g}$$
-    
-    For this example:  
-    $$\\text{Value} = \\frac{2 \\times 1.02}{0.08 - 0.02} = \\frac{2.04}{0.06} \\approx 34\\,€$$
-    """)
-    st.markdown("---")
-
-    st.markdown("### Interactive DDM Calculation")
-    st.markdown("Adjust the parameters below to compute the share value using DDM:")
+    st.markdown(page["most-suitable-valuation-tools"])
     
     dividend = st.number_input("Dividend per Share (D₀)", value=2.0, step=0.1, format="%.2f")
     discount_rate = st.number_input("Discount Rate (r) in %", value=8.0, step=0.5, format="%.2f")
     growth_rate = st.number_input("Growth Rate (g) in %", value=2.0, step=0.5, format="%.2f")
     
-    D1 = dividend * (1 + growth_rate/100)
     if discount_rate > growth_rate:
-        value = D1 / ((discount_rate - growth_rate) / 100)
+        value = float(cache.call("gordon_ddm", dividend=dividend, rate=discount_rate/100, growth=growth_rate/100))
         st.write(f"**Calculated Share Value (DDM):** {value:,.2f} €")
     else:
         st.error("Discount rate must be greater than growth rate for a valid calculation.")
     
-    st.markdown("---")
-    st.markdown("### Final Takeaway")
-    st.markdown("""
-    Mature companies may not have fireworks, but their predictable cash flows and stable fundamentals make them a reliable backbone for an investment portfolio. Always keep in mind that even in maturity, vigilance is key!
-    """)
+    st.markdown(page["fading-growth-two-stage"])
+    if st.checkbox("Compare with fading-growth models"):
+        col1, col2 = st.columns(2)
+        with col1:
+            high_growth_rate = st.number_input("High Growth Rate (g_S) in %", value=8.0, step=0.5, format="%.2f")
+        with col2:
+            high_growth_years = st.number_input("Years of High (or Fading) Growth (N)", min_value=0, max_value=50, value=5, step=1)
+        if discount_rate > growth_rate:
+            two_stage_value = float(cache.call("two_stage_ddm", dividend=dividend, rate=discount_rate / 100, high_growth=high_growth_rate / 100, high_years=high_growth_years, stable_growth=growth_rate / 100)[2][0])
+            h_model_value = float(cache.call("h_model_ddm", dividend=dividend, rate=discount_rate / 100, high_growth=high_growth_rate / 100, half_life=high_growth_years / 2, stable_growth=growth_rate / 100)[2][0])
+            st.table(pd.DataFrame({
+                "Model": ["Constant growth (Gordon)", "Two-stage", "H-model"],
+                "Share Value (€)": [f"{value:,.2f}", f"{two_stage_value:,.2f}", f"{h_model_value:,.2f}"],
+            }).set_index("Model"))
+            st.markdown(page["the-h-model-sits"])
+        else:
+            st.error("Discount rate must be greater than growth rate for a valid calculation.")
+
+    st.markdown(page["final-takeaway"])
 
 elif section == "5. Cyclical Companies":
-    st.title("🎢 Evaluating Cyclical Companies: The Rhythm of Ups and Downs")
-    st.markdown("""
-    ### What Are Cyclical Companies?
-    These are companies whose performance depends strongly on the economic cycle.
-    
-    **Classic Examples:**
-    - Automobiles 🚗  
-    - Steel & Aluminum 🏗️  
-    - Tourism 🏖️  
-    - Construction 🧱  
-    - Aviation ✈️  
-    
-    When the economy is booming → profits soar 📈  
-    When it slows down → profits evaporate 📉 (or losses may even occur!)
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Market Seasons
-    Cyclical companies go through cycles:
-    - **Expansion:** Demand and profits rise.
-    - **Cycle Peak:** Maximum margins, high optimism.
-    - **Recession:** Sharp decline in demand and profits.
-    - **Recovery:** Slow rise back up.
-    
-    Evaluating them is like trying to estimate the average height of a wave… while you’re surfing it 🌊.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### The Most Common Mistake in Cyclical Evaluation
-    Using current profits as if they were sustainable in the future.  
-    If you value a cyclical company at the peak of its cycle, you might fall into the trap of:
-    - Believing that those high profits will last.
-    - Relying on misleading multiples (P/E, EV/EBITDA).
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### How to Evaluate with More Rigor
-    1️⃣ **Use Normalized Earnings:**  
-       Estimate the average profit over a full cycle (e.g., the past 10 years) to eliminate extremes (peaks and valleys).  
-       *Key Term:* **Earnings Power** – the average ability to generate profit in normal conditions.
-    
-    2️⃣ **Avoid Short-Term Earnings Models:**  
-       While a DCF model can still work, it is more reliable when based on normalized cash flows using longer projection periods and conservative margins.
-    
-    3️⃣ **Relative Valuation with Cyclical Peers:**  
-       Compare only with companies at the same point in the cycle.  
-       *For example:* Do not compare Ford (at the bottom of the cycle) with Tesla (in an expansion phase), even if both sell cars.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Golden Tip: Look at the Cycle, Not the Moment
-    "A P/E of 6 may seem cheap—until you realize that if profits are at their peak, the 'E' will fall and the P/E will skyrocket."
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Pedagogical Example
-    Consider a cyclical company with the following data:
-    - **Current Profit:** €10M  
-    - **Average (Normalized) Profit over the Last 10 Years:** €6M  
-    - **Current P/E:** 8  
-    
-    At first glance, a P/E of 8 might seem attractive (Market Price = 10M × 8 = €80M).  
-    However, if the sustainable profit is only €6M, then the **Normalized P/E** is:
-      
-    $$ P/E_{normalized} = \\frac{\\text{Market Price}}{\\text{Average Profit}} = \\frac{80M}{6M} \\approx 13.3 $$
-    
-    In other words, it may not be as cheap as it initially appears!
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Other Useful Tools
-    - **Revenue-Based Multiples:**  
-      When profits oscillate too much, revenue can provide a more stable basis.
-    - **Sector and Macroeconomic Analysis:**  
-      Understanding where we are in the cycle is vital.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Key Phrase to Remember
-    *"Don’t value a cyclical company at the top of the mountain; wait for the plateau view."*
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Evaluating Risk
-    Cyclical companies require:
-    - A higher margin of safety.
-    - Stress testing.
-    - More conservative assumptions for cash flows and growth rates.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Classroom Analogy
-    Evaluating cyclical companies is like preparing a farmer for all seasons:
-    - In summer, everything seems wonderful 🌞.
-    - But winter will come ❄️.
-    A good evaluation plan must anticipate both.
-    """)
-    st.markdown("---")
-
-    st.header("Interactive Exercise: Normalized P/E Calculation")
-    st.markdown("""
-    Fill in the details below to calculate the normalized P/E of a cyclical company.
-    """)
+    page = vct.load("small_5_cyclical_companies")
+    st.markdown(page["evaluating-cyclical-companies-the"])
     
     current_profit = st.number_input("Current Profit (in millions €)", min_value=0.0, value=10.0, step=0.5)
     normalized_profit = st.number_input("Average Profit over the Last 10 Years (in millions €)", min_value=0.0, value=6.0, step=0.5)
@@ -925,106 +709,116 @@ elif section == "5. Cyclical Companies":
     else:
         st.error("The average profit over the last 10 years must be greater than zero to calculate the normalized P/E.")
     
-    st.markdown("---")
-    st.markdown("""
-    ### Final Thoughts
-    Remember: when evaluating cyclical companies, it is essential not to get caught up with peak-cycle numbers.  
-    Use normalized earnings to obtain a realistic view of the company’s sustainable potential.
-    """)
+    st.markdown(page["where-are-we-in"])
+    if st.checkbox("Detect the cycle from a profit history"):
+        import numpy as np
+        import pandas as pd
+        import valuation_cycles as vcy
+
+        history_text = st.text_area("Yearly Profits (in millions €, comma-separated)", value="8.8, 6.0, 3.2, 2.0, 3.2, 6.0, 8.8, 10.0, 8.8, 6.0, 3.2, 2.0, 3.2, 6.0, 8.8, 10.0")
+        try:
+            history = np.array([float(value) for value in history_text.replace(";", ",").split(",") if value.strip()])
+        except ValueError:
+            history = np.array([])
+        if history.size < 8:
+            st.error("Enter at least 8 numeric yearly profits to detect a cycle.")
+        else:
+            cycle_pe, cycles = vcy.cycle_normalized_pe(history, current_pe)
+            if cycles["phase"][0] == vcy.NO_PHASE:
+                st.error("No cycle found: the profits do not move around their trend.")
+            else:
+                season = vcy.PHASES[cycles["phase"][0]]
+                st.line_chart(pd.DataFrame({"Profit": history}, index=np.arange(1, history.size + 1)))
+                st.write(f"**Estimated Cycle Length:** {cycles['period'][0]:.1f} years")
+                st.write(f"**Current Season:** {season.capitalize()}")
+                st.write(f"**Average Profit over the Last Full Cycle:** € {cycles['normalized'][0]:.2f} million")
+                if np.isfinite(cycle_pe[0]):
+                    st.write(f"**Cycle-Normalized P/E** (latest profit × current P/E ÷ full-cycle average): {cycle_pe[0]:.2f}")
+                else:
+                    st.error("The full-cycle average profit must be greater than zero to calculate the normalized P/E.")
+                if cycles["strength"][0] < 0.3:
+                    st.warning("The cycle explains little of the ups and downs in this history—treat the season as a rough guess.")
+                elif season == "peak":
+                    st.warning("Profits are at or just past the top of the cycle: the 'E' in today's P/E is likely to fall.")
+                st.markdown(page["compare-this-company-only"])
+
+    st.markdown(page["stress-testing-the-company"])
+    if st.checkbox("Stress-test the company against recessions"):
+        import numpy as np
+        import pandas as pd
+        import valuation_stress as vst
+
+        col1, col2 = st.columns(2)
+        with col1:
+            stress_revenue = st.number_input("Revenue Next Year (in millions €)", min_value=0.1, value=100.0, step=5.0)
+            revenue_growth = st.number_input("Revenue Growth (%)", min_value=-20.0, max_value=30.0, value=3.0, step=0.5)
+            stress_years = st.slider("Projection Years", min_value=3, max_value=20, value=10)
+            stress_rate = st.number_input("Discount Rate (%)", min_value=0.0, max_value=50.0, value=10.0, step=0.5)
+        with col2:
+            cyclicality = st.slider("Cyclicality (revenue drop vs. the economy)", min_value=0.0, max_value=3.0, value=1.5, step=0.1)
+            contribution_margin = st.slider("Contribution Margin (%)", min_value=0, max_value=100, value=30, help="Share of each lost euro of revenue that is lost from profit. Above the net margin, because fixed costs do not shrink in a recession.")
+            stress_growth = st.number_input("Terminal Growth Rate (%)", min_value=-5.0, max_value=10.0, value=2.0, step=0.5)
+        st.caption("Earnings start from the average profit over the last 10 years entered above, as a share of revenue.")
+
+        default_library = pd.DataFrame([
+            {"Scenario": name, "Depth (%)": s["depth"] * 100, "Years at Trough": s["duration"], "Recovery Years": s["recovery"], "Shape": s["shape"], "Starts in Year": s["start"]}
+            for name, s in vst.SCENARIOS.items()])
+        library = st.data_editor(default_library, num_rows="dynamic", hide_index=True, key="stress_library",
+                                 column_config={"Shape": st.column_config.SelectboxColumn(options=list(vst.SHAPES), required=True)}).dropna()
+        st.caption("Depths are for a company of cyclicality 1. Shapes: V bounces straight back, U stays low longer, W dips a second time, L only wins back half of the loss.")
+        if library.empty:
+            st.error("Enter at least one scenario.")
+        elif stress_rate <= stress_growth:
+            st.error("Discount rate must be greater than the terminal growth rate for a valid calculation.")
+        else:
+            scenarios = {row["Scenario"]: dict(depth=row["Depth (%)"] / 100, duration=row["Years at Trough"], recovery=row["Recovery Years"], shape=row["Shape"], start=row["Starts in Year"])
+                         for _, row in library.iterrows()}
+            revenue = stress_revenue * (1 + revenue_growth / 100) ** np.arange(stress_years)
+            earnings = revenue * normalized_profit / stress_revenue
+            stress = vst.stress_test(revenue, earnings, cyclicality, contribution_margin / 100, stress_rate / 100, stress_growth / 100, scenarios=scenarios)
+            names = stress["scenarios"]
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Value without a Recession", f"€ {stress['base_value'][0]:,.1f}m")
+            col2.metric("Value at Stress", f"€ {stress['value_at_stress'][0]:,.1f}m", help=f"Value in the worst scenario: {names[stress['worst_scenario'][0]]}.")
+            col3.metric("Margin of Safety Needed", f"{stress['loss_at_stress'][0]:.0%}", help="Discount to the value without a recession that still covers every scenario of the library.")
+            st.dataframe(pd.DataFrame({"Scenario": names, "Value (€ millions)": stress["value"][:, 0], "Change": stress["value"][:, 0] / stress["base_value"][0] - 1})
+                         .style.format({"Value (€ millions)": "{:,.1f}", "Change": "{:.1%}"}), hide_index=True)
+            _, drop = vst.scenario_profiles(scenarios, stress_years)
+            paths = vst.stressed_earnings(revenue[None, :], earnings[None, :], np.array([cyclicality]), np.array([contribution_margin / 100]), drop)
+            stressed = pd.DataFrame(paths[:, 0, :].T, columns=names)
+            stressed.insert(0, "No Recession", earnings)
+            stressed.index = np.arange(1, stress_years + 1)
+            stressed.index.name = "Year"
+            st.markdown("**Earnings in Each Scenario (€ millions)**")
+            st.line_chart(stressed)
+
+            st.markdown("**Value at Stress by Sector** (a synthetic universe of cyclical companies)")
+
+            # The universe and its stress test depend only on the horizon and the
+            # scenario library, so reruns for other inputs reuse them.
+            @st.cache_data(max_entries=8)
+            def sector_stress_test(stress_years, scenarios):
+                start = time.perf_counter()
+                universe = vst.sample_universe(5_000, stress_years)
+                result = vst.stress_test(**universe, scenarios=scenarios)
+                return result, universe["rate"].size, (time.perf_counter() - start) * 1000
+
+            sector_stress, n_companies, elapsed_ms = sector_stress_test(stress_years, scenarios)
+            st.dataframe(pd.DataFrame({
+                "Sector": sector_stress["sectors"],
+                "Value without a Recession (€ millions)": sector_stress["sector_base_value"],
+                "Value at Stress (€ millions)": sector_stress["sector_value_at_stress"],
+                "Worst Scenario": np.array(names)[sector_stress["sector_value"].argmin(axis=0)],
+                "Loss at Stress": sector_stress["sector_loss_at_stress"],
+            }).style.format({"Value without a Recession (€ millions)": "{:,.0f}", "Value at Stress (€ millions)": "{:,.0f}", "Loss at Stress": "{:.1%}"}), hide_index=True)
+            st.caption(f"{len(names)} scenarios × {n_companies:,} companies × {stress_years} years valued in {elapsed_ms:.1f} ms, then reused until the horizon or the scenarios change. "
+                       "Deeply cyclical sectors with high operating leverage need the widest margin of safety.")
+
+    st.markdown(page["final-thoughts"])
 
 elif section == "6. Financial Companies":
-    st.title("🏦 Evaluating Financial Companies: A Special Case")
-    st.markdown("""
-    ### The Challenge
-    Financial companies do not produce physical goods or own factories. They work with money as their raw material:
-    - They **buy money** (paying interest to depositors)
-    - They **sell money** (lending funds and charging interest)
-    
-    **Result:** Traditional valuation models, such as the classic DCF, are not directly applicable.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### What Makes Financial Companies Different?
-    Below is a comparison between normal companies and financial companies:
-    
-    | **Aspect**              | **Normal Companies**            | **Financial Companies**                    |
-    |-------------------------|---------------------------------|--------------------------------------------|
-    | **Debt**                | Something to control            | Integral to the business                   |
-    | **Tangible Assets**     | Factories, machines, inventory  | Loans, investments                         |
-    | **Free Cash Flow**      | Clearly defined                 | Difficult to define                        |
-    | **Regulation**          | Light to moderate               | Highly regulated                           |
-    | **Revenue Sources**     | Products sold                   | Interest, commissions, premiums            |
-    
-    So, how do you evaluate these "financial beasts"?  
-    Return to basics: **Value = Assets – Liabilities** (adapted to the sector). The main tools become:
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 1. Relative Multiples
-    - **The King: Price-to-Book (P/BV)**  
-      Compares the stock price with its book value per share (net assets). This is widely used in banks.  
-      **Example:**  
-      If a stock is trading at 1.2 times its book value, the market is paying a premium.
-    
-      **Interpretation:**  
-      - **P/BV > 1:** The market expects returns above the cost of capital.  
-      - **P/BV < 1:** The market is skeptical about the company's profitability or the quality of its assets.
-      
-    - **Other Multiples:**  
-      - ROE (Return on Equity) is fundamental to understand the profitability of equity.  
-      - P/E, but only if profits are stable.  
-      Many analyses cross-reference ROE and P/BV using a "magic formula":
-    
-      $$ P/BV = \\frac{ROE - g}{r - g} $$
-    
-      Where:  
-      - *ROE* = Return on Equity  
-      - *g* = Expected growth  
-      - *r* = Cost of Capital
-    
-      This formula helps estimate the “fair” P/BV and compare it with the market.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 2. Dividend Discount Model (DDM) for Banks
-    Banks typically pay stable and predictable dividends, making the DDM a suitable model.  
-    The formula is:
-    
-    $$ \\text{Value} = \\frac{D_1}{r - g} $$
-    
-    Where:  
-    - $D_1$ = Dividend expected next year  
-    - $r$ = Discount rate  
-    - $g$ = Growth rate
-    
-    *Note:* This method requires a good estimate of the growth rate and is sensitive to regulatory risk and capital strength.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### 3. Asset Quality and Regulatory Risk
-    When valuing financial companies, you cannot ignore:
-    - **Credit Portfolio Quality:** The level of non-performing loans.
-    - **Capital Ratios:** Such as Tier 1 capital.
-    - **Exposure to Systemic Risk**
-    
-    *Example:* Some banks collapsed because they had many “good” assets on paper, but with hidden risk.
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Key Phrase to Remember
-    *"In a financial company, value is found both in the confidence it inspires and the numbers it presents."*
-    """)
-    st.markdown("---")
-
-    st.header("Interactive Exercise: Fair P/BV Calculation")
-    st.markdown("""
-    Fill in the details below to calculate the fair Price-to-Book (P/BV) ratio using the magic formula.
-    """)
+    page = vct.load("small_6_financial_companies")
+    st.markdown(page["evaluating-financial-companies-a"])
     
     roe = st.number_input("Enter the ROE (as a percentage)", value=12.0, step=0.5, format="%.2f")
     cost_of_capital = st.number_input("Enter the Cost of Capital (r) in %", value=10.0, step=0.5, format="%.2f")
@@ -1035,46 +829,56 @@ elif section == "6. Financial Companies":
     growth_decimal = expected_growth / 100
     
     if cost_decimal > growth_decimal:
-        fair_pbv = (roe_decimal - growth_decimal) / (cost_decimal - growth_decimal)
+        import valuation_cache as vc
+
+        fair_pbv = float(vc.default_cache().call("fair_pbv", roe=roe_decimal, rate=cost_decimal, growth=growth_decimal))
         st.write(f"**Fair P/BV:** {fair_pbv:.2f}")
         
-        st.markdown("""
-        **Mini-Exercise Recap:**  
-        If a bank has:  
-        - ROE = 12%  
-        - Cost of Capital = 10%  
-        - Expected Growth = 4%  
-    
-        Then the fair P/BV is calculated as:  
-    
-        $$ P/BV = \\frac{0.12 - 0.04}{0.10 - 0.04} = \\frac{0.08}{0.06} \\approx 1.33 $$
-    
-        If the bank is trading at a P/BV of 1.1, it might be undervalued.
-        """)
+        st.markdown(page["mini-exercise-recap"])
     else:
         st.error("Cost of Capital must be greater than Expected Growth for a valid calculation.")
     
-    st.markdown("---")
-    st.markdown("""
-    ### Analyst Checklist – Visual Summary
-    - **Consistent and high ROE?**  
-    - **P/BV below the theoretical value?**  
-    - **Sustainable and growing dividends?**  
-    - **Strong regulation and capitalization?**  
-    - **High-quality credit portfolio?**
-    """)
-    st.markdown("---")
-
-    st.markdown("""
-    ### Classroom Analogy
-    Evaluating a bank is like assessing a dam:  
-    It may appear stable on the outside, but what really matters is the quality of the water (assets) and the strength of the floodgates (capital and regulation).
-    """)
+    st.markdown(page["analyst-checklist-visual-summary"])
+    if st.checkbox("Screen a bank universe"):
+        import valuation_banks as vb
+
+        bank_file = st.file_uploader("Bank universe", type=["csv", "parquet"])
+        col1, col2 = st.columns(2)
+        with col1:
+            min_roe = st.number_input("Minimum ROE (%)", value=10.0, step=0.5)
+            max_roe_volatility = st.number_input("Maximum ROE volatility (percentage points)", value=3.0, step=0.5)
+            top_banks = st.number_input("Banks to show", min_value=1, max_value=1000, value=10, step=5)
+        with col2:
+            min_capital_ratio = st.number_input("Minimum capital ratio, e.g. CET1 (%)", value=10.0, step=0.5)
+            max_npl_ratio = st.number_input("Maximum non-performing loans (%)", value=5.0, step=0.5)
+        checklist = dict(min_roe=min_roe / 100, max_roe_volatility=max_roe_volatility / 100,
+                         min_capital_ratio=min_capital_ratio / 100, max_npl_ratio=max_npl_ratio / 100)
+        if bank_file is None:
+            st.caption("No file? Download a sample universe of 10,000 banks and upload it.")
+            st.download_button("⬇️ Sample bank universe", vb.sample_banks(10_000).to_csv(index=False), file_name="bank_universe.csv")
+        else:
+            try:
+                cheapest_banks, screen_stats = vb.screen_bank_file(bank_file, top_banks, checklist)
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                st.write(f"**Screened:** {screen_stats['screened']:,} banks · **Passed the checklist:** {screen_stats['passed']:,}")
+                if screen_stats["skipped_filters"]:
+                    st.info("Skipped filters (column not in file): " + ", ".join(screen_stats["skipped_filters"]))
+                st.dataframe(cheapest_banks, hide_index=True)
+    st.markdown(page["classroom-analogy"])
 
 # Footer
-st.markdown("---")
 st.markdown("""
+---
+
 <div class="footer">
 *Content by Luís Simões da Cunha – Licensed under <a href="https://creativecommons.org/licenses/by-nc/4.0/">CC‑BY‑NC</a>.*
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Payload of this rerun (logged; shown in the sidebar with ?debug=payload)
+payload_history = vp.finish_rerun(payload, section, st.session_state)
+if st.query_params.get(vp.DEBUG_QUERY[0]) == vp.DEBUG_QUERY[1]:
+    with st.sidebar.expander("Rerun payload", expanded=True):
+        st.markdown(vp.history_markdown(payload_history))
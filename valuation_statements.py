@@ -0,0 +1,137 @@
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# FCFF, FCFE and DDM from one set of projected statements
+# =============================================================================
+# Lesson 1 lists three variations of the DCF. Built on the same projections
+# they should tell the same story about the equity:
+#
+#     FCFF      = EBIT x (1 - tax) + depreciation - capex - change in working capital
+#     FCFE      = FCFF - interest x (1 - tax) + net borrowing
+#     dividends = payout ratio x net income,  net income = (EBIT - interest) x (1 - tax)
+#
+#     equity (FCFF) = PV of FCFF at the WACC - net debt
+#     equity (FCFE) = PV of FCFE at the cost of equity
+#     equity (DDM)  = PV of dividends at the cost of equity
+#
+# each with a Gordon terminal value on the last year at the stable growth.
+# When the values disagree by more than a tolerance, the company is flagged:
+# usually the WACC does not match the leverage implied by the borrowing
+# plan, or the payout leaves cash piling up in the firm.
+#
+# Everything is batched over companies. The three cash flows come out of one
+# pass over the (companies, years) statement arrays, the discount factors of
+# both rates are computed in a single call, and FCFE and dividends share the
+# cost-of-equity factors, so the three methods cost little more than one
+# schedule DCF (valuation_bench.py --three-way measures it).
+
+DIVERGENCE_TOLERANCE = 0.10   # max spread of the three equity values, relative to their median
+
+
+def _statement(value, name, n, horizon):
+    """A statement input as a scalar, a (n, 1) column or a (n, horizon) array.
+
+    A 1-D input is always one value per company, never one per year: a
+    (years,) array for n == years companies would otherwise be ambiguous.
+    """
+    value = ve._as_array(value)
+    if value.ndim == 0 or value.shape == (n, horizon):
+        return value
+    if value.shape == (n,):
+        return value[:, None]
+    raise ValueError(f"{name} must be a scalar, a ({n},) per-company array or a ({n}, {horizon}) array, "
+                     f"got shape {value.shape}")
+
+
+def three_way_valuation(ebit, depreciation, capex, change_in_working_capital, interest_expense,
+                        net_borrowing, tax_rate, payout_ratio, net_debt, wacc, cost_of_equity,
+                        stable_growth, tolerance=DIVERGENCE_TOLERANCE):
+    """Equity value of every company by FCFF, FCFE and DDM, with a divergence flag.
+
+    `ebit` is a (companies, years) array. Every other statement input
+    (tax_rate and payout_ratio included) is a scalar, a (companies,) array
+    with one value per company, or the full (companies, years) array;
+    any other shape raises ValueError. net_debt, wacc, cost_of_equity and
+    stable_growth are per company.
+
+    Returns a dict of per-company arrays: "firm_value", "equity_fcff",
+    "equity_fcfe", "equity_ddm", "spread" ((max - min) / |median| of the
+    three equity values) and "flag" (spread above `tolerance`, or a value
+    that could not be computed), plus the (companies, years) cash flows
+    "fcff", "fcfe" and "dividends".
+    """
+    ebit = np.atleast_2d(ve._as_array(ebit))
+    n, horizon = ebit.shape
+    depreciation, capex, change_in_working_capital, interest_expense, net_borrowing, tax_rate, payout_ratio = (
+        _statement(value, name, n, horizon) for value, name in (
+            (depreciation, "depreciation"), (capex, "capex"),
+            (change_in_working_capital, "change_in_working_capital"), (interest_expense, "interest_expense"),
+            (net_borrowing, "net_borrowing"), (tax_rate, "tax_rate"), (payout_ratio, "payout_ratio")))
+    after_tax = 1.0 - tax_rate
+    # The three cash flows, built in place: every (companies, years) array
+    # allocated here is one of the results (plus one temporary for FCFE).
+    fcff = ebit * after_tax
+    fcff += depreciation
+    fcff -= capex
+    fcff -= change_in_working_capital
+    # Built from the full-shape FCFF, so interest and borrowing may be
+    # scalars (e.g. 0 for an unlevered company) or per company.
+    fcfe = fcff - interest_expense * after_tax
+    fcfe += net_borrowing
+    dividends = ebit - interest_expense
+    dividends *= after_tax
+    dividends *= payout_ratio
+
+    # One discount-factor call for both rates: row 0 is the WACC, row 1 the
+    # cost of equity (shared by FCFE and dividends). The present values are
+    # row-wise dot products, accumulated in float64 without a temporary.
+    rates = np.stack([np.broadcast_to(ve._as_array(r), (n,)) for r in (wacc, cost_of_equity)])
+    factors = ve.discount_factors(rates.ravel(), horizon).reshape(2, n, horizon)
+    pv = np.stack([np.einsum("nt,nt->n", flow, factors[k], dtype=np.float64)
+                   for flow, k in ((fcff, 0), (fcfe, 1), (dividends, 1))])
+
+    last = np.stack([fcff[:, -1], fcfe[:, -1], dividends[:, -1]])
+    method_rates = rates[[0, 1, 1]]
+    pv += ve.terminal_value(last, method_rates, stable_growth) * factors[[0, 1, 1], :, -1]
+    firm_value = pv[0].copy()
+    equity = pv
+    equity[0] -= ve._as_array(net_debt)
+
+    high, low = equity.max(axis=0), equity.min(axis=0)
+    median = equity.sum(axis=0) - high - low
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spread = (high - low) / np.abs(median)
+    return dict(firm_value=firm_value, equity_fcff=equity[0],
+                equity_fcfe=equity[1], equity_ddm=equity[2], spread=spread,
+                flag=~(spread <= tolerance), fcff=fcff, fcfe=fcfe, dividends=dividends)
+
+
+def simple_projection(ebit, growth, years, reinvestment_rate, depreciation_share=0.5,
+                      working_capital_share=0.2, tax_rate=0.25, net_debt=0.0, cost_of_debt=0.05,
+                      payout_ratio=1.0):
+    """Projected statements from a few drivers, as inputs for three_way_valuation.
+
+    EBIT grows at `growth` for `years`; reinvestment (capex - depreciation +
+    change in working capital) is `reinvestment_rate` of after-tax EBIT, with
+    depreciation a `depreciation_share` of capex and working capital a
+    `working_capital_share` of the reinvestment. Net debt grows with EBIT
+    (constant leverage), paying `cost_of_debt` on the opening balance.
+    Per-company drivers may be arrays. Returns a dict of (companies, years)
+    arrays plus the per-company "net_debt".
+    """
+    ebit, growth, reinvestment_rate, tax_rate, net_debt, cost_of_debt = (
+        np.atleast_1d(np.asarray(x, dtype=np.float64))[:, None]
+        for x in (ebit, growth, reinvestment_rate, tax_rate, net_debt, cost_of_debt))
+    growth_path = (1.0 + growth) ** np.arange(years)
+    ebit_path = ebit * growth_path
+    reinvestment = reinvestment_rate * ebit_path * (1.0 - tax_rate)
+    change_in_working_capital = working_capital_share * reinvestment
+    capex = (reinvestment - change_in_working_capital) / (1.0 - depreciation_share)
+    debt = net_debt * (1.0 + growth) ** np.arange(years + 1)
+    return dict(ebit=ebit_path, depreciation=depreciation_share * capex, capex=capex,
+                change_in_working_capital=change_in_working_capital,
+                interest_expense=cost_of_debt * debt[:, :-1], net_borrowing=np.diff(debt, axis=1),
+                tax_rate=np.broadcast_to(tax_rate, ebit_path.shape), payout_ratio=payout_ratio,
+                net_debt=net_debt[:, 0])
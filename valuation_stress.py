@@ -0,0 +1,202 @@
+import numpy as np
+
+import valuation_engine as ve
+
+# =============================================================================
+# Macro stress tests of cyclical companies
+# =============================================================================
+# Lesson 5 asks for stress testing and a higher margin of safety. A stress
+# scenario is a recession described by
+#
+#   depth     peak revenue drop for a company of cyclicality 1 (0.2 = -20%)
+#   duration  years spent at the trough
+#   recovery  years to climb back
+#   shape     V (straight back up), U (slow start, then fast), W (a second,
+#             smaller dip on the way up) or L (only L_RECOVERY of the loss
+#             ever comes back)
+#   start     first recession year of the projection (1 = next year)
+#
+# Each company's revenue falls by its cyclicality times the scenario's drop
+# (never below zero), and its earnings lose the lost revenue times its
+# contribution margin, which is above the net margin. That is operating
+# leverage: earnings fall faster than revenue. Each stressed path is
+# revalued like the baseline: the PV of the earnings plus a Gordon terminal
+# value on the last year, so an L-shaped scar lasts forever.
+#
+# The stressed earnings form one broadcasted scenarios x companies x years
+# tensor, built CHUNK_CELLS cells at a time over blocks of companies, so
+# memory stays flat whatever the universe size. Per block the revaluation is
+# one einsum against the discount weights shared by all scenarios.
+# valuation_bench.py --stress measures it.
+
+SHAPES = ("V", "U", "W", "L")
+L_RECOVERY = 0.5               # share of the loss an L-shaped recovery wins back
+CHUNK_CELLS = 1 << 21          # scenarios x companies x years per block (16 MB per array)
+
+# name -> scenario; depths are for a company of cyclicality 1
+SCENARIOS = {
+    "Mild recession": dict(depth=0.05, duration=1, recovery=1, shape="V", start=1),
+    "Typical recession": dict(depth=0.12, duration=1, recovery=2, shape="U", start=1),
+    "Severe recession": dict(depth=0.25, duration=2, recovery=3, shape="U", start=1),
+    "Double dip": dict(depth=0.15, duration=1, recovery=3, shape="W", start=1),
+    "Lost decade": dict(depth=0.15, duration=2, recovery=5, shape="L", start=1),
+}
+
+# sector -> (cyclicality, net margin, contribution margin) of sample_universe
+SECTORS = {
+    "Automobiles": (1.6, 0.06, 0.25),
+    "Materials": (1.4, 0.10, 0.35),
+    "Energy": (1.3, 0.12, 0.45),
+    "Industrials": (1.1, 0.09, 0.30),
+    "Consumer Staples": (0.4, 0.08, 0.25),
+}
+
+
+def _shape_codes(shape):
+    shape = np.atleast_1d(shape)
+    if shape.dtype.kind in "iu":
+        codes = shape.astype(np.int64)
+    else:
+        unknown = sorted(set(shape.tolist()) - set(SHAPES))
+        if unknown:
+            raise ValueError(f"Unknown recovery shape: {', '.join(map(repr, unknown))}")
+        codes = np.searchsorted(np.array(SHAPES), shape, sorter=np.argsort(SHAPES))
+        codes = np.argsort(SHAPES)[codes]
+    if ((codes < 0) | (codes >= len(SHAPES))).any():
+        raise ValueError("Recovery shape codes must index SHAPES.")
+    return codes
+
+
+def shock_profile(depth, duration, recovery, shape, years, start=1):
+    """(scenarios, years) revenue drop of each scenario, for cyclicality 1.
+
+    Inputs are scalars or (scenarios,) arrays; shape is one of SHAPES (or
+    its index). Year t of the projection is t = 1..years.
+    """
+    depth, duration, recovery, start = (np.atleast_1d(np.asarray(x, dtype=np.float64))
+                                        for x in (depth, duration, recovery, start))
+    codes = _shape_codes(shape)
+    depth, duration, recovery, start, codes = np.broadcast_arrays(depth, duration, recovery, start, codes)
+    # Years since the recession began (0 = first year), and the share of the
+    # recovery done: 0 through the trough, 1 once it is over.
+    since = np.arange(1, years + 1)[None, :] - start[:, None]
+    done = np.clip((since - duration[:, None] + 1.0) / np.maximum(recovery, 1.0)[:, None], 0.0, 1.0)
+    remaining = np.choose(codes[:, None], [
+        1.0 - done,                                        # V
+        1.0 - done ** 2,                                   # U
+        (1.0 - 0.5 * done) * np.cos(1.5 * np.pi * done) ** 2,  # W: back at 1/3, 2/3 deep at 2/3
+        1.0 - L_RECOVERY * done,                           # L
+    ])
+    remaining[since < 0] = 0.0
+    return depth[:, None] * remaining
+
+
+def scenario_profiles(scenarios, years):
+    """(names, (scenarios, years) drops) of a {name: scenario} library."""
+    names = list(scenarios)
+    fields = {key: [scenarios[name][key] for name in names]
+              for key in ("depth", "duration", "recovery", "shape", "start")}
+    return names, shock_profile(**fields, years=years)
+
+
+def stressed_earnings(revenue, earnings, cyclicality, contribution_margin, drop):
+    """(scenarios, companies, years) earnings under each scenario's revenue drop.
+
+    revenue, earnings: (companies, years) baseline paths.
+    cyclicality, contribution_margin: per company.
+    drop: (scenarios, years) from shock_profile.
+    """
+    drop = np.asarray(drop, dtype=np.float64)
+    cyclicality = np.asarray(cyclicality, dtype=np.float64)
+    lost = drop[:, None, :] * cyclicality[:, None]
+    if drop.max(initial=0.0) * cyclicality.max(initial=0.0) > 1.0:
+        np.minimum(lost, 1.0, out=lost)             # revenue cannot fall below zero
+    lost *= np.asarray(revenue) * np.asarray(contribution_margin)[:, None]
+    return np.subtract(earnings, lost, out=lost)
+
+
+def stress_test(revenue, earnings, cyclicality, contribution_margin, rate, terminal_growth,
+                scenarios=SCENARIOS, sectors=None):
+    """Value of every company under every scenario of the library.
+
+    revenue, earnings: (companies, years) baseline projections.
+    cyclicality:       revenue sensitivity to the macro (1 = the scenario depth).
+    contribution_margin: share of lost revenue lost from earnings.
+    rate, terminal_growth: per company, as decimals.
+    sectors:           optional (companies,) labels for the sector report.
+
+    Returns a dict with "scenarios" (names), per company "base_value",
+    "value_at_stress" (value in the worst scenario), "worst_scenario"
+    (index), "loss_at_stress" (1 - value at stress / base value: the
+    margin of safety that covers the whole library), and the (scenarios,
+    companies) "value". With sectors, also "sectors" (labels),
+    "sector_base_value", (scenarios, sectors) "sector_value",
+    "sector_value_at_stress" and "sector_loss_at_stress". Sector totals
+    leave out companies without a valid value (rate <= terminal growth).
+    """
+    revenue = np.atleast_2d(np.asarray(revenue, dtype=np.float64))
+    earnings = np.atleast_2d(np.asarray(earnings, dtype=np.float64))
+    n, years = revenue.shape
+    names, drop = scenario_profiles(scenarios, years)
+    cyclicality, contribution_margin, rate, terminal_growth = (
+        np.broadcast_to(np.asarray(x, dtype=np.float64), (n,))
+        for x in (cyclicality, contribution_margin, rate, terminal_growth))
+
+    base_value, value_at_stress = np.empty(n), np.empty(n)
+    value = np.empty((len(names), n))
+    worst = np.empty(n, dtype=np.int64)
+    chunk = max(1, CHUNK_CELLS // (len(names) * years))
+    for start in range(0, n, chunk):
+        rows = slice(start, start + chunk)
+        # Discount weights of each year, the last one carrying the terminal
+        # value: every valuation of the block is a dot product with them.
+        weights = ve.discount_factors(rate[rows], years).astype(np.float64)
+        weights[:, -1] *= 1.0 + ve.terminal_value(1.0, rate[rows], terminal_growth[rows])
+        base_value[rows] = np.einsum("ct,ct->c", earnings[rows], weights)
+        paths = stressed_earnings(revenue[rows], earnings[rows], cyclicality[rows],
+                                  contribution_margin[rows], drop)
+        block = value[:, rows]
+        block[:] = np.einsum("sct,ct->sc", paths, weights)
+        # A company without a valid value (rate <= terminal growth) is NaN in
+        # every scenario, so argmin needs no NaN handling.
+        worst[rows] = block.argmin(axis=0)
+        value_at_stress[rows] = block.min(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loss = 1.0 - value_at_stress / base_value
+    result = dict(scenarios=names, base_value=base_value, value=value,
+                  value_at_stress=value_at_stress, worst_scenario=worst, loss_at_stress=loss)
+    if sectors is not None:
+        labels, codes = np.unique(np.asarray(sectors), return_inverse=True)
+        valid = np.isfinite(base_value) & np.isfinite(value).all(axis=0)
+        codes, k = codes.ravel()[valid], labels.size
+        sector_value = np.stack([np.bincount(codes, v[valid], minlength=k) for v in value])
+        sector_base = np.bincount(codes, base_value[valid], minlength=k)
+        sector_at_stress = sector_value.min(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sector_loss = 1.0 - sector_at_stress / sector_base
+        result.update(sectors=labels, sector_base_value=sector_base, sector_value=sector_value,
+                      sector_value_at_stress=sector_at_stress, sector_loss_at_stress=sector_loss)
+    return result
+
+
+def sample_universe(n_companies=5_000, years=10, seed=0):
+    """Synthetic cyclical universe spread over SECTORS, for demos and benchmarks.
+
+    Returns a dict of stress_test inputs: (companies, years) "revenue" and
+    "earnings", per company "cyclicality", "contribution_margin", "rate",
+    "terminal_growth" and "sectors".
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(list(SECTORS))
+    sector = rng.integers(0, len(names), n_companies)
+    cyclicality, margin, contribution = (np.array(column)[sector] for column in zip(*SECTORS.values()))
+    cyclicality = cyclicality * rng.lognormal(0.0, 0.2, n_companies)
+    margin = margin * rng.lognormal(0.0, 0.25, n_companies)
+    contribution = np.maximum(contribution * rng.lognormal(0.0, 0.15, n_companies), margin)
+    growth = rng.normal(0.03, 0.02, n_companies)
+    revenue = (rng.lognormal(np.log(1_000.0), 1.0, n_companies)[:, None]
+               * (1.0 + growth[:, None]) ** np.arange(1, years + 1))
+    return dict(revenue=revenue, earnings=revenue * margin[:, None], cyclicality=cyclicality,
+                contribution_margin=contribution, rate=rng.uniform(0.08, 0.12, n_companies),
+                terminal_growth=np.full(n_companies, 0.02), sectors=names[sector])